@@ -0,0 +1,458 @@
+"""
+Benchmark suite for the BHIV Core orchestration pipeline
+
+Measures process_event, detect_duplicate_wallets, case status lookups and the
+FastAPI endpoints (through an in-process ASGI client) with 1k to 1M stored
+events, the memory held per stored event as plain dicts versus EventRecord, and
+the time to recover the WAL event store from its log alone and from a snapshot
+plus a 1% log tail. Synthetic events are generated from the transactions in
+bhx_transactions_backup.json. Each size runs in a fresh process so that peak
+RSS is reported per size.
+
+Usage (from the Backend directory):
+    python core/benchmark_core.py --sizes 1000,10000 --output bench.json
+    python core/benchmark_core.py --output new.json --compare bench.json
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bhx_transactions_backup.json")
+
+# Number of timed operations per benchmark (full-scan benchmarks use fewer)
+OPERATIONS = 1000
+SCAN_OPERATIONS = 5
+
+# Synthetic data shape: about 10 events per case and 5 per wallet
+EVENTS_PER_CASE = 10
+EVENTS_PER_WALLET = 5
+
+def load_seed_transactions(path: str = DEFAULT_SEED_FILE) -> List[Dict[str, Any]]:
+    """Load the transactions synthetic events are derived from."""
+    with open(path) as f:
+        return json.load(f)
+
+def synthetic_events(transactions: List[Dict[str, Any]], count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Generate case events modelled on real transactions.
+
+    Args:
+        transactions: Seed transactions (bhx_transactions_backup.json records)
+        count: Number of events to generate
+        seed: Random seed, so runs are comparable across commits
+
+    Returns:
+        Iterator of event dicts as stored by the orchestrator
+    """
+    rng = random.Random(seed)
+    cases = max(1, count // EVENTS_PER_CASE)
+    wallets = max(1, count // EVENTS_PER_WALLET)
+    for i in range(count):
+        tx = transactions[i % len(transactions)]
+        yield {
+            "coreEventId": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "caseId": f"case-{rng.randrange(cases)}",
+            "evidenceId": f"evidence-{i}",
+            "riskScore": rng.randrange(101),
+            "actionSuggested": rng.choice(["approve", "reject", "escalate", "review", "freeze"]),
+            "txHash": tx["tx_hash"] if tx.get("status") == "confirmed" else None,
+            "source": "benchmark",
+            "timestamp": datetime.fromtimestamp(tx["timestamp"] + rng.random()).isoformat(),
+            "metadata": {
+                "walletAddress": f"0x{tx['from_address'][:24]}{rng.randrange(wallets):08x}",
+                "amount": tx["amount"] * rng.choice([1, 10, 100, 1000]),
+                "token": tx.get("token")
+            }
+        }
+
+def measure(name: str, size: int, operation: Callable[[int], Any], operations: int) -> Dict[str, Any]:
+    """
+    Time an operation and summarize throughput and latency percentiles.
+
+    Args:
+        name: Benchmark name
+        size: Number of stored events
+        operation: Called with the operation number
+        operations: Number of timed calls
+
+    Returns:
+        Result record
+    """
+    latencies = []
+    clock = time.perf_counter_ns
+    cpu_started = time.process_time_ns()
+    started = clock()
+    for i in range(operations):
+        t0 = clock()
+        operation(i)
+        latencies.append(clock() - t0)
+    return summarize(name, size, latencies, clock() - started, time.process_time_ns() - cpu_started)
+
+async def measure_async(name: str, size: int, operation: Callable[[int], Any], operations: int) -> Dict[str, Any]:
+    """Async variant of measure() for coroutine operations."""
+    latencies = []
+    clock = time.perf_counter_ns
+    cpu_started = time.process_time_ns()
+    started = clock()
+    for i in range(operations):
+        t0 = clock()
+        await operation(i)
+        latencies.append(clock() - t0)
+    return summarize(name, size, latencies, clock() - started, time.process_time_ns() - cpu_started)
+
+def summarize(name: str, size: int, latencies: List[int], elapsed_ns: int, cpu_ns: int) -> Dict[str, Any]:
+    latencies.sort()
+    return {
+        "name": name,
+        "size": size,
+        "operations": len(latencies),
+        "seconds": round(elapsed_ns / 1e9, 6),
+        "throughput": round(len(latencies) / (elapsed_ns / 1e9), 2),
+        "p50_us": round(latencies[len(latencies) // 2] / 1e3, 2),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1e3, 2),
+        "cpu_us": round(cpu_ns / len(latencies) / 1e3, 2)
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def bench_orchestrator(size: int, events: List[Dict[str, Any]], new_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from core.orchestration.core_orchestrator import CoreOrchestrator
+    from core.orchestration.rules import OrchestrationRules
+    from core.storage.event_store import InMemoryEventStore
+
+    orchestrator = CoreOrchestrator(InMemoryEventStore())
+    orchestrator.events_storage.put_many(events)
+    for event in events:
+        orchestrator.wallet_index.load_event(event)
+
+    rules = OrchestrationRules()
+    return [
+        measure("process_event", size, lambda i: orchestrator.process_event(dict(new_events[i])), len(new_events)),
+        measure("detect_duplicate_wallets", size, lambda i: rules.detect_duplicate_wallets(events), SCAN_OPERATIONS)
+    ]
+
+def bench_memory(size: int, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Measure the memory retained per stored event with and without EventRecord.
+
+    Args:
+        size: Number of events to store
+        transactions: Seed transactions
+
+    Returns:
+        Bytes per event for both representations
+    """
+    from core.storage.event_record import EventRecord
+    from core.storage.event_store import InMemoryEventStore
+
+    def bytes_per_event(record_type) -> float:
+        collection = InMemoryEventStore().collection("events", "coreEventId", ["caseId"], record_type)
+        tracemalloc.start()
+        collection.put_many(dict(event, status="processed") for event in synthetic_events(transactions, size))
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return retained / size
+
+    dict_bytes = bytes_per_event(None)
+    record_bytes = bytes_per_event(EventRecord)
+    return {
+        "dict_bytes_per_event": round(dict_bytes, 1),
+        "record_bytes_per_event": round(record_bytes, 1),
+        "reduction": round(1 - record_bytes / dict_bytes, 3)
+    }
+
+def bench_recovery(size: int, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Measure WAL event store recovery: log replay only, and snapshot plus log tail.
+
+    Args:
+        size: Number of events to store
+        transactions: Seed transactions
+
+    Returns:
+        Write, snapshot and recovery times in seconds
+    """
+    from core.storage.event_record import EventRecord
+    from core.storage.wal_store import WALEventStore
+
+    directory = tempfile.mkdtemp(prefix="core-wal-bench-")
+    tail = max(size // 100, 1)
+
+    def open_events():
+        store = WALEventStore(directory, snapshot_every=0)
+        started = time.perf_counter()
+        events = store.collection("events", "coreEventId", ["caseId"], EventRecord)
+        return store, events, time.perf_counter() - started
+
+    try:
+        store, events, _ = open_events()
+        generated = synthetic_events(transactions, size + tail)
+        started = time.perf_counter()
+        for _ in range(0, size, 1000):
+            events.put_many(dict(next(generated), status="processed") for _ in range(min(1000, size - len(events))))
+        store.flush()
+        write_seconds = time.perf_counter() - started
+        store.close()
+
+        store, events, wal_replay_seconds = open_events()
+        started = time.perf_counter()
+        store.snapshot()
+        snapshot_seconds = time.perf_counter() - started
+        events.put_many(dict(event, status="processed") for event in generated)
+        store.close()
+
+        store, events, snapshot_recovery_seconds = open_events()
+        recovered = len(events)
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "events": recovered,
+        "tail_events": tail,
+        "wal_write_s": round(write_seconds, 3),
+        "wal_replay_s": round(wal_replay_seconds, 3),
+        "snapshot_s": round(snapshot_seconds, 3),
+        "snapshot_recovery_s": round(snapshot_recovery_seconds, 3)
+    }
+
+def generated_rules(count: int) -> Dict[str, Any]:
+    """Rule definitions shaped like production rules: thresholds, per-currency limits and action filters."""
+    actions = ["approve", "reject", "escalate", "review", "freeze"]
+    rules = []
+    for i in range(count):
+        conditions = [
+            {"field": "riskScore", "operator": ">=", "value": 40 + i % 60},
+            {"field": "metadata.amount", "operator": ">=", "value": 1000 * (1 + i % 25),
+             "per": "metadata.token", "limits": {"BHX": 500 * (1 + i % 25)}},
+            {"field": "actionSuggested", "operator": "in", "value": actions[i % 5:i % 5 + 2]}
+        ]
+        rules.append({"id": f"rule-{i}", "conditions": conditions[:1 + i % 3], "action": f"action-{i % 8}"})
+    return {"rules": rules}
+
+def bench_rules(size: int, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from core.orchestration.rule_engine import RulePlan, load_rule_definitions
+    from core.orchestration.rules import DEFAULT_RULES_FILE
+
+    results = []
+    for label, definitions in [("sample rules", load_rule_definitions(DEFAULT_RULES_FILE)),
+                               ("50 rules", generated_rules(50)), ("500 rules", generated_rules(500))]:
+        plan = RulePlan(definitions)
+        results.append(measure(f"rules.match ({label})", size, lambda i: plan.match(events[i % len(events)]),
+                               OPERATIONS * 10))
+    return results
+
+def bench_trace(size: int, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from core.orchestration.transaction_graph import TransactionGraph
+
+    # One transfer per stored event, from its wallet to another event's wallet
+    rng = random.Random(7)
+    graph = TransactionGraph()
+    for event in events:
+        graph.add_event({"timestamp": event["timestamp"], "txHash": event["txHash"], "metadata": dict(
+            event["metadata"], toAddress=events[rng.randrange(len(events))]["metadata"]["walletAddress"])})
+    graph.compact()
+    wallets = [events[rng.randrange(len(events))]["metadata"]["walletAddress"] for _ in range(OPERATIONS)]
+    return [measure("graph.trace (3 hops)", size, lambda i: graph.trace(wallets[i], max_hops=3), OPERATIONS)]
+
+async def bench_endpoints(size: int, events: List[Dict[str, Any]], new_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    import httpx
+    from core.events import codec, core_events, webhooks
+
+    core_events.events_storage.clear()
+    core_events.case_status_cache.clear()
+    core_events.idempotency_index.clear()
+    core_events.events_storage.put_many(dict(event, status="processed") for event in events)
+    for event in events[:OPERATIONS]:
+        webhooks.monitoring_events.append({
+            "eventId": event["coreEventId"],
+            "eventType": "event_processed",
+            "status": "success",
+            "timestamp": datetime.now().isoformat(),
+            "details": f"Processed event {event['coreEventId']}"
+        })
+
+    case_ids = [events[i % len(events)]["caseId"] for i in range(OPERATIONS)]
+    event_ids = [events[i % len(events)]["coreEventId"] for i in range(OPERATIONS)]
+
+    def case_status(i: int):
+        core_events.case_status_cache.clear()
+        return core_events.get_case_status(case_ids[i])
+
+    payloads = [{k: v for k, v in event.items() if k != "coreEventId"} for event in new_events]
+    results = [await measure_async("get_case_status", size, case_status, OPERATIONS)]
+
+    core_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=core_events.app), base_url="http://core")
+    webhook_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=webhooks.app), base_url="http://webhooks")
+    callbacks = [{"outcomeId": f"outcome-{i}", "caseId": case_ids[i], "eventType": "resolved",
+                  "result": {"approved": i % 2 == 0}, "timestamp": datetime.now().isoformat()} for i in range(OPERATIONS)]
+    fast_codec = codec.FAST_CODEC
+    async with core_client, webhook_client:
+        # Decoding and encoding endpoints run with and without the fast codec
+        for enabled in (True, False):
+            codec.FAST_CODEC = enabled
+            suffix = "" if enabled else " (CORE_FAST_CODEC=0)"
+            core_events.idempotency_index.clear()
+            results.append(await measure_async(
+                "POST /core/events" + suffix, size, lambda i: core_client.post("/core/events", json=payloads[i]),
+                len(payloads)))
+            results.append(await measure_async(
+                "POST /callbacks/{type}" + suffix, size,
+                lambda i: webhook_client.post("/callbacks/resolution", json=callbacks[i]), OPERATIONS))
+            results.append(await measure_async(
+                "GET /monitoring/events" + suffix, size,
+                lambda i: webhook_client.get("/monitoring/events", params={"limit": 100}), OPERATIONS))
+        codec.FAST_CODEC = fast_codec
+        # Every payload has been accepted above, so these are all retries
+        results.append(await measure_async(
+            "POST /core/events (retry)", size, lambda i: core_client.post("/core/events", json=payloads[i]),
+            len(payloads)))
+        results.append(await measure_async(
+            "GET /core/events/{id}", size, lambda i: core_client.get(f"/core/events/{event_ids[i]}"), OPERATIONS))
+        results.append(await measure_async(
+            "GET /core/case/{id}/status", size,
+            lambda i: core_client.get(f"/core/case/{case_ids[i]}/status"), OPERATIONS))
+    await core_events.work_queue.stop()
+    return results
+
+def run_size(size: int, seed_file: str) -> Dict[str, Any]:
+    """
+    Run every benchmark against one store size (in the current process).
+
+    Args:
+        size: Number of stored events
+        seed_file: Path to the seed transactions
+
+    Returns:
+        Result records and peak RSS for this size
+    """
+    transactions = load_seed_transactions(seed_file)
+    generated = list(synthetic_events(transactions, size + OPERATIONS))
+    events, new_events = generated[:size], generated[size:]
+
+    results = bench_orchestrator(size, events, new_events)
+    results += bench_rules(size, events)
+    results += bench_trace(size, events)
+    results += asyncio.run(bench_endpoints(size, events, new_events))
+    rss = peak_rss_mb()
+    del events, new_events, generated
+    return {"size": size, "peak_rss_mb": rss, "memory": bench_memory(size, transactions),
+            "recovery": bench_recovery(size, transactions), "results": results}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Find benchmarks that got slower than a baseline run.
+
+    Args:
+        current: Report from this run
+        baseline: Report from an earlier run
+        threshold: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        Human-readable regression descriptions
+    """
+    previous = {(r["name"], r["size"]): r for run in baseline["runs"] for r in run["results"]}
+    previous_memory = {run["size"]: run.get("memory") for run in baseline["runs"]}
+    previous_recovery = {run["size"]: run.get("recovery") for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        before = previous_memory.get(run["size"])
+        if before and run.get("memory"):
+            if run["memory"]["record_bytes_per_event"] > before["record_bytes_per_event"] * (1 + threshold):
+                regressions.append(f"memory @ {run['size']}: {before['record_bytes_per_event']} -> "
+                                   f"{run['memory']['record_bytes_per_event']} bytes per event")
+        before = previous_recovery.get(run["size"])
+        if before and run.get("recovery"):
+            if run["recovery"]["snapshot_recovery_s"] > before["snapshot_recovery_s"] * (1 + threshold):
+                regressions.append(f"recovery @ {run['size']}: {before['snapshot_recovery_s']} -> "
+                                   f"{run['recovery']['snapshot_recovery_s']} s")
+        for result in run["results"]:
+            before = previous.get((result["name"], result["size"]))
+            if before is None:
+                continue
+            if result["throughput"] < before["throughput"] * (1 - threshold):
+                regressions.append(f"{result['name']} @ {result['size']}: throughput "
+                                   f"{before['throughput']} -> {result['throughput']} ops/s")
+            if result["p99_us"] > before["p99_us"] * (1 + threshold):
+                regressions.append(f"{result['name']} @ {result['size']}: p99 "
+                                   f"{before['p99_us']} -> {result['p99_us']} us")
+    return regressions
+
+def main():
+    """Run the benchmarks and write the JSON report"""
+    parser = argparse.ArgumentParser(description="Benchmark the BHIV Core orchestration pipeline")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated numbers of stored events")
+    parser.add_argument("--seed-file", default=DEFAULT_SEED_FILE, help="Transactions synthetic events are based on")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown vs the baseline")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": []
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"Benchmarking with {size} stored events...")
+        # A fresh process per size keeps peak RSS and allocator state independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            run = pool.submit(run_size, size, args.seed_file).result()
+        report["runs"].append(run)
+        for r in run["results"]:
+            print(f"  {r['name']:<44} {r['throughput']:>10.1f} ops/s  p50 {r['p50_us']:>9.1f} us  "
+                  f"p99 {r['p99_us']:>9.1f} us  cpu {r['cpu_us']:>9.1f} us")
+        print(f"  peak RSS {run['peak_rss_mb']} MiB, {run['memory']['dict_bytes_per_event']} bytes per event "
+              f"as dicts, {run['memory']['record_bytes_per_event']} as EventRecord")
+        recovery = run["recovery"]
+        print(f"  recovery: WAL replay {recovery['wal_replay_s']} s, snapshot + {recovery['tail_events']} event "
+              f"tail {recovery['snapshot_recovery_s']} s (snapshot written in {recovery['snapshot_s']} s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    main()
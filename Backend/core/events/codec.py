@@ -0,0 +1,255 @@
+"""
+Request and Response Codec for BHIV Core System
+
+This module takes Pydantic model construction and FastAPI's generic response
+encoder off the hot endpoints. PayloadCodec reads a request body with orjson
+and validates it with a checker compiled once from the Pydantic model's fields
+(exact JSON types, bounds, defaults, unknown keys dropped), producing the same
+dict as model(**body).dict() without building the model. Anything the checker
+does not accept outright (coercions, errors, unusual content types) is handed
+to Pydantic, so accepted payloads and 422 responses are identical to a
+model-typed endpoint parameter. json_response() renders response content with
+orjson straight to bytes, skipping jsonable_encoder.
+
+Settings come from environment variables:
+- CORE_FAST_CODEC: set to 0 to validate with Pydantic and encode with FastAPI's defaults
+
+orjson is optional; without it bodies are parsed with the standard json module
+and responses are left to FastAPI.
+"""
+
+from typing import Dict, Any, Optional, Tuple, Type, Union, get_args, get_origin
+import email.message
+import json
+import logging
+import os
+import re
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+FAST_CODEC = os.environ.get("CORE_FAST_CODEC", "1").lower() not in ("0", "false", "no")
+
+_MISSING = object()
+
+_LONG_DIGITS = re.compile(rb"[0-9]{19}")
+
+# Exact JSON value types accepted for each supported field type; anything else goes to Pydantic
+_JSON_TYPES = {str: (str,), int: (int,), float: (float, int), bool: (bool,), dict: (dict,), list: (list,)}
+
+def _field_spec(name: str, field) -> Optional[Tuple]:
+    annotation = field.annotation
+    nullable = False
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation, nullable = args[0], True
+
+    # Dict[str, Any] and List[Any] pass through; typed containers need Pydantic
+    origin = get_origin(annotation)
+    if origin is not None:
+        args = get_args(annotation)
+        if origin is dict and args in ((str, Any),):
+            annotation = dict
+        elif origin is list and args == (Any,):
+            annotation = list
+        else:
+            return None
+    types = _JSON_TYPES.get(annotation)
+    if types is None or field.alias not in (None, name) or field.default_factory is not None:
+        return None
+
+    # Numeric bounds are the only constraints checked here
+    bounds = []
+    for constraint in field.metadata:
+        for attribute in ("ge", "gt", "le", "lt"):
+            value = getattr(constraint, attribute, None)
+            if value is not None:
+                bounds.append((attribute, value))
+                break
+        else:
+            return None
+    if bounds and annotation not in (int, float):
+        return None
+    default = _MISSING if field.is_required() else field.default
+    if isinstance(default, (dict, list)):
+        return None
+    return name, types, nullable, default, tuple(bounds), annotation is float
+
+def compile_validator(model: Type[BaseModel]):
+    """
+    Build a fast checker for the models whose fields are plain JSON types.
+
+    Args:
+        model: Pydantic model
+
+    Returns:
+        Function mapping a decoded body to the model's .dict() output, or to None when
+        Pydantic has to decide; None if the model uses anything the checker does not cover
+    """
+    fields = getattr(model, "model_fields", None)
+    config = getattr(model, "model_config", {})
+    if fields is None or config.get("extra") not in (None, "ignore") or config.get("strict"):
+        return None
+    specs = []
+    for name, field in fields.items():
+        spec = _field_spec(name, field)
+        if spec is None:
+            return None
+        specs.append(spec)
+
+    def validate(body: Any) -> Optional[Dict[str, Any]]:
+        if type(body) is not dict:
+            return None
+        data = {}
+        for name, types, nullable, default, bounds, to_float in specs:
+            value = body.get(name, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING:
+                    return None
+                value = default
+            elif value is None:
+                if not nullable:
+                    return None
+            elif type(value) not in types:
+                return None
+            elif bounds:
+                for attribute, limit in bounds:
+                    if not (value >= limit if attribute == "ge" else value > limit if attribute == "gt"
+                            else value <= limit if attribute == "le" else value < limit):
+                        return None
+            if to_float and value is not None:
+                value = float(value)
+            data[name] = value
+        return data
+
+    return validate
+
+class PayloadCodec:
+    """Decodes request bodies into validated payload dicts with a Pydantic model's rules."""
+
+    def __init__(self, model: Type[BaseModel], enabled: Optional[bool] = None):
+        self.model = model
+        # None follows CORE_FAST_CODEC (the module's FAST_CODEC)
+        self.enabled = enabled
+        self.fast_validate = compile_validator(model)
+        if self.fast_validate is None:
+            logger.info(f"{model.__name__} is validated by Pydantic only")
+
+    def validate(self, body: Any) -> Dict[str, Any]:
+        """
+        Validate a decoded body.
+
+        Args:
+            body: Decoded JSON value
+
+        Returns:
+            The payload as model(**body).dict() would return it
+
+        Raises:
+            ValidationError: If the body does not match the model
+        """
+        enabled = FAST_CODEC if self.enabled is None else self.enabled
+        if enabled and self.fast_validate is not None:
+            data = self.fast_validate(body)
+            if data is not None:
+                return data
+        return self.model.model_validate(body, from_attributes=True).model_dump()
+
+    async def read(self, request: Request) -> Dict[str, Any]:
+        """
+        Read and validate a request body, as a model-typed endpoint parameter would.
+
+        Args:
+            request: Incoming request
+
+        Returns:
+            Validated payload dict
+
+        Raises:
+            RequestValidationError: For invalid JSON or a body that does not match the model
+        """
+        body_bytes = await request.body()
+        body: Any = None
+        if body_bytes:
+            body = body_bytes
+            if _is_json(request.headers.get("content-type")):
+                body = _loads(body_bytes)
+        if body is None:
+            raise RequestValidationError(
+                [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}], body=None)
+        try:
+            return self.validate(body)
+        except ValidationError as e:
+            errors = [{**error, "loc": ("body",) + tuple(error["loc"])} for error in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+
+    def openapi_body(self) -> Dict[str, Any]:
+        """OpenAPI requestBody for routes that read the body through the codec."""
+        return {
+            "requestBody": {
+                "content": {"application/json": {"schema": self.model.model_json_schema()}},
+                "required": True
+            }
+        }
+
+def _is_json(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+def _loads(body_bytes: bytes) -> Any:
+    # orjson reads integers beyond 64 bits as floats; bodies that may hold one use the json module
+    if orjson is not None and _LONG_DIGITS.search(body_bytes) is None:
+        try:
+            return orjson.loads(body_bytes)
+        except orjson.JSONDecodeError:
+            # NaN literals and error positions follow the json module
+            pass
+    try:
+        return json.loads(body_bytes)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+              "input": {}, "ctx": {"error": e.msg}}],
+            body=e.doc
+        )
+
+def _default(value: Any) -> Any:
+    return jsonable_encoder(value)
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                  enabled: Optional[bool] = None) -> Any:
+    """
+    Render response content with orjson.
+
+    Args:
+        content: JSON-compatible content
+        status_code: Response status
+        headers: Extra response headers
+        enabled: Whether the fast codec is on; defaults to CORE_FAST_CODEC
+
+    Returns:
+        A JSON Response, or, when the codec is off and no headers are set, the content
+        itself for FastAPI to encode with the route's status code
+    """
+    if not (FAST_CODEC if enabled is None else enabled) or orjson is None:
+        if headers is None:
+            return content
+        return JSONResponse(jsonable_encoder(content), status_code=status_code, headers=headers)
+    return Response(orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+                    status_code=status_code, headers=headers, media_type="application/json")
@@ -5,16 +5,38 @@ This module handles event ingestion, orchestration, and blockchain reconciliatio
 for the BHIV Core system.
 """
 
-from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Header, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, Dict, Any, List, Iterable, Set
+from collections import OrderedDict
+import asyncio
 import uuid
 import json
+import os
 from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from core.orchestration.rules import (
+    orchestration_rules, evaluate_rules_batch, wallet_risk_exceeded, ESCALATE_ACTION, MULTISIG_ACTION
+)
+from core.storage.event_store import get_event_store
+from core.storage.event_record import EventRecord
+from core.storage.monitoring_log import get_monitoring_log, new_event_id, parse_time
+from core.storage.log_config import configure_logging
+from core.orchestration.core_orchestrator import core_orchestrator
+from core.orchestration.sharded_orchestrator import ShardedOrchestrator
+from core.orchestration.wallet_clusters import CLUSTER_PAGE_SIZE
+from core.events.work_queue import EventWorkQueue
+from core.events.codec import json_response
+from core.events.payloads import EventPayload, event_codec
+from core.events.monitoring_stream import MonitoringStream, stream_router
+from core.events.idempotency import IdempotencyIndex, idempotency_key, DEFAULT_CACHE_SIZE, DEFAULT_HISTORY
+from core.events.reconciliation import ReconciliationService, CONFIRMED, FAILED, PENDING, DEFAULT_CHAIN_FILE
+from core.orchestration.transaction_graph import TransactionGraph, load_transactions
+from core.orchestration.risk_propagation import WalletRiskScores
+from core.storage.metrics import metrics_registry, MetricsMiddleware, gauge_family, counter_family, CONTENT_TYPE
+
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -22,53 +44,275 @@ app = FastAPI(
     description="API for accepting case events and orchestrating higher-level flows",
     version="1.0.0"
 )
-
-class EventPayload(BaseModel):
-    """Payload for case events"""
-    caseId: str = Field(..., description="Unique identifier for the case")
-    evidenceId: str = Field(..., description="Identifier for the evidence associated with the case")
-    riskScore: float = Field(..., ge=0, le=100, description="Risk score for the case (0-100)")
-    actionSuggested: str = Field(..., enum=["approve", "reject", "escalate", "review", "freeze"], 
-                                description="Suggested action for the case")
-    txHash: Optional[str] = Field(None, description="Transaction hash on blockchain")
-    source: Optional[str] = Field(None, description="Source of the event")
-    metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata for the event")
+app.add_middleware(MetricsMiddleware, service="core_events")
 
 class EventResponse(BaseModel):
     """Response model for event acceptance"""
     coreEventId: str = Field(..., description="Unique identifier for the core event")
     status: str = Field("accepted", description="Status of the event")
     timestamp: str = Field(..., description="Timestamp when the event was accepted")
+    processedAt: Optional[str] = Field(None, description="Timestamp when orchestration finished")
+
+class BatchEventRequest(BaseModel):
+    """Request model for batch event ingestion"""
+    events: List[Dict[str, Any]] = Field(..., description="Case event payloads, validated individually")
+
+class BatchEventResult(BaseModel):
+    """Per-item result of batch event ingestion"""
+    index: int = Field(..., description="Position of the event in the request")
+    status: str = Field(..., description="accepted, duplicate or rejected")
+    coreEventId: Optional[str] = Field(None, description="Core event ID for accepted events, or the original one for duplicates")
+    autoEscalation: Optional[bool] = Field(None, description="Whether the auto-escalation rule matched")
+    multisigTrigger: Optional[bool] = Field(None, description="Whether the multisig freeze rule matched")
+    errors: Optional[List[Dict[str, Any]]] = Field(None, description="Validation errors for rejected events")
+
+class BatchEventResponse(BaseModel):
+    """Response model for batch event ingestion"""
+    accepted: int = Field(..., description="Number of accepted events")
+    rejected: int = Field(..., description="Number of rejected events")
+    timestamp: str = Field(..., description="Timestamp when the batch was accepted")
+    results: List[BatchEventResult] = Field(..., description="Per-item results in request order")
+    duplicates: int = Field(0, description="Number of retried events answered with their original coreEventId")
+
+# Maximum number of events accepted in one batch request
+MAX_BATCH_SIZE = 10000
+
+# Event storage (in-memory by default, SQLite when CORE_STORE_URL is set)
+event_store = get_event_store()
+events_storage = event_store.collection("events", "coreEventId", ["caseId"], EventRecord)
+
+# Maximum number of case reconciliation summaries kept in memory
+CASE_STATUS_CACHE_SIZE = 10000
+
+# Final reconciliation summaries per case (LRU), invalidated when the case receives a new event
+case_status_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Batched, cached txHash lookups against the chain (file-backed stub by default)
+reconciliation_service = ReconciliationService()
+
+# Case status entry per chain lookup result: (status, details, final)
+RECONCILIATION_OUTCOMES = {
+    CONFIRMED: ("verified", "Evidence anchor matches blockchain transaction", True),
+    FAILED: ("failed", "Blockchain transaction failed", True),
+    PENDING: ("pending", "Blockchain transaction not yet confirmed", False),
+}
+UNMATCHED_OUTCOME = ("mismatch", "Transaction hash not found on blockchain", False)
+
+def replay_stored_events(graph: TransactionGraph, risk: WalletRiskScores, events: Iterable[Dict[str, Any]],
+                         loaded_hashes: Set[str]) -> int:
+    """
+    Restore the transfers and wallet flags recorded by stored events, as at startup.
+
+    Args:
+        graph: Transfer graph already holding the transaction export
+        risk: Wallet risk scores to flag
+        events: Stored events
+        loaded_hashes: Lowercase txHashes already in the graph, which are not added twice
+
+    Returns:
+        Number of transfers added
+    """
+    added = 0
+    for event_data in events:
+        risk.add_event(event_data)
+        if event_data.get("status") != "processed":
+            continue
+        if (event_data.get("txHash") or "").lower() in loaded_hashes:
+            continue
+        if graph.add_event(event_data):
+            added += 1
+    graph.compact()
+    return added
+
+# Transfer graph for fund-flow traces: the transaction export plus transfers recorded by
+# processed events (including bulk imports), replayed from the store at startup
+chain_transactions = load_transactions(os.environ.get("CORE_CHAIN_FILE", DEFAULT_CHAIN_FILE))
+transaction_graph = TransactionGraph()
+transaction_graph.add_transactions(chain_transactions)
+
+# Wallet risk propagated over the graph from flagged events; escalation reads it through the rules
+wallet_risk = WalletRiskScores(transaction_graph)
+replay_stored_events(transaction_graph, wallet_risk, events_storage.values(),
+                     {str(record.get("tx_hash")).lower() for record in chain_transactions if record.get("tx_hash")})
+orchestration_rules.wallet_risk = wallet_risk
+
+# Seconds between wallet risk refreshes, run only when flags or transfers were added
+RISK_REFRESH_SECONDS = float(os.environ.get("CORE_RISK_REFRESH_SECONDS", 60))
+risk_refresh_task: Optional[asyncio.Task] = None
+
+# Maximum hops and transfers of one fund-flow trace
+MAX_TRACE_HOPS = 10
+MAX_TRACE_TRANSFERS = 10000
+
+# Maximum case IDs returned by one cluster lookup
+MAX_CLUSTER_PAGE_SIZE = 10000
+
+def invalidate_case_status(case_id: str) -> None:
+    """Drop the cached reconciliation summary for a case."""
+    case_status_cache.pop(case_id, None)
+
+def find_idempotent_event(key: str, event_data: Dict[str, Any]) -> Optional[str]:
+    """Find the stored event with an idempotency key through the caseId index."""
+    for stored in events_storage.find("caseId", event_data.get("caseId")):
+        if idempotency_key(stored) == key:
+            return stored["coreEventId"]
+    return None
+
+# Retried submissions are answered with the coreEventId of the first one
+idempotency_index = IdempotencyIndex(
+    find_idempotent_event,
+    cache_size=int(os.environ.get("CORE_IDEMPOTENCY_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+    history=int(os.environ.get("CORE_IDEMPOTENCY_HISTORY", DEFAULT_HISTORY))
+)
+for stored_event in events_storage.values():
+    idempotency_index.add(idempotency_key(stored_event), stored_event["coreEventId"])
 
-# In-memory storage for events (in production, this would be a database)
-events_storage = {}
+# Header marking a response that repeats an earlier submission's result
+REPLAY_HEADER = "Idempotent-Replayed"
 
-@app.post("/core/events", response_model=EventResponse, status_code=status.HTTP_202_ACCEPTED)
-async def accept_event(payload: EventPayload):
+def replayed_event_response(core_event_id: str):
+    """Build the 200 response returned for a retried event."""
+    stored = events_storage.get(core_event_id) or {}
+    return json_response({
+        "coreEventId": core_event_id,
+        "status": stored.get("status", "accepted"),
+        "timestamp": stored.get("timestamp"),
+        "processedAt": stored.get("processedAt")
+    }, status_code=status.HTTP_200_OK, headers={REPLAY_HEADER: "true"})
+
+# Seconds clients are asked to wait when the work queue is full
+RETRY_AFTER_SECONDS = 1
+
+# Orchestrate in CORE_ORCHESTRATOR_SHARDS worker processes instead of in-process when set
+ORCHESTRATOR_SHARDS = int(os.environ.get("CORE_ORCHESTRATOR_SHARDS", 0))
+orchestrator = ShardedOrchestrator(ORCHESTRATOR_SHARDS) if ORCHESTRATOR_SHARDS > 0 else core_orchestrator
+
+# Transfers of the chain export link wallets into clusters even when no event records them
+linked_transactions = orchestrator.add_transactions(chain_transactions)
+if linked_transactions:
+    logger.info(f"Linked {linked_transactions} chain transactions into wallet clusters")
+
+# Monitoring log shared with the orchestrator and the webhooks service
+monitoring_log = get_monitoring_log()
+
+# Cross-case alerts are logged here, so this service streams them on GET /monitoring/stream
+monitoring_stream = MonitoringStream(monitoring_log)
+app.include_router(stream_router(monitoring_stream))
+
+def process_queued_event(event_data: Dict[str, Any]) -> None:
+    """Run a queued event through the orchestrator, recording processing and final status."""
+    process_queued_events([event_data])
+
+def process_queued_events(events: List[Dict[str, Any]]) -> None:
+    """Run queued events through the orchestrator in one batch, recording processing and final status."""
+    events = [dict(event_data, status="processing") for event_data in events]
+    events_storage.put_many(events)
+    
+    results = orchestrator.process_events(events)
+    for event_data, result in zip(events, results):
+        record_result(event_data, result)
+
+def record_result(event_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Store an event's orchestration result and feed the graph, wallet risk and alert log."""
+    event_data["status"] = result["status"]
+    event_data["processedAt"] = result.get("processedAt")
+    event_data["actionsTriggered"] = result.get("actionsTriggered", [])
+    events_storage.put(event_data)
+    if result["status"] == "processed":
+        if transaction_graph.add_event(event_data):
+            wallet_risk.dirty = True
+        wallet_risk.add_event(event_data)
+    
+    # Alerts go to the monitoring log, which feeds GET /monitoring/stream
+    for alert in result.get("crossCaseAlerts", []):
+        monitoring_log.append({
+            "eventId": new_event_id(),
+            "eventType": "cross_case_alert",
+            "status": "alert",
+            "timestamp": result["processedAt"],
+            "details": alert.get("details"),
+            "coreEventId": result["coreEventId"],
+            "alert": alert
+        })
+
+# Accepted events are orchestrated by background consumers, off the request path; each
+# consumer takes up to CORE_EVENT_BATCH_SIZE waiting events per orchestrator call
+work_queue = EventWorkQueue(
+    process_queued_event,
+    consumers=int(os.environ.get("CORE_EVENT_CONSUMERS", 1)),
+    maxsize=int(os.environ.get("CORE_EVENT_QUEUE_SIZE", 10000)),
+    process_batch=process_queued_events,
+    batch_size=int(os.environ.get("CORE_EVENT_BATCH_SIZE", 100))
+)
+
+# Stored statuses of events accepted but not yet orchestrated, e.g. before a crash or a
+# shutdown that timed out; they are queued again at startup
+UNFINISHED_STATUSES = ("queued", "processing")
+requeue_task: Optional[asyncio.Task] = None
+
+def find_unfinished_events(events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Get the stored events whose orchestration never finished."""
+    return [event_data for event_data in events if event_data.get("status") in UNFINISHED_STATUSES]
+
+async def requeue_events(events: List[Dict[str, Any]]) -> None:
+    """Put unfinished events back on the work queue, waiting for room as consumers drain it."""
+    for event_data in events:
+        await work_queue.put(event_data)
+    logger.info(f"Re-queued {len(events)} unfinished events")
+
+def queue_full_error() -> HTTPException:
+    """Build the 429 response returned when the work queue cannot take more events."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Event queue is full, retry later",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+@app.post("/core/events", response_model=EventResponse, status_code=status.HTTP_202_ACCEPTED,
+          openapi_extra=event_codec.openapi_body())
+async def accept_event(request: Request, idempotency_key_header: Optional[str] = Header(
+        None, alias="Idempotency-Key", description="Client key identifying retries of one submission")):
     """
     Accept case events for processing.
     
-    Returns 202 Accepted with coreEventId.
+    Returns 202 Accepted with coreEventId once the event is stored and queued
+    for orchestration, or 429 with Retry-After when the queue is full. A retry
+    (same Idempotency-Key, or without one the same caseId, evidenceId and
+    txHash) returns 200 with the original coreEventId and is not stored again.
     """
+    event_data = await event_codec.read(request)
+    key = idempotency_key(event_data, idempotency_key_header)
+    original_event_id = idempotency_index.get(key, event_data)
+    if original_event_id is not None:
+        return replayed_event_response(original_event_id)
+    if not work_queue.free_slots():
+        raise queue_full_error()
+    
     try:
         # Generate a unique core event ID
         core_event_id = str(uuid.uuid4())
         
         # Store the event with timestamp
-        event_data = payload.dict()
         event_data["coreEventId"] = core_event_id
         event_data["timestamp"] = datetime.now().isoformat()
+        event_data["status"] = "queued"
+        if idempotency_key_header:
+            event_data["idempotencyKey"] = idempotency_key_header
         
-        # Store in memory (in production, store in database)
-        events_storage[core_event_id] = event_data
+        # Store the event and queue it for orchestration
+        events_storage.put(event_data)
+        idempotency_index.add(key, core_event_id)
+        invalidate_case_status(event_data["caseId"])
+        work_queue.submit(event_data)
         
-        logger.info(f"Accepted event with coreEventId: {core_event_id}")
+        logger.debug("Accepted event with coreEventId: %s", core_event_id)
         
-        return EventResponse(
-            coreEventId=core_event_id,
-            status="accepted",
-            timestamp=event_data["timestamp"]
-        )
+        return json_response({
+            "coreEventId": core_event_id,
+            "status": "accepted",
+            "timestamp": event_data["timestamp"],
+            "processedAt": None
+        }, status_code=status.HTTP_202_ACCEPTED)
     except Exception as e:
         logger.error(f"Error accepting event: {str(e)}")
         raise HTTPException(
@@ -76,10 +320,98 @@ async def accept_event(payload: EventPayload):
             detail=f"Failed to accept event: {str(e)}"
         )
 
+@app.post("/core/events:batch", response_model=BatchEventResponse, status_code=status.HTTP_202_ACCEPTED)
+async def accept_events_batch(request: BatchEventRequest):
+    """
+    Accept many case events in one request.
+    
+    Each event is validated against EventPayload on its own, so invalid items
+    are reported in the per-item results without rejecting the batch. The
+    orchestration rules are evaluated over the whole batch at once.
+    """
+    if len(request.events) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds maximum of {MAX_BATCH_SIZE} events"
+        )
+    
+    try:
+        timestamp = datetime.now().isoformat()
+        results: List[Optional[BatchEventResult]] = [None] * len(request.events)
+        accepted_indexes = []
+        accepted_events = []
+        # Keys accepted earlier in this batch, so repeated items are duplicates too
+        batch_keys: Dict[str, str] = {}
+        duplicates = 0
+        
+        for index, item in enumerate(request.events):
+            try:
+                event_data = event_codec.validate(item)
+            except ValidationError as e:
+                results[index] = BatchEventResult(index=index, status="rejected", errors=json.loads(e.json()))
+                continue
+            
+            key = idempotency_key(event_data)
+            original_event_id = batch_keys.get(key) or idempotency_index.get(key, event_data)
+            if original_event_id is not None:
+                results[index] = BatchEventResult(index=index, status="duplicate", coreEventId=original_event_id)
+                duplicates += 1
+                continue
+            
+            event_data["coreEventId"] = batch_keys[key] = str(uuid.uuid4())
+            event_data["timestamp"] = timestamp
+            event_data["status"] = "queued"
+            accepted_indexes.append(index)
+            accepted_events.append(event_data)
+        
+        matched = evaluate_rules_batch(accepted_events)
+        no_match = [False] * len(accepted_events)
+        escalations = matched[ESCALATE_ACTION].tolist() if ESCALATE_ACTION in matched else no_match
+        escalations = [escalate or wallet_risk_exceeded(event_data)
+                       for escalate, event_data in zip(escalations, accepted_events)]
+        multisig_triggers = matched[MULTISIG_ACTION].tolist() if MULTISIG_ACTION in matched else no_match
+        
+        if len(accepted_events) > work_queue.free_slots():
+            raise queue_full_error()
+        
+        events_storage.put_many(accepted_events)
+        for event_data in accepted_events:
+            idempotency_index.add(idempotency_key(event_data), event_data["coreEventId"])
+            work_queue.submit(event_data)
+        for case_id in {event_data["caseId"] for event_data in accepted_events}:
+            invalidate_case_status(case_id)
+        for i, event_data in enumerate(accepted_events):
+            results[accepted_indexes[i]] = BatchEventResult(
+                index=accepted_indexes[i],
+                status="accepted",
+                coreEventId=event_data["coreEventId"],
+                autoEscalation=escalations[i],
+                multisigTrigger=multisig_triggers[i]
+            )
+        
+        rejected = len(request.events) - len(accepted_events) - duplicates
+        logger.info(f"Accepted batch of {len(accepted_events)} events ({rejected} rejected, {duplicates} duplicates)")
+        
+        return BatchEventResponse(
+            accepted=len(accepted_events),
+            rejected=rejected,
+            timestamp=timestamp,
+            results=results,
+            duplicates=duplicates
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error accepting event batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to accept event batch: {str(e)}"
+        )
+
 @app.get("/core/events/{core_event_id}", response_model=EventResponse)
 async def get_event_status(core_event_id: str):
     """
-    Get the status of a specific event.
+    Get the status of a specific event: queued, processing, processed or error.
     """
     if core_event_id not in events_storage:
         raise HTTPException(
@@ -90,8 +422,9 @@ async def get_event_status(core_event_id: str):
     event_data = events_storage[core_event_id]
     return EventResponse(
         coreEventId=event_data["coreEventId"],
-        status="accepted",
-        timestamp=event_data["timestamp"]
+        status=event_data.get("status", "accepted"),
+        timestamp=event_data["timestamp"],
+        processedAt=event_data.get("processedAt")
     )
 
 @app.get("/core/case/{case_id}/status")
@@ -101,11 +434,13 @@ async def get_case_status(case_id: str):
     
     Returns reconciliation status between core ledger and blockchain.
     """
-    # Find events for this case
-    case_events = [
-        event for event in events_storage.values() 
-        if event.get("caseId") == case_id
-    ]
+    cached = case_status_cache.get(case_id)
+    if cached is not None:
+        case_status_cache.move_to_end(case_id)
+        return cached
+    
+    # Find events for this case through the caseId index
+    case_events = events_storage.find("caseId", case_id)
     
     if not case_events:
         raise HTTPException(
@@ -113,18 +448,25 @@ async def get_case_status(case_id: str):
             detail="Case not found"
         )
     
-    # For each event, check if txHash matches blockchain
+    # One batched lookup for every txHash of the case
+    chain_results = await reconciliation_service.reconcile(
+        event["txHash"] for event in case_events if event.get("txHash")
+    )
+    
     reconciliation_results = []
+    final = True
     for event in case_events:
         tx_hash = event.get("txHash")
         if tx_hash:
-            # In a real implementation, we would verify against blockchain
-            # For now, we'll simulate a successful verification
+            chain_result = chain_results[tx_hash]
+            result_status, details, is_final = RECONCILIATION_OUTCOMES.get(chain_result["status"], UNMATCHED_OUTCOME)
+            final = final and is_final
             reconciliation_results.append({
                 "evidenceId": event["evidenceId"],
                 "txHash": tx_hash,
-                "status": "verified",
-                "details": "Evidence anchor matches blockchain transaction"
+                "status": result_status,
+                "details": details,
+                "blockNumber": chain_result.get("blockNumber")
             })
         else:
             reconciliation_results.append({
@@ -134,11 +476,172 @@ async def get_case_status(case_id: str):
                 "details": "No blockchain transaction hash provided"
             })
     
-    return {
+    case_status = {
         "caseId": case_id,
         "reconciliation": reconciliation_results,
         "overallStatus": "ok" if all(r["status"] == "verified" for r in reconciliation_results) else "mismatch"
     }
+    
+    # Summaries waiting on the chain are rebuilt on the next request (from the lookup cache)
+    if final:
+        case_status_cache[case_id] = case_status
+        if len(case_status_cache) > CASE_STATUS_CACHE_SIZE:
+            case_status_cache.popitem(last=False)
+    
+    return case_status
+
+@app.get("/core/case/{case_id}/cluster")
+async def get_case_cluster(
+    case_id: str,
+    offset: int = Query(0, ge=0, description="Index of the first case ID returned"),
+    limit: int = Query(CLUSTER_PAGE_SIZE, ge=1, le=MAX_CLUSTER_PAGE_SIZE, description="Maximum number of case IDs returned")
+):
+    """
+    Get the cluster of cases linked to a case through shared wallets and transfers.
+    """
+    cluster = orchestrator.get_cluster(case_id=case_id, offset=offset, limit=limit)
+    if cluster is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Case not found in wallet clusters"
+        )
+    return cluster
+
+@app.get("/core/wallet/{wallet_address}/cluster")
+async def get_wallet_cluster(
+    wallet_address: str,
+    offset: int = Query(0, ge=0, description="Index of the first case ID returned"),
+    limit: int = Query(CLUSTER_PAGE_SIZE, ge=1, le=MAX_CLUSTER_PAGE_SIZE, description="Maximum number of case IDs returned")
+):
+    """
+    Get the cluster of cases linked to a wallet through events and transfers.
+    """
+    cluster = orchestrator.get_cluster(wallet_address=wallet_address, offset=offset, limit=limit)
+    if cluster is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found in wallet clusters"
+        )
+    return cluster
+
+@app.get("/core/wallet/{wallet_address}/trace")
+async def trace_wallet_funds(
+    wallet_address: str,
+    hops: int = Query(3, ge=1, le=MAX_TRACE_HOPS, description="Maximum number of transfers from the wallet"),
+    hours: Optional[float] = Query(None, gt=0, description="Only follow transfers within this many hours of the start"),
+    since: Optional[str] = Query(None, description="Start time (ISO timestamp or epoch seconds); defaults to the wallet's first transfer"),
+    min_amount: float = Query(0, ge=0, description="Ignore transfers smaller than this"),
+    limit: int = Query(1000, ge=1, le=MAX_TRACE_TRANSFERS, description="Maximum number of transfers returned")
+):
+    """
+    Trace where funds from a wallet went, following transfers forward in time.
+    """
+    start_time = None
+    if since is not None:
+        try:
+            start_time = float(since) if since.replace(".", "", 1).isdigit() else parse_time(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="since must be an ISO timestamp or epoch seconds"
+            )
+    
+    trace = transaction_graph.trace(
+        wallet_address,
+        max_hops=hops,
+        window_seconds=hours * 3600 if hours is not None else None,
+        start_time=start_time,
+        min_amount=min_amount,
+        limit=limit
+    )
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found in transaction graph"
+        )
+    return json_response(trace)
+
+@app.get("/core/wallet/{wallet_address}/risk")
+async def get_wallet_risk(wallet_address: str):
+    """
+    Get the risk score of a wallet, propagated from flagged wallets over transfers.
+    """
+    risk = wallet_risk.get_wallet_risk(wallet_address)
+    if risk is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found"
+        )
+    return risk
+
+async def refresh_wallet_risk():
+    """Recompute wallet risk off the event loop at startup and whenever it went stale."""
+    loop = asyncio.get_running_loop()
+    while True:
+        if wallet_risk.dirty or wallet_risk.updated_at is None:
+            try:
+                await loop.run_in_executor(None, wallet_risk.refresh)
+            except Exception as e:
+                logger.error(f"Wallet risk refresh failed: {str(e)}")
+        await asyncio.sleep(RISK_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_work_queue():
+    """Set up logging, start the orchestration consumers and the wallet risk refresh, and re-queue unfinished events."""
+    global risk_refresh_task, requeue_task
+    configure_logging()
+    work_queue.start()
+    if risk_refresh_task is None or risk_refresh_task.done():
+        risk_refresh_task = asyncio.create_task(refresh_wallet_risk())
+    unfinished = find_unfinished_events(events_storage.values())
+    if unfinished:
+        requeue_task = asyncio.create_task(requeue_events(unfinished))
+
+@app.on_event("shutdown")
+async def flush_event_store():
+    """Drain queued events, stop orchestrator shards and persist buffered event writes on shutdown."""
+    if risk_refresh_task is not None:
+        risk_refresh_task.cancel()
+    # Events not re-queued yet keep their stored status and are re-queued on the next start
+    if requeue_task is not None:
+        requeue_task.cancel()
+    await work_queue.stop()
+    if orchestrator is not core_orchestrator:
+        orchestrator.shutdown()
+    event_store.flush()
+
+def collect_metrics():
+    """Read queue, storage, alert and reconciliation figures at scrape time."""
+    alerts = orchestrator.get_alert_stats()["byType"]
+    reconciliation = reconciliation_service.stats()
+    idempotency = idempotency_index.stats()
+    return [
+        gauge_family("core_event_queue_depth", "Accepted events waiting for orchestration",
+                     [({}, work_queue.depth())]),
+        gauge_family("core_events_stored", "Events in the event store", [({}, len(events_storage))]),
+        gauge_family("core_transaction_graph_transfers", "Transfers in the fund-flow graph",
+                     [({}, transaction_graph.edge_count())]),
+        gauge_family("core_wallet_risk_flagged", "Wallets flagged as risk seeds", [({}, len(wallet_risk))]),
+        gauge_family("core_case_status_cached", "Case reconciliation summaries cached",
+                     [({}, len(case_status_cache))]),
+        counter_family("core_alerts_emitted", "Cross-case alerts emitted by type",
+                       [({"type": t}, counts["emitted"]) for t, counts in alerts.items()]),
+        counter_family("core_alerts_suppressed", "Repeated cross-case alerts suppressed by type",
+                       [({"type": t}, counts["suppressed"]) for t, counts in alerts.items()]),
+        counter_family("core_reconciliation_lookups", "Transaction hash lookups by cache result",
+                       [({"result": "hit"}, reconciliation["hits"]), ({"result": "miss"}, reconciliation["misses"])]),
+        counter_family("core_reconciliation_batches", "Chain round-trips for reconciliation",
+                       [({}, reconciliation["batches"])]),
+        counter_family("core_idempotent_replays", "Retried events answered with their original coreEventId",
+                       [({"source": "cache"}, idempotency["cacheHits"]), ({"source": "store"}, idempotency["lookupHits"])]),
+        counter_family("core_idempotency_false_positives", "Bloom filter hits for new idempotency keys",
+                       [({}, idempotency["falsePositives"])])
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render([collect_metrics]), media_type=CONTENT_TYPE)
 
 @app.get("/health")
 async def health_check():
@@ -147,7 +650,9 @@ async def health_check():
         "status": "healthy",
         "service": "BHIV Core Events API",
         "version": "1.0.0",
-        "events_count": len(events_storage)
+        "events_count": len(events_storage),
+        "queue_depth": work_queue.depth(),
+        "alerts": orchestrator.get_alert_stats()
     }
 
 if __name__ == "__main__":
@@ -166,8 +671,15 @@ if __name__ == "__main__":
     print(f" API Documentation: http://{args.host}:{args.port}/docs")
     print("\n Endpoints:")
     print("   POST /core/events - Accept case events")
+    print("   POST /core/events:batch - Accept a batch of case events")
     print("   GET /core/events/{core_event_id} - Get event status")
     print("   GET /core/case/{case_id}/status - Get case reconciliation status")
+    print("   GET /core/case/{case_id}/cluster - Get the cluster of linked cases")
+    print("   GET /core/wallet/{wallet_address}/cluster - Get the cluster of a wallet")
+    print("   GET /core/wallet/{wallet_address}/trace - Trace funds out of a wallet")
+    print("   GET /core/wallet/{wallet_address}/risk - Get propagated wallet risk")
+    print("   GET /monitoring/stream - Stream cross-case alerts and monitoring events (SSE or NDJSON)")
+    print("   GET /metrics - Prometheus metrics")
     print("   GET /health - Health check")
     print("="*60)
     
@@ -0,0 +1,259 @@
+"""
+Webhook Delivery Engine for BHIV Core System
+
+This module delivers outcomes to external HTTP destinations from inside the
+FastAPI apps. Deliveries are queued without blocking the request path and sent
+by asyncio workers over a shared, pooled HTTP client. Each destination (scheme,
+host and port) has its own queue, drained by as many workers as its concurrency
+limit, so a slow destination only holds up its own deliveries; a shared limit
+caps the requests in flight across destinations. Failed attempts are
+retried with exponential backoff and full jitter; deliveries that exhaust their
+attempts or are rejected outright are written to a dead-letter collection, which
+the /monitoring/replay endpoints drain.
+
+Destinations are configured with the CORE_WEBHOOK_DESTINATIONS environment
+variable (comma-separated URLs).
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Set
+from urllib.parse import urlsplit
+from datetime import datetime
+import asyncio
+import logging
+import os
+import random
+import uuid
+
+import httpx
+
+from core.storage.event_store import EventCollection, InMemoryEventStore
+
+logger = logging.getLogger(__name__)
+
+def configured_destinations() -> List[str]:
+    """Get the destination URLs from CORE_WEBHOOK_DESTINATIONS."""
+    value = os.environ.get("CORE_WEBHOOK_DESTINATIONS", "")
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+class DeliveryEngine:
+    """Asynchronous outbound webhook delivery with retries, backoff and a dead-letter store."""
+
+    def __init__(self, dead_letters: Optional[EventCollection] = None, workers: int = 16,
+                 queue_size: int = 10000, per_destination_limit: int = 4, max_attempts: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 30.0, timeout: float = 10.0,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        if dead_letters is None:
+            dead_letters = InMemoryEventStore().collection("dead_letters", "deliveryId", ["messageId", "destination"])
+        self.dead_letters = dead_letters
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.per_destination_limit = per_destination_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.on_result = on_result
+
+        self.client: Optional[httpx.AsyncClient] = None
+        # Destination origin -> its queue, each drained by per_destination_limit workers
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.workers: List[asyncio.Task] = []
+        self.retries: Set[asyncio.Task] = set()
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    def start(self) -> None:
+        """Start the HTTP client on the running event loop; destination workers start on first use."""
+        loop = asyncio.get_running_loop()
+        if self.client is not None and self.loop is loop:
+            return
+        self.loop = loop
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        self.queues = {}
+        self.workers = []
+        self.slots = asyncio.Semaphore(self.worker_count)
+        logger.info(f"Delivery engine started with {self.worker_count} concurrent deliveries")
+
+    def submit(self, destination: str, payload: Dict[str, Any], message_id: Optional[str] = None) -> bool:
+        """
+        Queue a delivery without waiting for it.
+
+        Args:
+            destination: URL to POST the payload to
+            payload: JSON body
+            message_id: Webhook message ID the delivery belongs to
+
+        Returns:
+            True if queued, False if the queue is full (the delivery is dead-lettered)
+        """
+        self.start()
+        delivery = {
+            "deliveryId": str(uuid.uuid4()),
+            "messageId": message_id,
+            "destination": destination,
+            "payload": payload,
+            "attempts": 0,
+            "lastError": None
+        }
+        try:
+            self._queue_for(destination).put_nowait(delivery)
+            return True
+        except asyncio.QueueFull:
+            self._dead_letter(delivery, "Delivery queue full")
+            return False
+
+    def redeliver(self, delivery_id: str) -> bool:
+        """
+        Move a dead letter back onto the delivery queue for one more attempt. It
+        keeps its deliveryId, attempts and lastError, and stays a dead letter
+        until it has been queued.
+
+        Args:
+            delivery_id: Dead letter to re-submit
+
+        Returns:
+            True if it was found and queued, False if missing or its destination's queue is full
+        """
+        dead_letter = self.dead_letters.get(delivery_id)
+        if dead_letter is None:
+            return False
+        self.start()
+        delivery = {key: value for key, value in dead_letter.items() if key != "failedAt"}
+        try:
+            self._queue_for(delivery["destination"]).put_nowait(delivery)
+        except asyncio.QueueFull:
+            return False
+        self.dead_letters.delete(delivery_id)
+        return True
+
+    def drain_dead_letters(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Re-submit dead letters, oldest first. Dead letters whose destination's
+        queue is full are left in place.
+
+        Args:
+            limit: Maximum number of dead letters to re-submit
+
+        Returns:
+            IDs of the re-submitted dead letters
+        """
+        drained = []
+        for dead_letter in list(self.dead_letters.values()):
+            if limit is not None and len(drained) >= limit:
+                break
+            if self.redeliver(dead_letter["deliveryId"]):
+                drained.append(dead_letter["deliveryId"])
+        return drained
+
+    async def join(self) -> None:
+        """Wait until every queued delivery and scheduled retry has finished."""
+        while self.client is not None:
+            for queue in list(self.queues.values()):
+                await queue.join()
+            if not self.retries and all(queue.empty() for queue in self.queues.values()):
+                return
+            await asyncio.gather(*list(self.retries), return_exceptions=True)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain queued deliveries (up to timeout), then stop the workers and close the client."""
+        if self.client is None:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Delivery engine stopped with {self.pending()} deliveries pending")
+        for task in list(self.retries) + self.workers:
+            task.cancel()
+        await asyncio.gather(*self.retries, *self.workers, return_exceptions=True)
+        await self.client.aclose()
+        self.workers = []
+        self.retries = set()
+        self.queues = {}
+        self.slots = None
+        self.client = None
+        self.loop = None
+
+    def pending(self) -> int:
+        """Number of deliveries queued or waiting to retry."""
+        return sum(queue.qsize() for queue in self.queues.values()) + len(self.retries)
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt: exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempts - 1))))
+
+    def _queue_for(self, destination: str) -> asyncio.Queue:
+        parts = urlsplit(destination)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        queue = self.queues.get(origin)
+        if queue is None:
+            queue = self.queues[origin] = asyncio.Queue(maxsize=self.queue_size)
+            self.workers.extend(asyncio.ensure_future(self._worker(queue))
+                                for _ in range(self.per_destination_limit))
+        return queue
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            delivery = await queue.get()
+            try:
+                await self._attempt(delivery)
+            except Exception as e:
+                logger.error(f"Unexpected delivery error for {delivery['deliveryId']}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def _attempt(self, delivery: Dict[str, Any]) -> None:
+        destination = delivery["destination"]
+        delivery["attempts"] += 1
+        retryable = True
+        async with self.slots:
+            try:
+                response = await self.client.post(destination, json=delivery["payload"])
+                if response.status_code < 300:
+                    self.delivered += 1
+                    self._report(delivery, "delivered", f"Delivered to {destination}")
+                    return
+                error = f"HTTP {response.status_code}"
+                retryable = response.status_code >= 500 or response.status_code in (408, 429)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+
+        delivery["lastError"] = error
+        if retryable and delivery["attempts"] < self.max_attempts:
+            self.retried += 1
+            task = asyncio.ensure_future(self._retry_later(delivery, self.backoff(delivery["attempts"])))
+            self.retries.add(task)
+            task.add_done_callback(self.retries.discard)
+        else:
+            self._dead_letter(delivery, error)
+
+    async def _retry_later(self, delivery: Dict[str, Any], delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self._queue_for(delivery["destination"]).put_nowait(delivery)
+        except asyncio.QueueFull:
+            self._dead_letter(delivery, "Delivery queue full")
+
+    def _dead_letter(self, delivery: Dict[str, Any], error: str) -> None:
+        self.dead_lettered += 1
+        dead_letter = dict(delivery, lastError=error, failedAt=datetime.now().isoformat())
+        self.dead_letters.put(dead_letter)
+        logger.warning(f"Delivery {delivery['deliveryId']} to {delivery['destination']} dead-lettered: {error}")
+        self._report(delivery, "dead_lettered", f"Delivery to {delivery['destination']} failed after "
+                                                f"{delivery['attempts']} attempts: {error}")
+
+    def _report(self, delivery: Dict[str, Any], status: str, details: str) -> None:
+        if self.on_result is not None:
+            self.on_result({
+                "eventId": str(uuid.uuid4()),
+                "eventType": "delivery",
+                "status": status,
+                "timestamp": datetime.now().isoformat(),
+                "details": f"{details} (delivery {delivery['deliveryId']}, message {delivery.get('messageId')})"
+            })
@@ -0,0 +1,175 @@
+"""
+Idempotent Ingestion for BHIV Core System
+
+This module recognizes retried event submissions so they return the original
+coreEventId instead of storing the evidence again. An event's idempotency key
+is the client's Idempotency-Key header when one is sent, and otherwise its
+(caseId, evidenceId, txHash).
+
+IdempotencyIndex answers "was this key accepted before" in O(1) with fixed
+memory:
+
+- the most recently accepted keys are held with their coreEventId in an LRU
+  map of cache_size entries, so ordinary retries are answered from memory
+- every accepted key is also added to a Bloom filter, which remembers a much
+  longer history at about 10 bits per key. A key the filter has not seen is
+  certainly new and costs no store lookup; a key it may have seen is resolved
+  through the event store's caseId index, and a false positive (1% by
+  default) costs only that lookup
+- the filter is rotated when it holds `history` keys: the previous generation
+  is dropped and a fresh one started, so memory stays capped however many
+  keys pass through, and keys are remembered for at least `history` accepts
+"""
+
+from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+import hashlib
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Keys held with their coreEventId, and keys per Bloom filter generation
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_HISTORY = 1000000
+
+# Bloom filter false positive rate at full capacity
+DEFAULT_ERROR_RATE = 0.01
+
+def idempotency_key(event: Dict[str, Any], header: Optional[str] = None) -> str:
+    """
+    Get the idempotency key of an event.
+
+    Args:
+        event: Event data containing caseId, evidenceId and txHash
+        header: Idempotency-Key header value, if the client sent one
+
+    Returns:
+        Key string; header keys and payload keys never collide
+    """
+    header = header or event.get("idempotencyKey")
+    if header:
+        return f"key:{header}"
+    return f"event:{event.get('caseId')}\x1f{event.get('evidenceId')}\x1f{event.get('txHash') or ''}"
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys."""
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, key: str) -> None:
+        """Add a key."""
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+class IdempotencyIndex:
+    """Bounded index of accepted idempotency keys: an LRU of recent keys over rotating Bloom filters."""
+
+    def __init__(self, lookup: Optional[Callable[[str, Dict[str, Any]], Optional[str]]] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE, history: int = DEFAULT_HISTORY,
+                 error_rate: float = DEFAULT_ERROR_RATE):
+        # Resolves a key the Bloom filters may have seen to its stored coreEventId
+        self.lookup = lookup
+        self.cache_size = cache_size
+        self.history = history
+        self.error_rate = error_rate
+
+        self.recent: "OrderedDict[str, str]" = OrderedDict()
+        self.current = BloomFilter(history, error_rate)
+        self.previous: Optional[BloomFilter] = None
+
+        self.cache_hits = 0
+        self.lookup_hits = 0
+        self.false_positives = 0
+        self.rotations = 0
+
+    def get(self, key: str, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the coreEventId an idempotency key was accepted with.
+
+        Args:
+            key: Idempotency key (see idempotency_key)
+            event: The submitted event, passed to the lookup on Bloom filter hits
+
+        Returns:
+            The original coreEventId, or None if the key is new
+        """
+        core_event_id = self.recent.get(key)
+        if core_event_id is not None:
+            self.recent.move_to_end(key)
+            self.cache_hits += 1
+            return core_event_id
+        if key not in self.current and (self.previous is None or key not in self.previous):
+            return None
+
+        core_event_id = self.lookup(key, event) if self.lookup is not None else None
+        if core_event_id is None:
+            self.false_positives += 1
+            return None
+        self.lookup_hits += 1
+        self._remember(key, core_event_id)
+        return core_event_id
+
+    def add(self, key: str, core_event_id: str) -> None:
+        """
+        Record an accepted idempotency key.
+
+        Args:
+            key: Idempotency key
+            core_event_id: coreEventId the event was stored with
+        """
+        self._remember(key, core_event_id)
+        self.current.add(key)
+        if len(self.current) >= self.history:
+            self.previous, self.current = self.current, BloomFilter(self.history, self.error_rate)
+            self.rotations += 1
+            logger.info(f"Idempotency history rotated after {self.history} keys")
+
+    def _remember(self, key: str, core_event_id: str) -> None:
+        self.recent[key] = core_event_id
+        self.recent.move_to_end(key)
+        if len(self.recent) > self.cache_size:
+            self.recent.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every key, e.g. when the event store is emptied."""
+        self.recent.clear()
+        self.current = BloomFilter(self.history, self.error_rate)
+        self.previous = None
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the Bloom filters (the LRU holds at most cache_size entries)."""
+        return len(self.current.bits) + (len(self.previous.bits) if self.previous is not None else 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Replay and Bloom filter figures."""
+        return {
+            "cached": len(self.recent),
+            "cacheHits": self.cache_hits,
+            "lookupHits": self.lookup_hits,
+            "falsePositives": self.false_positives,
+            "rotations": self.rotations,
+            "bloomBytes": self.memory_bytes()
+        }
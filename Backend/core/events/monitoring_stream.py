@@ -0,0 +1,221 @@
+"""
+Monitoring Stream for BHIV Core System
+
+This module pushes monitoring events (including cross-case alerts, logged as
+"cross_case_alert" events) to streaming subscribers as they are logged, as
+Server-Sent Events or newline-delimited JSON. A subscriber that passes a
+"since" cursor first receives the retained events after it from the monitoring
+log, then live events, so reconnecting with the last sequence seen resumes the
+feed without gaps or duplicates.
+
+Each subscriber has a bounded queue. A subscriber that falls behind by more
+than queue_size events is dropped: its stream ends with a "dropped" message
+carrying the cursor to resume from, and the backlog is served from the log on
+reconnect instead of being buffered per client.
+
+stream_router() builds the GET /monitoring/stream endpoint over a stream. Both
+services mount it: cross-case alerts are logged by the Core Events service, so
+its feed is the one that carries them when the services run as separate
+processes, and the Webhooks feed carries delivery results and posted events.
+"""
+
+from typing import Dict, Any, Optional, Set, AsyncIterator
+import asyncio
+import json
+import logging
+import threading
+
+from fastapi import APIRouter, HTTPException, Header, Query, status
+from fastapi.responses import StreamingResponse
+
+from core.storage.monitoring_log import MonitoringLog
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ("sse", "ndjson")
+
+class StreamSubscriber:
+    """Bounded queue of live monitoring events for one streaming client."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int, event_type: Optional[str] = None):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.event_type = event_type
+        self.dropped = False
+
+    def offer(self, record: Dict[str, Any]) -> None:
+        """Queue a record on the subscriber's loop, dropping the subscriber when full."""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+class MonitoringStream:
+    """Fans monitoring log events out to streaming subscribers."""
+
+    def __init__(self, log: MonitoringLog, queue_size: int = 1000, heartbeat_seconds: float = 15.0,
+                 page_size: int = 1000):
+        self.log = log
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.page_size = page_size
+        self.subscribers: Set[StreamSubscriber] = set()
+        self.lock = threading.Lock()
+        self.dropped = 0
+        log.add_listener(self._publish)
+
+    def subscribe(self, event_type: Optional[str] = None) -> StreamSubscriber:
+        """
+        Register a subscriber on the running event loop.
+
+        Args:
+            event_type: Only deliver events of this type
+
+        Returns:
+            New subscriber
+        """
+        subscriber = StreamSubscriber(asyncio.get_running_loop(), self.queue_size, event_type)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        """Stop delivering events to a subscriber."""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers."""
+        return len(self.subscribers)
+
+    def _publish(self, record: Dict[str, Any]) -> None:
+        # Called by the monitoring log from any thread
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        for subscriber in subscribers:
+            if subscriber.event_type is not None and record.get("eventType") != subscriber.event_type:
+                continue
+            if subscriber.loop is current_loop:
+                subscriber.offer(record)
+            elif not subscriber.loop.is_closed():
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, record)
+
+    async def stream(self, since: Optional[int] = None, event_type: Optional[str] = None,
+                     stream_format: str = "sse") -> AsyncIterator[str]:
+        """
+        Yield encoded monitoring events, first the retained ones after the cursor, then live ones.
+
+        Args:
+            since: Sequence cursor to resume after; without it only new events are streamed
+            event_type: Only stream events of this type
+            stream_format: "sse" or "ndjson"
+
+        Yields:
+            Encoded messages, with heartbeats while idle
+        """
+        # Subscribe before reading the backlog so nothing logged in between is missed
+        subscriber = self.subscribe(event_type)
+        try:
+            cursor = since
+            if since is not None:
+                first = self.log.first_sequence
+                if since < first - 1:
+                    yield self._encode_control("gap", {"since": since, "firstSequence": first}, stream_format)
+                while True:
+                    page = self.log.query(event_type=event_type, since=cursor, limit=self.page_size)
+                    for record in page:
+                        cursor = record["sequence"]
+                        yield self._encode(record, stream_format)
+                    if len(page) < self.page_size:
+                        break
+
+            while True:
+                if subscriber.dropped and subscriber.queue.empty():
+                    self.dropped += 1
+                    logger.warning(f"Dropped slow monitoring stream subscriber at sequence {cursor}")
+                    yield self._encode_control("dropped", {"reason": "slow_consumer", "since": cursor},
+                                               stream_format)
+                    return
+                try:
+                    record = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n" if stream_format == "sse" else "\n"
+                    continue
+                # Live events already sent as part of the backlog
+                if cursor is not None and record["sequence"] <= cursor:
+                    continue
+                cursor = record["sequence"]
+                yield self._encode(record, stream_format)
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def _encode(record: Dict[str, Any], stream_format: str) -> str:
+        data = json.dumps(record, default=str)
+        if stream_format == "sse":
+            return f"id: {record['sequence']}\nevent: {record.get('eventType')}\ndata: {data}\n\n"
+        return data + "\n"
+
+    @staticmethod
+    def _encode_control(kind: str, details: Dict[str, Any], stream_format: str) -> str:
+        if stream_format == "sse":
+            return f"event: {kind}\ndata: {json.dumps(details)}\n\n"
+        return json.dumps(dict(details, control=kind)) + "\n"
+
+def stream_router(monitoring_stream: MonitoringStream) -> APIRouter:
+    """
+    Build the GET /monitoring/stream endpoint for a service.
+
+    Args:
+        monitoring_stream: Stream over the service's monitoring log
+
+    Returns:
+        Router to include in the service's app
+    """
+    router = APIRouter()
+
+    @router.get("/monitoring/stream")
+    async def stream_monitoring_events(
+        since: Optional[int] = Query(None, description="Resume after this sequence cursor; without it only new events are streamed"),
+        event_type: Optional[str] = Query(None, description="Only stream events of this type, e.g. cross_case_alert"),
+        format: str = Query("sse", description="sse (text/event-stream) or ndjson (application/x-ndjson)"),
+        last_event_id: Optional[str] = Header(None, description="SSE reconnect cursor, used when since is not given")
+    ):
+        """
+        Stream monitoring events and cross-case alerts as they are logged.
+        
+        Retained events after the cursor are sent first, then live events. A client
+        that falls too far behind receives a final "dropped" message with the cursor
+        to reconnect from.
+        """
+        if format not in STREAM_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid format: {format} (expected one of {', '.join(STREAM_FORMATS)})"
+            )
+        if since is None and last_event_id:
+            try:
+                since = int(last_event_id)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid Last-Event-ID: {last_event_id}"
+                )
+        
+        media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+        return StreamingResponse(
+            monitoring_stream.stream(since=since, event_type=event_type or None, stream_format=format),
+            media_type=media_type,
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    return router
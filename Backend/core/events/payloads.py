@@ -0,0 +1,27 @@
+"""
+Event Payloads for BHIV Core System
+
+This module defines the case event payload accepted by POST /core/events,
+the batch endpoint and the bulk import CLI, with the codec that validates it.
+It has no side effects on import, so tools can validate events without
+starting the Core Events service (chain load, store scans).
+"""
+
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+
+from core.events.codec import PayloadCodec
+
+class EventPayload(BaseModel):
+    """Payload for case events"""
+    caseId: str = Field(..., description="Unique identifier for the case")
+    evidenceId: str = Field(..., description="Identifier for the evidence associated with the case")
+    riskScore: float = Field(..., ge=0, le=100, description="Risk score for the case (0-100)")
+    actionSuggested: str = Field(..., enum=["approve", "reject", "escalate", "review", "freeze"], 
+                                description="Suggested action for the case")
+    txHash: Optional[str] = Field(None, description="Transaction hash on blockchain")
+    source: Optional[str] = Field(None, description="Source of the event")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata for the event")
+
+# Validates case events with EventPayload's rules, without building the model
+event_codec = PayloadCodec(EventPayload)
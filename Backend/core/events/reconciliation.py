@@ -0,0 +1,208 @@
+"""
+Blockchain Reconciliation for BHIV Core System
+
+This module checks evidence transaction hashes against the chain for case
+status. Lookups go through a pluggable ChainClient that resolves many hashes
+per round-trip. ReconciliationService sits in front of it:
+
+- hashes requested together are de-duplicated and split into batches of
+  batch_size, and batches run concurrently (at most `concurrency` at once)
+- concurrent requests for a hash that is already being looked up share that
+  lookup instead of starting another one
+- confirmed transactions are cached for good (they cannot change), while
+  pending and unknown ones are cached for pending_ttl seconds only
+
+FileChainClient is a local stub backed by a transaction export such as
+bhx_transactions_backup.json; it is used unless another client is passed in.
+Its file is set with the CORE_CHAIN_FILE environment variable.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from collections import OrderedDict
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAIN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..",
+                                  "bhx_transactions_backup.json")
+
+CONFIRMED = "confirmed"
+PENDING = "pending"
+FAILED = "failed"
+NOT_FOUND = "not_found"
+
+def normalize_tx_hash(tx_hash: str) -> str:
+    """Lower-case a transaction hash and drop any 0x prefix."""
+    tx_hash = tx_hash.lower()
+    return tx_hash[2:] if tx_hash.startswith("0x") else tx_hash
+
+class ChainClient(ABC):
+    """Resolves transaction hashes against a blockchain, many per round-trip."""
+
+    @abstractmethod
+    async def get_transactions(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up a batch of transactions.
+
+        Args:
+            tx_hashes: Normalized transaction hashes
+
+        Returns:
+            tx hash -> {"status": confirmed, pending or failed, "blockNumber": ...};
+            hashes the chain does not know are left out
+        """
+
+class FileChainClient(ChainClient):
+    """Chain client stub answering from a local transaction export."""
+
+    def __init__(self, path: Optional[str] = None, confirmations: int = 1, latency: float = 0.0):
+        self.path = path or os.environ.get("CORE_CHAIN_FILE", DEFAULT_CHAIN_FILE)
+        self.confirmations = confirmations
+        self.latency = latency
+        self.round_trips = 0
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            with open(self.path) as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Chain stub file {self.path} could not be loaded: {str(e)}")
+            records = []
+        for record in records:
+            if record.get("tx_hash"):
+                self.transactions[normalize_tx_hash(record["tx_hash"])] = record
+        self.head = max((record.get("block_number") or 0 for record in records), default=0)
+        logger.info(f"Chain stub loaded {len(self.transactions)} transactions from {self.path}")
+
+    async def get_transactions(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        found = {}
+        for tx_hash in tx_hashes:
+            record = self.transactions.get(tx_hash)
+            if record is None:
+                continue
+            block_number = record.get("block_number") or 0
+            chain_status = record.get("status", CONFIRMED)
+            # Blocks too close to the head do not have enough confirmations yet
+            if chain_status == CONFIRMED and self.head - block_number + 1 < self.confirmations:
+                chain_status = PENDING
+            found[tx_hash] = {"status": chain_status, "blockNumber": block_number}
+        return found
+
+class ReconciliationService:
+    """Batched, cached and coalesced transaction lookups for case reconciliation."""
+
+    def __init__(self, client: Optional[ChainClient] = None, batch_size: int = 100, concurrency: int = 8,
+                 pending_ttl: float = 30.0, cache_size: int = 1000000, clock: Callable[[], float] = time.monotonic):
+        self.client = client or FileChainClient()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.pending_ttl = pending_ttl
+        self.cache_size = cache_size
+        self.clock = clock
+
+        # tx hash -> (result, expiry or None for confirmed), least recently used first
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # tx hash -> lookup in progress
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def cached(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a cached, unexpired result for a normalized hash."""
+        entry = self.cache.get(tx_hash)
+        if entry is None:
+            return None
+        result, expires = entry
+        if expires is not None and self.clock() >= expires:
+            del self.cache[tx_hash]
+            return None
+        self.cache.move_to_end(tx_hash)
+        return result
+
+    async def reconcile(self, tx_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve transaction hashes, from the cache where possible.
+
+        Args:
+            tx_hashes: Transaction hashes, in any case and with or without 0x
+
+        Returns:
+            Given hash -> {"status": confirmed, pending, failed or not_found, "blockNumber": ...}
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Futures and the semaphore are bound to the loop that created them
+            self.loop = loop
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.in_flight = {}
+
+        requested = {tx_hash: normalize_tx_hash(tx_hash) for tx_hash in tx_hashes}
+        resolved: Dict[str, Dict[str, Any]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+        for normalized in dict.fromkeys(requested.values()):
+            result = self.cached(normalized)
+            if result is not None:
+                self.hits += 1
+                resolved[normalized] = result
+            elif normalized in self.in_flight:
+                self.hits += 1
+                waiting[normalized] = self.in_flight[normalized]
+            else:
+                self.misses += 1
+                missing.append(normalized)
+                waiting[normalized] = self.in_flight[normalized] = loop.create_future()
+
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            try:
+                await asyncio.gather(*(self._lookup(batch) for batch in batches))
+            finally:
+                # A cancelled request must not leave other requests waiting on its lookups
+                for tx_hash in missing:
+                    self._settle(tx_hash, {"status": "error", "blockNumber": None, "error": "Lookup cancelled"})
+
+        for normalized, future in waiting.items():
+            resolved[normalized] = await future
+        return {tx_hash: resolved[normalized] for tx_hash, normalized in requested.items()}
+
+    async def _lookup(self, batch: List[str]) -> None:
+        try:
+            async with self.semaphore:
+                self.batches += 1
+                found = await self.client.get_transactions(batch)
+        except Exception as e:
+            logger.error(f"Chain lookup of {len(batch)} transactions failed: {str(e)}")
+            # Failed lookups are reported but not cached, so the next request retries them
+            for tx_hash in batch:
+                self._settle(tx_hash, {"status": "error", "blockNumber": None, "error": str(e)})
+            return
+
+        expires = self.clock() + self.pending_ttl
+        for tx_hash in batch:
+            result = found.get(tx_hash) or {"status": NOT_FOUND, "blockNumber": None}
+            self.cache[tx_hash] = (result, None if result["status"] in (CONFIRMED, FAILED) else expires)
+            self.cache.move_to_end(tx_hash)
+            self._settle(tx_hash, result)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _settle(self, tx_hash: str, result: Dict[str, Any]) -> None:
+        future = self.in_flight.pop(tx_hash, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hits, misses, chain batches and cached entries."""
+        return {"hits": self.hits, "misses": self.misses, "batches": self.batches, "cached": len(self.cache)}
@@ -0,0 +1,106 @@
+"""
+Replay Worker Pool for BHIV Core System
+
+This module re-delivers stored webhook events through a bounded asyncio queue
+drained by a fixed number of workers, so replay requests return immediately and
+replay storms never run more than `concurrency` deliveries at once.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Coroutine that re-delivers one stored webhook event, raising on failure
+DeliveryHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class ReplayWorkerPool:
+    """Bounded queue of webhook events awaiting re-delivery, drained by a pool of workers."""
+
+    def __init__(self, deliver: DeliveryHandler, concurrency: int = 8, queue_size: int = 10000,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.deliver = deliver
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.delivered = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self.workers and self.loop is loop:
+            return
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"Replay worker pool started with {self.concurrency} workers")
+
+    def submit(self, webhook_event: Dict[str, Any]) -> bool:
+        """
+        Queue a webhook event for re-delivery.
+
+        Args:
+            webhook_event: Stored webhook event with messageId, callbackType and payload
+
+        Returns:
+            True if queued, False if the queue is full
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(webhook_event)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Replay queue full, dropping replay of {webhook_event.get('messageId')}")
+            return False
+
+    async def join(self) -> None:
+        """Wait until every queued replay has been attempted."""
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def stop(self) -> None:
+        """Finish queued replays, then stop the workers."""
+        if not self.workers:
+            return
+        await self.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queue = None
+        self.loop = None
+
+    def pending(self) -> int:
+        """Number of replays waiting for a worker."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def _worker(self) -> None:
+        queue = self.queue
+        while True:
+            webhook_event = await queue.get()
+            message_id = webhook_event.get("messageId")
+            try:
+                await self.deliver(webhook_event)
+                self.delivered += 1
+                result = {"status": "completed", "details": f"Replay delivered for event {message_id}"}
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Replay of event {message_id} failed: {str(e)}")
+                result = {"status": "failed", "details": f"Replay failed for event {message_id}: {str(e)}"}
+            finally:
+                queue.task_done()
+
+            if self.on_result is not None:
+                self.on_result({
+                    "eventId": str(uuid.uuid4()),
+                    "eventType": "replay",
+                    "timestamp": datetime.now().isoformat(),
+                    **result
+                })
@@ -5,16 +5,24 @@ This module handles webhook callbacks for orchestrated outcomes
 and provides monitoring endpoints for failed event deliveries.
 """
 
-from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime
 import logging
 import json
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from core.storage.event_store import get_event_store
+from core.storage.monitoring_log import get_monitoring_log, parse_time, local_isoformat
+from core.storage.log_config import configure_logging
+from core.events.replay import ReplayWorkerPool
+from core.events.delivery import DeliveryEngine, configured_destinations
+from core.events.monitoring_stream import MonitoringStream, stream_router
+from core.events.codec import PayloadCodec, json_response
+from core.storage.metrics import metrics_registry, MetricsMiddleware, gauge_family, counter_family, CONTENT_TYPE
+
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -22,6 +30,7 @@ app = FastAPI(
     description="Webhook endpoints for orchestrated outcomes",
     version="1.0.0"
 )
+app.add_middleware(MetricsMiddleware, service="webhooks")
 
 class WebhookPayload(BaseModel):
     """Payload for webhook callbacks"""
@@ -31,6 +40,9 @@ class WebhookPayload(BaseModel):
     result: Dict[str, Any]
     timestamp: str
 
+# Decodes callback bodies with WebhookPayload's rules, without building the model
+webhook_codec = PayloadCodec(WebhookPayload)
+
 class WebhookResponse(BaseModel):
     """Response model for webhook acceptance"""
     status: str = "received"
@@ -44,15 +56,56 @@ class MonitoringEvent(BaseModel):
     timestamp: str
     details: Optional[str] = None
 
-# In-memory storage for webhook events and monitoring (in production, this would be a database)
-webhook_events = []
-monitoring_events = []
+class ReplayRequest(BaseModel):
+    """Request model for bulk replay of webhook events"""
+    eventIds: List[str] = Field(default_factory=list, description="Message IDs of webhook events to replay")
+    start: Optional[str] = Field(None, description="Replay events received at or after this ISO timestamp")
+    end: Optional[str] = Field(None, description="Replay events received before this ISO timestamp")
+    callbackType: Optional[str] = Field(None, description="Only replay events of this callback type from the time window")
+    deadLetters: bool = Field(False, description="Also re-submit every dead-lettered delivery")
+
+# Webhook and monitoring event storage (in-memory by default, SQLite when CORE_STORE_URL is set)
+event_store = get_event_store()
+webhook_events = event_store.collection("webhook_events", "messageId", ["callbackType", "receivedAt"])
+monitoring_events = get_monitoring_log()
+
+# Default and maximum page size for GET /monitoring/events
+MONITORING_PAGE_SIZE = 1000
+MONITORING_MAX_PAGE_SIZE = 10000
+
+# Push feed of monitoring events and cross-case alerts for streaming clients
+monitoring_stream = MonitoringStream(monitoring_events)
+app.include_router(stream_router(monitoring_stream))
+
+# Maximum number of webhook events accepted by one bulk replay request
+MAX_REPLAY_BATCH = 10000
+
+# Outbound delivery of received outcomes to CORE_WEBHOOK_DESTINATIONS
+delivery_engine = DeliveryEngine(
+    dead_letters=event_store.collection("dead_letters", "deliveryId", ["messageId", "destination"]),
+    on_result=monitoring_events.append
+)
+webhook_destinations = configured_destinations()
+
+async def process_callback(webhook_event: Dict[str, Any]) -> None:
+    """
+    Process a stored webhook event by queueing its delivery to every configured destination.
+    
+    Replays re-deliver through this function.
+    """
+    for destination in webhook_destinations:
+        delivery_engine.submit(destination, webhook_event, webhook_event.get("messageId"))
+    logger.info(f"Processed {webhook_event.get('callbackType')} webhook {webhook_event.get('messageId')}")
+
+# Replays are re-delivered by a bounded pool of workers, off the request path
+replay_pool = ReplayWorkerPool(process_callback, on_result=monitoring_events.append)
 
-@app.post("/callbacks/escalation-result", response_model=WebhookResponse)
-async def handle_escalation_result(payload: WebhookPayload):
+@app.post("/callbacks/escalation-result", response_model=WebhookResponse, openapi_extra=webhook_codec.openapi_body())
+async def handle_escalation_result(request: Request):
     """
     Handle escalation result callbacks from orchestration.
     """
+    payload = await webhook_codec.read(request)
     try:
         # Generate message ID
         message_id = str(uuid.uuid4())
@@ -60,17 +113,17 @@ async def handle_escalation_result(payload: WebhookPayload):
         # Store the webhook event
         event_data = {
             "messageId": message_id,
-            "payload": payload.dict(),
+            "callbackType": "escalation-result",
+            "payload": payload,
             "receivedAt": datetime.now().isoformat()
         }
-        webhook_events.append(event_data)
+        webhook_events.put(event_data)
         
-        logger.info(f"Received escalation result webhook: {payload}")
+        logger.info("Received escalation result webhook: %s", payload)
         
-        # In a real implementation, process the escalation result here
-        # For example, update case status, notify stakeholders, etc.
+        await process_callback(event_data)
         
-        return WebhookResponse(messageId=message_id)
+        return json_response({"status": "received", "messageId": message_id})
     except Exception as e:
         logger.error(f"Error handling escalation result: {str(e)}")
         raise HTTPException(
@@ -78,11 +131,12 @@ async def handle_escalation_result(payload: WebhookPayload):
             detail=f"Failed to process webhook: {str(e)}"
         )
 
-@app.post("/callbacks/{callback_type}", response_model=WebhookResponse)
-async def handle_generic_callback(callback_type: str, payload: WebhookPayload):
+@app.post("/callbacks/{callback_type}", response_model=WebhookResponse, openapi_extra=webhook_codec.openapi_body())
+async def handle_generic_callback(callback_type: str, request: Request):
     """
     Handle generic callback events.
     """
+    payload = await webhook_codec.read(request)
     try:
         # Generate message ID
         message_id = str(uuid.uuid4())
@@ -91,14 +145,16 @@ async def handle_generic_callback(callback_type: str, payload: WebhookPayload):
         event_data = {
             "messageId": message_id,
             "callbackType": callback_type,
-            "payload": payload.dict(),
+            "payload": payload,
             "receivedAt": datetime.now().isoformat()
         }
-        webhook_events.append(event_data)
+        webhook_events.put(event_data)
+        
+        logger.info("Received %s webhook: %s", callback_type, payload)
         
-        logger.info(f"Received {callback_type} webhook: {payload}")
+        await process_callback(event_data)
         
-        return WebhookResponse(messageId=message_id)
+        return json_response({"status": "received", "messageId": message_id})
     except Exception as e:
         logger.error(f"Error handling {callback_type} callback: {str(e)}")
         raise HTTPException(
@@ -107,14 +163,35 @@ async def handle_generic_callback(callback_type: str, payload: WebhookPayload):
         )
 
 @app.get("/monitoring/events")
-async def get_monitoring_events(event_type: Optional[str] = None):
+async def get_monitoring_events(
+    event_type: Optional[str] = None,
+    since: Optional[int] = Query(None, description="Only return events with a sequence greater than this cursor"),
+    limit: int = Query(MONITORING_PAGE_SIZE, ge=1, le=MONITORING_MAX_PAGE_SIZE, description="Maximum number of events"),
+    start: Optional[str] = Query(None, description="Only return events logged at or after this ISO timestamp"),
+    end: Optional[str] = Query(None, description="Only return events logged before this ISO timestamp")
+):
     """
-    Get monitoring events, optionally filtered by event type.
+    Get monitoring events, optionally filtered by event type and time range.
+    
+    Events are returned in sequence order. Without a cursor the most recent
+    events are returned; pass the last "sequence" seen as "since" to page forward.
     """
-    if event_type:
-        filtered_events = [event for event in monitoring_events if event.get("eventType") == event_type]
-        return filtered_events
-    return monitoring_events
+    try:
+        start_time = parse_time(start)
+        end_time = parse_time(end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid timestamp: {str(e)}"
+        )
+    
+    return json_response(monitoring_events.query(
+        event_type=event_type or None,
+        since=since,
+        start=start_time,
+        end=end_time,
+        limit=limit
+    ))
 
 @app.post("/monitoring/events")
 async def log_monitoring_event(event: MonitoringEvent):
@@ -129,13 +206,21 @@ async def log_monitoring_event(event: MonitoringEvent):
 async def replay_failed_event(event_id: str):
     """
     Replay a failed event delivery.
+    
+    event_id is either a dead-lettered deliveryId, which is re-sent to its
+    original destination, or a webhook messageId, which is re-delivered to
+    every configured destination.
     """
-    # Find the event in webhook events
-    event_to_replay = None
-    for event in webhook_events:
-        if event.get("messageId") == event_id:
-            event_to_replay = event
-            break
+    if event_id in delivery_engine.dead_letters:
+        delivery_engine.redeliver(event_id)
+        logger.info(f"Dead letter {event_id} re-submitted")
+        return {
+            "status": "replay_initiated",
+            "eventId": event_id,
+            "deadLetter": True
+        }
+    
+    event_to_replay = webhook_events.get(event_id)
     
     if not event_to_replay:
         raise HTTPException(
@@ -143,8 +228,12 @@ async def replay_failed_event(event_id: str):
             detail="Event not found"
         )
     
-    # In a real implementation, we would replay the event to the original destination
-    # For now, we'll just log that a replay was requested
+    if not replay_pool.submit(event_to_replay):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Replay queue is full"
+        )
+    
     logger.info(f"Replay requested for event {event_id}")
     
     # Log this as a monitoring event
@@ -163,6 +252,132 @@ async def replay_failed_event(event_id: str):
         "monitoringEventId": monitoring_event["eventId"]
     }
 
+@app.post("/monitoring/replay", status_code=status.HTTP_202_ACCEPTED)
+async def replay_failed_events(request: ReplayRequest):
+    """
+    Replay many webhook events, selected by message ID and/or a receivedAt time window.
+    
+    Dead-lettered deliveries can be re-submitted by deliveryId in eventIds, or
+    all at once with deadLetters set.
+    """
+    if not request.eventIds and request.start is None and request.end is None and not request.deadLetters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide eventIds, a start/end time window or deadLetters"
+        )
+    
+    try:
+        start = local_isoformat(request.start)
+        end = local_isoformat(request.end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid timestamp: {str(e)}"
+        )
+    
+    # Select everything first: nothing is re-submitted when the request is rejected
+    events_to_replay = {}
+    dead_letter_ids = []
+    not_found = []
+    for event_id in request.eventIds:
+        if delivery_engine.dead_letters.get(event_id) is not None:
+            dead_letter_ids.append(event_id)
+            continue
+        event = webhook_events.get(event_id)
+        if event is None:
+            not_found.append(event_id)
+        else:
+            events_to_replay[event_id] = event
+    
+    if start is not None or end is not None:
+        for event in webhook_events.find_range("receivedAt", start, end):
+            if request.callbackType is None or event.get("callbackType") == request.callbackType:
+                events_to_replay.setdefault(event["messageId"], event)
+    
+    if len(events_to_replay) > MAX_REPLAY_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Replay selects {len(events_to_replay)} events, maximum is {MAX_REPLAY_BATCH}"
+        )
+    
+    dead_letters = [delivery_id for delivery_id in dead_letter_ids if delivery_engine.redeliver(delivery_id)]
+    if request.deadLetters:
+        dead_letters += delivery_engine.drain_dead_letters(MAX_REPLAY_BATCH)
+    
+    queued = []
+    rejected = []
+    for event_id, event in events_to_replay.items():
+        (queued if replay_pool.submit(event) else rejected).append(event_id)
+    
+    monitoring_event = {
+        "eventId": str(uuid.uuid4()),
+        "eventType": "replay",
+        "status": "initiated",
+        "timestamp": datetime.now().isoformat(),
+        "details": f"Bulk replay initiated for {len(queued)} events and {len(dead_letters)} dead letters"
+    }
+    monitoring_events.append(monitoring_event)
+    logger.info(f"Bulk replay requested: {len(queued)} queued, {len(rejected)} rejected, {len(not_found)} not found")
+    
+    return {
+        "status": "replay_initiated",
+        "queued": queued,
+        "rejected": rejected,
+        "notFound": not_found,
+        "deadLetters": dead_letters,
+        "monitoringEventId": monitoring_event["eventId"]
+    }
+
+@app.get("/monitoring/dead-letters")
+async def get_dead_letters(limit: int = Query(MONITORING_PAGE_SIZE, ge=1, le=MONITORING_MAX_PAGE_SIZE)):
+    """
+    Get dead-lettered deliveries, oldest first.
+    """
+    dead_letters = []
+    for dead_letter in delivery_engine.dead_letters.values():
+        if len(dead_letters) >= limit:
+            break
+        dead_letters.append(dead_letter)
+    return json_response(dead_letters)
+
+@app.on_event("startup")
+async def start_workers():
+    """Set up logging and start the replay workers and the delivery engine."""
+    configure_logging()
+    replay_pool.start()
+    delivery_engine.start()
+
+@app.on_event("shutdown")
+async def flush_event_store():
+    """Finish queued replays and deliveries and persist buffered writes on shutdown."""
+    await replay_pool.stop()
+    await delivery_engine.stop()
+    event_store.flush()
+
+def collect_metrics():
+    """Read queue, storage and delivery figures at scrape time."""
+    return [
+        gauge_family("core_replay_queue_depth", "Webhook events waiting to be replayed",
+                     [({}, replay_pool.pending())]),
+        gauge_family("core_delivery_queue_depth", "Deliveries queued or waiting to retry",
+                     [({}, delivery_engine.pending())]),
+        gauge_family("core_webhook_events_stored", "Webhook events in the event store", [({}, len(webhook_events))]),
+        gauge_family("core_monitoring_events_stored", "Monitoring events retained", [({}, len(monitoring_events))]),
+        gauge_family("core_dead_letters_stored", "Dead-lettered deliveries", [({}, len(delivery_engine.dead_letters))]),
+        gauge_family("core_stream_subscribers", "Connected monitoring stream clients",
+                     [({}, monitoring_stream.subscriber_count())]),
+        counter_family("core_webhook_deliveries", "Webhook delivery attempts by outcome", [
+            ({"outcome": "delivered"}, delivery_engine.delivered),
+            ({"outcome": "retried"}, delivery_engine.retried),
+            ({"outcome": "dead_lettered"}, delivery_engine.dead_lettered)
+        ])
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render([collect_metrics]), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -171,7 +386,11 @@ async def health_check():
         "service": "BHIV Core Webhooks",
         "version": "1.0.0",
         "webhook_events_count": len(webhook_events),
-        "monitoring_events_count": len(monitoring_events)
+        "monitoring_events_count": len(monitoring_events),
+        "replay_queue_depth": replay_pool.pending(),
+        "delivery_queue_depth": delivery_engine.pending(),
+        "dead_letters_count": len(delivery_engine.dead_letters),
+        "stream_subscribers": monitoring_stream.subscriber_count()
     }
 
 if __name__ == "__main__":
@@ -192,8 +411,12 @@ if __name__ == "__main__":
     print("   POST /callbacks/escalation-result - Handle escalation results")
     print("   POST /callbacks/{callback_type} - Handle generic callbacks")
     print("   GET /monitoring/events - Get monitoring events")
+    print("   GET /monitoring/stream - Stream monitoring events and alerts (SSE or NDJSON)")
     print("   POST /monitoring/events - Log monitoring events")
     print("   POST /monitoring/replay/{event_id} - Replay failed events")
+    print("   POST /monitoring/replay - Replay events by ID or time window")
+    print("   GET /monitoring/dead-letters - List failed deliveries")
+    print("   GET /metrics - Prometheus metrics")
     print("   GET /health - Health check")
     print("="*60)
     
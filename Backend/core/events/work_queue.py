@@ -0,0 +1,122 @@
+"""
+Event Work Queue for BHIV Core System
+
+This module decouples event ingestion from orchestration. Accepted events are
+put on a bounded asyncio queue and a pool of consumers runs them through the
+orchestrator on a thread pool, so the ingest path only pays for validation and
+storage. When a batch handler is given, each consumer takes every waiting event
+(up to batch_size) in one call, so a sharded orchestrator pays one round-trip
+per shard for the batch instead of one per event. A full queue is reported to
+the caller instead of growing without bound, and stop() drains queued events
+before shutdown.
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EventWorkQueue:
+    """Bounded queue of accepted events processed by a pool of consumers."""
+
+    def __init__(self, process: Callable[[Dict[str, Any]], Any], consumers: int = 1, maxsize: int = 10000,
+                 process_batch: Optional[Callable[[List[Dict[str, Any]]], Any]] = None, batch_size: int = 100):
+        self.process = process
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.consumers = consumers
+        self.maxsize = maxsize
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.processed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the consumers on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self.tasks and self.loop is loop:
+            return
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.executor = ThreadPoolExecutor(max_workers=self.consumers, thread_name_prefix="core-event-consumer")
+        self.tasks = [asyncio.ensure_future(self._consume()) for _ in range(self.consumers)]
+        logger.info(f"Event work queue started with {self.consumers} consumers")
+
+    def free_slots(self) -> int:
+        """Number of events that can be queued before the queue is full."""
+        self.start()
+        return self.maxsize - self.queue.qsize()
+
+    def submit(self, event_data: Dict[str, Any]) -> bool:
+        """
+        Queue an event for processing.
+
+        Args:
+            event_data: Stored event data
+
+        Returns:
+            True if queued, False if the queue is full
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(event_data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def put(self, event_data: Dict[str, Any]) -> None:
+        """Queue an event, waiting for room when the queue is full."""
+        self.start()
+        await self.queue.put(event_data)
+
+    def depth(self) -> int:
+        """Number of events waiting for a consumer."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def join(self) -> None:
+        """Wait until every queued event has been processed."""
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Process queued events (up to timeout), then stop the consumers."""
+        if not self.tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Event work queue stopped with {self.depth()} events unprocessed")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+        self.tasks = []
+        self.queue = None
+        self.executor = None
+        self.loop = None
+
+    async def _consume(self) -> None:
+        queue = self.queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            if self.process_batch is not None:
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+            try:
+                if self.process_batch is not None:
+                    await loop.run_in_executor(self.executor, self.process_batch, batch)
+                else:
+                    await loop.run_in_executor(self.executor, self.process, batch[0])
+                self.processed += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Error processing {len(batch)} queued events from "
+                             f"{batch[0].get('coreEventId')}: {str(e)}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
@@ -0,0 +1,365 @@
+"""
+Bulk import for BHIV Core System
+
+Backfills the orchestrator from transaction exports such as
+bhx_transactions_backup.json (a JSON array) or NDJSON files (one record per
+line). Files are parsed incrementally, so memory stays constant however large
+the file is. Each record is mapped to an EventPayload, either directly when it
+already is a case event or from a transaction record (caseId from the sending
+wallet, evidenceId and txHash from the transaction hash), and run through the
+CoreOrchestrator in batches. Events are written to the event store selected by
+CORE_STORE_URL, so a backfill into a sqlite:/// or wal:/// store is picked up by
+the services on their next start.
+
+Transaction records get a coreEventId derived from their hash, so importing
+the same file twice updates the events instead of duplicating them.
+
+Usage (from the Backend directory):
+    python core/import_events.py ../bhx_transactions_backup.json
+    python core/import_events.py export.ndjson --batch-size 5000 --workers 4
+"""
+
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Tuple, TextIO
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import collections
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pydantic import ValidationError
+
+from core.events.payloads import event_codec
+from core.storage.log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Namespace for coreEventIds derived from transaction hashes
+IMPORT_NAMESPACE = uuid.UUID("6f1c2e4a-8d3b-4f5e-9a7c-2b1d0e3f4a5c")
+
+# Characters read from the file per parser refill
+READ_SIZE = 1 << 20
+
+def iter_json_array(stream: TextIO, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array without loading the whole file.
+
+    Args:
+        stream: Text stream positioned at the array
+        read_size: Characters read per refill
+
+    Returns:
+        Iterator over the array items
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer:
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    position = 1
+    eof = False
+    while True:
+        # Skip whitespace and the separator before the next item
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        if position >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The item continues past the buffer: keep its start and read more
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        # A number or literal is only complete once the character after it has been read
+        if not eof and not isinstance(item, (dict, list, str)) and (end == len(buffer) or buffer[end] not in " \t\r\n,]"):
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
+        if position > read_size:
+            buffer, position = buffer[position:], 0
+
+def iter_ndjson(stream: TextIO) -> Iterator[Any]:
+    """Yield one record per non-empty line."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_records(stream: TextIO, file_format: str = "auto") -> Iterator[Any]:
+    """
+    Yield the records of a JSON array or NDJSON stream.
+
+    Args:
+        stream: Text stream
+        file_format: "json", "ndjson" or "auto" (a leading "[" means JSON)
+
+    Returns:
+        Iterator over the records
+    """
+    if file_format == "auto":
+        first = stream.read(1)
+        while first and first.isspace():
+            first = stream.read(1)
+        file_format = "json" if first == "[" else "ndjson"
+        stream = _Prefixed(first, stream)
+    return iter_json_array(stream) if file_format == "json" else iter_ndjson(stream)
+
+class _Prefixed:
+    """Text stream with already consumed characters put back in front."""
+
+    def __init__(self, prefix: str, stream: TextIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size: int = -1) -> str:
+        prefix, self.prefix = self.prefix, ""
+        return prefix + self.stream.read(size if size < 0 else max(size - len(prefix), 0))
+
+    def __iter__(self) -> Iterator[str]:
+        prefix, self.prefix = self.prefix, ""
+        lines = iter(self.stream)
+        first = next(lines, "")
+        if prefix or first:
+            yield prefix + first
+        yield from lines
+
+def transaction_to_payload(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a transaction record (bhx_transactions_backup.json shape) to EventPayload fields.
+
+    Args:
+        record: Transaction with tx_hash, from_address, amount, timestamp, ...
+
+    Returns:
+        Case event fields, plus coreEventId and timestamp
+    """
+    tx_hash = record.get("tx_hash")
+    sender = record.get("from_address")
+    timestamp = record.get("timestamp")
+    event = {
+        "caseId": f"case-{sender}",
+        "evidenceId": tx_hash,
+        "riskScore": record.get("risk_score", 0),
+        "actionSuggested": record.get("action_suggested", "review"),
+        "txHash": tx_hash,
+        "source": "bulk_import",
+        "metadata": {
+            "walletAddress": sender,
+            "amount": record.get("amount"),
+            "token": record.get("token"),
+            "toAddress": record.get("to_address"),
+            "blockNumber": record.get("block_number"),
+            "txStatus": record.get("status"),
+            "txType": record.get("tx_type_name")
+        }
+    }
+    if tx_hash:
+        event["coreEventId"] = str(uuid.uuid5(IMPORT_NAMESPACE, tx_hash))
+    if isinstance(timestamp, (int, float)):
+        event["timestamp"] = datetime.fromtimestamp(timestamp).isoformat()
+    return event
+
+def to_event(record: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Validate one imported record as a case event.
+
+    Args:
+        record: Case event or transaction record
+
+    Returns:
+        (event data, None) for valid records, (None, error) otherwise
+    """
+    if not isinstance(record, dict):
+        return None, "Record is not an object"
+    fields = record if "caseId" in record else transaction_to_payload(record)
+    try:
+        event_data = event_codec.validate(fields)
+    except ValidationError as e:
+        return None, str(e)
+    event_data["coreEventId"] = fields.get("coreEventId") or str(uuid.uuid4())
+    event_data["timestamp"] = fields.get("timestamp") or datetime.now().isoformat()
+    return event_data, None
+
+def to_events(records: List[Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """Validate a batch of records, returning the valid events and the number rejected."""
+    events = []
+    for record in records:
+        event_data, _ = to_event(record)
+        if event_data is not None:
+            events.append(event_data)
+    return events, len(records) - len(events)
+
+def batches(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group records into lists of at most size items."""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+class ImportStats:
+    """Counters and progress reporting for one import run."""
+
+    def __init__(self, progress_interval: float = 5.0, out: TextIO = sys.stdout):
+        self.progress_interval = progress_interval
+        self.out = out
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.processed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.alerts = 0
+        self.actions: Dict[str, int] = {}
+
+    def add(self, results: List[Dict[str, Any]], rejected: int) -> None:
+        """Count a processed batch and print progress when due."""
+        self.processed += len(results)
+        self.rejected += rejected
+        for result in results:
+            if result["status"] != "processed":
+                self.errors += 1
+                continue
+            self.alerts += len(result["crossCaseAlerts"])
+            for action in result["actionsTriggered"]:
+                self.actions[action["action"]] = self.actions.get(action["action"], 0) + 1
+
+        now = time.perf_counter()
+        if now - self.last_report >= self.progress_interval:
+            self.last_report = now
+            print(f"  {self.processed:>12,} events  {self.rejected:>8,} rejected  "
+                  f"{self.rate():>10,.0f} events/s", file=self.out, flush=True)
+
+    def rate(self) -> float:
+        """Processed events per second since the start."""
+        return self.processed / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self) -> Dict[str, Any]:
+        """Final counts, elapsed time and throughput."""
+        return {
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "crossCaseAlerts": self.alerts,
+            "actions": self.actions,
+            "elapsedSeconds": round(time.perf_counter() - self.started, 3),
+            "eventsPerSecond": round(self.rate(), 1)
+        }
+
+def import_events(records: Iterable[Any], orchestrator: Any, batch_size: int = 1000, workers: int = 0,
+                  limit: Optional[int] = None, stats: Optional[ImportStats] = None) -> Dict[str, Any]:
+    """
+    Validate records and run them through an orchestrator in batches.
+
+    Args:
+        records: Case events or transaction records
+        orchestrator: CoreOrchestrator (or ShardedOrchestrator) with process_events
+        batch_size: Records per batch
+        workers: Processes validating batches in parallel with orchestration; 0 validates inline
+        limit: Stop after this many records
+        stats: Progress reporter; a quiet one is used when omitted
+
+    Returns:
+        Import summary
+    """
+    stats = stats or ImportStats(progress_interval=float("inf"))
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    record_batches = batches(records, batch_size)
+
+    def process(events: List[Dict[str, Any]], rejected: int) -> None:
+        # Stored as processed by the orchestrator itself; only failures are written again
+        for event_data in events:
+            event_data["status"] = "processed"
+        results = orchestrator.process_events(events)
+        failed = []
+        for event_data, result in zip(events, results):
+            if result["status"] != "processed":
+                event_data["status"] = result["status"]
+                failed.append(event_data)
+        storage = getattr(orchestrator, "events_storage", None)
+        if failed and storage is not None:
+            storage.put_many(failed)
+        stats.add(results, rejected)
+
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A bounded window of batches in flight keeps memory constant; results are used in file order
+            pending = collections.deque()
+            for batch in record_batches:
+                pending.append(pool.submit(to_events, batch))
+                if len(pending) >= workers * 2:
+                    process(*pending.popleft().result())
+            while pending:
+                process(*pending.popleft().result())
+    else:
+        for batch in record_batches:
+            process(*to_events(batch))
+
+    if hasattr(orchestrator, "store"):
+        orchestrator.store.flush()
+    return stats.summary()
+
+def main():
+    """Import a JSON or NDJSON file and print progress and throughput"""
+    parser = argparse.ArgumentParser(description="Backfill the BHIV Core orchestrator from a JSON or NDJSON file")
+    parser.add_argument("path", help="JSON array or NDJSON file of case events or transactions ('-' for stdin)")
+    parser.add_argument("--format", choices=["auto", "json", "ndjson"], default="auto", help="Input format")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per orchestrator batch")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processes parsing and validating records in parallel with orchestration")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    parser.add_argument("--progress", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--verbose", action="store_true", help="Log sampled per-event details at DEBUG")
+    args = parser.parse_args()
+
+    # Only warnings and the progress lines unless per-event details are asked for
+    configure_logging("DEBUG" if args.verbose else "WARNING")
+
+    from core.orchestration.core_orchestrator import core_orchestrator
+
+    print(f"Importing {args.path} ...")
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    try:
+        summary = import_events(
+            iter_records(stream, args.format), core_orchestrator,
+            batch_size=args.batch_size, workers=args.workers, limit=args.limit,
+            stats=ImportStats(progress_interval=args.progress)
+        )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    core_orchestrator.store.close()
+
+    print(f"Imported {summary['processed']:,} events ({summary['rejected']:,} rejected, {summary['errors']:,} errors) "
+          f"in {summary['elapsedSeconds']} s: {summary['eventsPerSecond']:,.1f} events/s")
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Alert Suppression for BHIV Core System
+
+This module deduplicates cross-case alerts before they leave the orchestrator.
+Duplicate wallet and window alerts describe the current state of a wallet or
+case, so they are raised again on every later event for it, usually with the
+same cases. AlertSuppressor remembers the last emitted state per
+(type, scope, walletAddress or caseId) and lets an alert through only when it
+is new, when its set of cases changed, or when the suppression window since it
+was last emitted has passed.
+
+State older than the window is expired (it would not suppress anything) and the
+least recently emitted keys beyond max_entries are evicted. The window is set
+with the CORE_ALERT_SUPPRESSION_SECONDS environment variable (default 300);
+0 disables suppression.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from collections import OrderedDict
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUPPRESSION_SECONDS = 300.0
+
+def alert_key(alert: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Key identifying the wallet or case an alert is about."""
+    scope = alert.get("scope", "wallet")
+    if scope == "wallet":
+        subject = alert.get("walletAddress")
+    else:
+        case_ids = alert.get("caseIds") or [None]
+        subject = case_ids[-1]
+    return (alert.get("type"), scope, subject)
+
+def alert_fingerprint(alert: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Part of an alert that makes it worth emitting again: the cases involved."""
+    return tuple(sorted(set(alert.get("caseIds") or ()), key=str))
+
+class AlertSuppressor:
+    """Emits alerts only when new, changed, or not emitted within the suppression window."""
+
+    def __init__(self, window_seconds: Optional[float] = None, max_entries: int = 100000,
+                 clock: Callable[[], float] = time.time):
+        if window_seconds is None:
+            window_seconds = float(os.environ.get("CORE_ALERT_SUPPRESSION_SECONDS", DEFAULT_SUPPRESSION_SECONDS))
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+
+        # key -> (fingerprint, emitted at), least recently emitted first
+        self.state: "OrderedDict[Tuple[Any, ...], Tuple[Tuple[Any, ...], float]]" = OrderedDict()
+        self.emitted: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def filter(self, alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop alerts that repeat one emitted within the suppression window.
+
+        Args:
+            alerts: Alerts generated for an event
+
+        Returns:
+            Alerts to emit, in their original order
+        """
+        if not alerts:
+            return alerts
+        now = self.clock()
+        self._expire(now)
+
+        emitted = []
+        for alert in alerts:
+            key = alert_key(alert)
+            fingerprint = alert_fingerprint(alert)
+            previous = self.state.get(key)
+            alert_type = key[0]
+            if previous is not None and previous[0] == fingerprint and now - previous[1] < self.window_seconds:
+                self.suppressed[alert_type] = self.suppressed.get(alert_type, 0) + 1
+                continue
+
+            self.state[key] = (fingerprint, now)
+            self.state.move_to_end(key)
+            self.emitted[alert_type] = self.emitted.get(alert_type, 0) + 1
+            emitted.append(alert)
+
+        while len(self.state) > self.max_entries:
+            self.state.popitem(last=False)
+
+        if len(emitted) < len(alerts):
+            logger.debug("Suppressed %d repeated cross-case alerts", len(alerts) - len(emitted))
+        return emitted
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get emitted and suppressed alert counts.
+
+        Returns:
+            Totals, per-type counts and the number of tracked alert keys
+        """
+        types = sorted(set(self.emitted) | set(self.suppressed), key=str)
+        return {
+            "emitted": sum(self.emitted.values()),
+            "suppressed": sum(self.suppressed.values()),
+            "byType": {
+                alert_type: {
+                    "emitted": self.emitted.get(alert_type, 0),
+                    "suppressed": self.suppressed.get(alert_type, 0)
+                }
+                for alert_type in types
+            },
+            "tracked": len(self.state)
+        }
+
+    def _expire(self, now: float) -> None:
+        while self.state:
+            _, emitted_at = next(iter(self.state.values()))
+            if now - emitted_at < self.window_seconds:
+                return
+            self.state.popitem(last=False)
+
+def merge_alert_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Add up the stats of several suppressors, e.g. one per shard.
+
+    Args:
+        stats: AlertSuppressor.stats() results
+
+    Returns:
+        Combined stats in the same shape
+    """
+    merged = {"emitted": 0, "suppressed": 0, "byType": {}, "tracked": 0}
+    for entry in stats:
+        merged["emitted"] += entry["emitted"]
+        merged["suppressed"] += entry["suppressed"]
+        merged["tracked"] += entry["tracked"]
+        for alert_type, counts in entry["byType"].items():
+            totals = merged["byType"].setdefault(alert_type, {"emitted": 0, "suppressed": 0})
+            totals["emitted"] += counts["emitted"]
+            totals["suppressed"] += counts["suppressed"]
+    return merged
@@ -7,29 +7,76 @@ for the BHIV Core system.
 
 import json
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterable
 from datetime import datetime
 import uuid
 
 # Import local modules
 from core.orchestration.rules import (
-    check_auto_escalation,
-    detect_duplicate_wallets,
-    should_trigger_multisig,
-    generate_cross_case_alerts
+    evaluate_rules,
+    wallet_risk_exceeded,
+    ESCALATE_ACTION,
+    MULTISIG_ACTION,
+    CROSS_CASE_ACTION
 )
+from core.orchestration.wallet_index import WalletCaseIndex
+from core.orchestration.wallet_clusters import WalletClusterIndex, CLUSTER_PAGE_SIZE
+from core.orchestration.window_detectors import WindowDetectors
+from core.orchestration.alert_suppression import AlertSuppressor
+from core.storage.event_store import EventStore, InMemoryEventStore, get_event_store
+from core.storage.event_record import EventRecord
+from core.storage.monitoring_log import MonitoringLog, get_monitoring_log, monitoring_collection, new_event_id, local_isoformat
+from core.storage.metrics import metrics_registry, timed
+from core.storage.log_config import LogSampler
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hot-path timers, exposed on /metrics
+PROCESS_EVENT_SECONDS = metrics_registry.histogram(
+    "core_process_event_duration_seconds", "Time to run one event through the orchestration pipeline")
+WEBHOOK_CALLBACK_SECONDS = metrics_registry.histogram(
+    "core_webhook_callback_duration_seconds", "Time to handle one webhook callback")
+
+# Reason recorded when an event is escalated for the risk of its wallet
+WALLET_RISK_REASON = "Wallet risk propagated from flagged wallets exceeds threshold"
+
+# Picks the processed events whose details are logged at DEBUG
+log_sample = LogSampler(logger)
+
 class CoreOrchestrator:
     """Main orchestrator for the BHIV Core system."""
     
-    def __init__(self):
-        self.events_storage = {}
-        self.webhook_events = []
-        self.monitoring_events = []
+    def __init__(self, store: Optional[EventStore] = None, monitoring_log: Optional[MonitoringLog] = None,
+                 detect_cross_case: bool = True, alert_suppressor: Optional[AlertSuppressor] = None):
+        self.store = store or InMemoryEventStore()
+        self.events_storage = self.store.collection("events", "coreEventId", ["caseId"], EventRecord)
+        self.webhook_events = self.store.collection("webhook_events", "messageId", ["callbackType", "receivedAt"])
+        if monitoring_log is None:
+            monitoring_log = MonitoringLog(collection=monitoring_collection(self.store))
+        self.monitoring_events = monitoring_log
+        
+        # Sharded deployments run cross-case detection on wallet shards instead
+        self.detect_cross_case = detect_cross_case
+        
+        # Serializes rule evaluation when events are processed from several threads
+        self.lock = threading.RLock()
+        
+        # Velocity, volume and structuring windows; wallet windows run with cross-case detection
+        self.window_detectors = WindowDetectors(scopes=("wallet", "case") if detect_cross_case else ("case",))
+        
+        # Keeps repeated cross-case alerts out of results
+        self.alert_suppressor = alert_suppressor or AlertSuppressor()
+        
+        # Rebuild derived indexes from persisted events
+        self.wallet_index = WalletCaseIndex()
+        self.wallet_clusters = WalletClusterIndex()
+        if detect_cross_case:
+            for event in self.events_storage.values():
+                self.wallet_index.load_event(event)
+                self.wallet_clusters.add_event(event)
+        
         logger.info("CoreOrchestrator initialized")
     
     def process_event(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -42,67 +89,106 @@ class CoreOrchestrator:
         Returns:
             Processing result with any triggered actions
         """
+        with self.lock:
+            return self._process_event(event_data)
+    
+    def process_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of events in order, holding the lock once for the batch.
+
+        Args:
+            events: Event data to process
+
+        Returns:
+            Processing results in input order
+        """
+        with self.lock:
+            return [self._process_event(event_data) for event_data in events]
+
+    @timed(PROCESS_EVENT_SECONDS)
+    def _process_event(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Generate core event ID if not present
             if "coreEventId" not in event_data:
                 event_data["coreEventId"] = str(uuid.uuid4())
             
+            # One timestamp per event, reused for the actions and the monitoring event
+            now = time.time()
+            processed_at = datetime.fromtimestamp(now).isoformat()
+            
             # Store the event
             core_event_id = event_data["coreEventId"]
-            event_data["processedAt"] = datetime.now().isoformat()
-            self.events_storage[core_event_id] = event_data
-            
-            logger.info(f"Processing event {core_event_id}")
+            event_data["processedAt"] = processed_at
+            self.events_storage.put(event_data)
             
             # Apply orchestration rules
             actions_triggered = []
+            matched_actions = evaluate_rules(event_data)
             
             # Check for auto-escalation
-            if check_auto_escalation(event_data):
+            if ESCALATE_ACTION in matched_actions:
                 actions_triggered.append({
                     "action": "auto_escalation",
                     "reason": "Risk score or transaction value threshold exceeded",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": processed_at
+                })
+            elif wallet_risk_exceeded(event_data):
+                actions_triggered.append({
+                    "action": "auto_escalation",
+                    "reason": WALLET_RISK_REASON,
+                    "timestamp": processed_at
                 })
-                logger.info("Auto-escalation triggered")
             
             # Check for multisig trigger
-            if should_trigger_multisig(event_data):
+            if MULTISIG_ACTION in matched_actions:
                 actions_triggered.append({
                     "action": "multisig_trigger",
                     "reason": "Freeze action with high risk score",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": processed_at
                 })
-                logger.info("Multisig trigger activated")
             
-            # Generate cross-case alerts
-            all_events = list(self.events_storage.values())
-            cross_case_alerts = generate_cross_case_alerts(all_events)
+            # Generate cross-case alerts created by this event; wallet clusters are linked for every event
+            cross_case_alerts = []
+            if self.detect_cross_case:
+                cluster_alerts = self.wallet_clusters.add_event(event_data)
+                if CROSS_CASE_ACTION in matched_actions:
+                    cross_case_alerts = self.wallet_index.add_event(event_data) + cluster_alerts
+            cross_case_alerts.extend(self.window_detectors.add_event(
+                event_data, include_wallet=CROSS_CASE_ACTION in matched_actions))
+            generated_alerts = len(cross_case_alerts)
+            cross_case_alerts = self.alert_suppressor.filter(cross_case_alerts)
             
             if cross_case_alerts:
                 actions_triggered.append({
                     "action": "cross_case_alerts",
                     "alerts": cross_case_alerts,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": processed_at
                 })
-                logger.info(f"Generated {len(cross_case_alerts)} cross-case alerts")
             
             # Store monitoring event
             monitoring_event = {
-                "eventId": str(uuid.uuid4()),
+                "eventId": new_event_id(),
                 "eventType": "event_processed",
                 "status": "success",
-                "timestamp": datetime.now().isoformat(),
-                "details": f"Processed event {core_event_id} with {len(actions_triggered)} actions triggered"
+                "timestamp": processed_at,
+                "loggedAt": now,
+                "details": f"Processed event {core_event_id} with {len(actions_triggered)} actions triggered",
+                "alertsEmitted": len(cross_case_alerts),
+                "alertsSuppressed": generated_alerts - len(cross_case_alerts)
             }
             self.monitoring_events.append(monitoring_event)
             
+            if log_sample():
+                logger.debug("Processed event %s: actions %s, %d cross-case alerts (%d suppressed)",
+                             core_event_id, [a["action"] for a in actions_triggered], len(cross_case_alerts),
+                             generated_alerts - len(cross_case_alerts))
+            
             return {
                 "coreEventId": core_event_id,
                 "status": "processed",
                 "actionsTriggered": actions_triggered,
                 "crossCaseAlerts": cross_case_alerts,
-                "processedAt": event_data["processedAt"]
+                "processedAt": processed_at
             }
             
         except Exception as e:
@@ -125,6 +211,7 @@ class CoreOrchestrator:
                 "processedAt": datetime.now().isoformat()
             }
     
+    @timed(WEBHOOK_CALLBACK_SECONDS)
     def handle_webhook_callback(self, callback_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Handle incoming webhook callbacks.
@@ -147,9 +234,9 @@ class CoreOrchestrator:
                 "payload": payload,
                 "receivedAt": datetime.now().isoformat()
             }
-            self.webhook_events.append(event_data)
+            self.webhook_events.put(event_data)
             
-            logger.info(f"Received {callback_type} webhook callback")
+            logger.debug("Received %s webhook callback", callback_type)
             
             # Store monitoring event
             monitoring_event = {
@@ -211,19 +298,60 @@ class CoreOrchestrator:
             "processedAt": event_data.get("processedAt")
         }
     
-    def get_monitoring_events(self, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_monitoring_events(self, event_type: Optional[str] = None, since: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get monitoring events, optionally filtered by event type.
         
         Args:
             event_type: Optional event type to filter by
+            since: Optional sequence cursor; only later events are returned
+            limit: Optional maximum number of events
             
         Returns:
             List of monitoring events
         """
-        if event_type:
-            return [event for event in self.monitoring_events if event.get("eventType") == event_type]
-        return self.monitoring_events
+        return self.monitoring_events.query(event_type=event_type or None, since=since, limit=limit)
+    
+    def get_cluster(self, wallet_address: Optional[str] = None, case_id: Optional[str] = None,
+                    offset: int = 0, limit: int = CLUSTER_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        Get the cluster of cases and wallets linked to a wallet or case.
+        
+        Args:
+            wallet_address: Wallet to look up
+            case_id: Case to look up (used when no wallet is given)
+            offset: Index of the first case ID returned
+            limit: Maximum number of case IDs returned
+            
+        Returns:
+            Cluster summary with a page of its case IDs, or None if the wallet or case is unknown
+        """
+        with self.lock:
+            return self.wallet_clusters.get_cluster(wallet_address, case_id, offset, limit)
+    
+    def add_transactions(self, transactions: Iterable[Dict[str, Any]]) -> int:
+        """
+        Link the wallets of raw transaction records into the wallet clusters.
+        
+        Args:
+            transactions: Records with from_address and to_address, such as a chain export
+            
+        Returns:
+            Number of records that linked two wallets
+        """
+        with self.lock:
+            return self.wallet_clusters.add_transactions(transactions)
+    
+    def get_alert_stats(self) -> Dict[str, Any]:
+        """
+        Get counts of emitted and suppressed cross-case alerts.
+        
+        Returns:
+            Alert suppression statistics
+        """
+        with self.lock:
+            return self.alert_suppressor.stats()
     
     def replay_failed_event(self, event_id: str) -> Dict[str, Any]:
         """
@@ -235,12 +363,7 @@ class CoreOrchestrator:
         Returns:
             Replay result
         """
-        # Find the event in webhook events
-        event_to_replay = None
-        for event in self.webhook_events:
-            if event.get("messageId") == event_id:
-                event_to_replay = event
-                break
+        event_to_replay = self.webhook_events.get(event_id)
         
         if not event_to_replay:
             return {
@@ -265,9 +388,52 @@ class CoreOrchestrator:
             "eventId": event_id,
             "monitoringEventId": monitoring_event["eventId"]
         }
+    
+    def replay_failed_events(self, event_ids: Optional[List[str]] = None, start: Optional[str] = None,
+                             end: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Replay many failed event deliveries.
+        
+        Args:
+            event_ids: Message IDs to replay
+            start: Optional ISO timestamp; replay events received at or after it
+            end: Optional ISO timestamp; replay events received before it
+            
+        Returns:
+            Replay result listing the selected and missing message IDs
+        """
+        selected = {}
+        not_found = []
+        for event_id in event_ids or []:
+            if event_id in self.webhook_events:
+                selected[event_id] = None
+            else:
+                not_found.append(event_id)
+        
+        if start is not None or end is not None:
+            for event in self.webhook_events.find_range("receivedAt", local_isoformat(start), local_isoformat(end)):
+                selected[event["messageId"]] = None
+        
+        monitoring_event = {
+            "eventId": str(uuid.uuid4()),
+            "eventType": "replay",
+            "status": "initiated",
+            "timestamp": datetime.now().isoformat(),
+            "details": f"Bulk replay initiated for {len(selected)} events"
+        }
+        self.monitoring_events.append(monitoring_event)
+        
+        logger.info(f"Bulk replay initiated for {len(selected)} events")
+        
+        return {
+            "status": "replay_initiated",
+            "eventIds": list(selected),
+            "notFound": not_found,
+            "monitoringEventId": monitoring_event["eventId"]
+        }
 
 # Global orchestrator instance
-core_orchestrator = CoreOrchestrator()
+core_orchestrator = CoreOrchestrator(get_event_store(), get_monitoring_log())
 
 def process_event(event_data: Dict[str, Any]) -> Dict[str, Any]:
     """Convenience function to process an event."""
@@ -281,10 +447,25 @@ def get_event_status(core_event_id: str) -> Dict[str, Any]:
     """Convenience function to get event status."""
     return core_orchestrator.get_event_status(core_event_id)
 
-def get_monitoring_events(event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+def get_monitoring_events(event_type: Optional[str] = None, since: Optional[int] = None,
+                          limit: Optional[int] = None) -> List[Dict[str, Any]]:
     """Convenience function to get monitoring events."""
-    return core_orchestrator.get_monitoring_events(event_type)
+    return core_orchestrator.get_monitoring_events(event_type, since, limit)
+
+def get_cluster(wallet_address: Optional[str] = None, case_id: Optional[str] = None,
+                offset: int = 0, limit: int = CLUSTER_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+    """Convenience function to get the cluster of a wallet or case."""
+    return core_orchestrator.get_cluster(wallet_address, case_id, offset, limit)
+
+def get_alert_stats() -> Dict[str, Any]:
+    """Convenience function to get alert suppression statistics."""
+    return core_orchestrator.get_alert_stats()
 
 def replay_failed_event(event_id: str) -> Dict[str, Any]:
     """Convenience function to replay failed events."""
-    return core_orchestrator.replay_failed_event(event_id)
\ No newline at end of file
+    return core_orchestrator.replay_failed_event(event_id)
+
+def replay_failed_events(event_ids: Optional[List[str]] = None, start: Optional[str] = None,
+                         end: Optional[str] = None) -> Dict[str, Any]:
+    """Convenience function to replay many failed events."""
+    return core_orchestrator.replay_failed_events(event_ids, start, end)
\ No newline at end of file
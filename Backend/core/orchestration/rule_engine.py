@@ -0,0 +1,457 @@
+"""
+Declarative Rule Engine for BHIV Core System
+
+This module loads orchestration rules from a JSON or YAML definition (see
+sample_rules.json) and compiles them into an evaluation plan. A rule has an
+action and one or more conditions, all of which must hold:
+
+    {
+      "id": "high_value_transfer",
+      "condition": {"field": "metadata.amount", "operator": ">=", "value": 10000,
+                    "per": "metadata.currency", "limits": {"EUR": 9000}},
+      "additional_condition": {"field": "riskScore", "operator": ">=", "value": 50},
+      "conditions": [...],
+      "action": "escalate",
+      "enabled": true
+    }
+
+Operators are ==, !=, >, >=, <, <=, in, not_in and exists. "per" and "limits"
+give a comparison a different value per currency (or any other field), with
+"value" as the default.
+
+Compilation deduplicates identical conditions across rules and groups them by
+field: all thresholds on a field are answered by one bisect over the sorted
+thresholds, and all equality tests by one dict lookup. Rules are then matched
+by counting satisfied conditions, so evaluating an event costs time in the
+number of fields and satisfied conditions rather than the number of rules.
+
+RuleEngine reloads its definition file when it changes on disk.
+"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.storage.event_store import get_field
+from core.storage.metrics import metrics_registry
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+# Events matched per rule, exposed on /metrics
+RULE_MATCHES = metrics_registry.counter("core_rule_matches", "Events matched by each rule", ("rule", "action"))
+
+THRESHOLD_OPERATORS = {">", ">=", "<", "<="}
+OPERATORS = THRESHOLD_OPERATORS | {"==", "!=", "in", "not_in", "exists"}
+
+def load_rule_definitions(path: str) -> Dict[str, Any]:
+    """
+    Read a rule definition file.
+
+    Args:
+        path: .json, .yaml or .yml file with a top-level "rules" list
+
+    Returns:
+        Parsed definitions
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("PyYAML is required to load YAML rule definitions")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def _reader(field: str) -> Callable[[Dict[str, Any]], Any]:
+    # Equivalent to get_field with the dotted path split once, at compile time
+    parts = field.split(".")
+    if len(parts) == 1:
+        return lambda event: event.get(field)
+
+    def read(event: Dict[str, Any]) -> Any:
+        value = event
+        for part in parts:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    return read
+
+def _number(value: Any) -> Optional[float]:
+    # Only real numbers take part in threshold comparisons (not bools, strings or NaN)
+    if type(value) in (int, float) and value == value:
+        return float(value)
+    return None
+
+class CompiledRule:
+    """An enabled rule in a compiled plan."""
+
+    __slots__ = ["id", "name", "action", "predicates"]
+
+    def __init__(self, rule_id: str, name: str, action: str, predicates: List[int]):
+        self.id = rule_id
+        self.name = name
+        self.action = action
+        self.predicates = predicates
+
+class ThresholdGroup:
+    """Every threshold condition with the same field, operator and per-field."""
+
+    def __init__(self, field: str, operator: str, per: Optional[str]):
+        self.field = field
+        self.operator = operator
+        self.per = per
+        # per value -> (sorted thresholds, predicate ids in the same order)
+        self.tables: Dict[Any, Tuple[List[float], List[int]]] = {}
+        self.default: Tuple[List[float], List[int]] = ([], [])
+        self.entries: List[Tuple[int, Optional[float], Dict[Any, float]]] = []
+
+    def add(self, predicate_id: int, default: Optional[float], limits: Dict[Any, float]) -> None:
+        self.entries.append((predicate_id, default, limits))
+
+    def build(self) -> None:
+        per_values = {value for _, _, limits in self.entries for value in limits}
+        self.default = self._table(lambda default, limits: default)
+        self.tables = {
+            per_value: self._table(lambda default, limits: limits.get(per_value, default))
+            for per_value in per_values
+        }
+
+    def _table(self, threshold_for) -> Tuple[List[float], List[int]]:
+        pairs = sorted(
+            (threshold_for(default, limits), predicate_id)
+            for predicate_id, default, limits in self.entries
+            if threshold_for(default, limits) is not None
+        )
+        return [threshold for threshold, _ in pairs], [predicate_id for _, predicate_id in pairs]
+
+    def match(self, value: Any, per_value: Any) -> List[int]:
+        """Predicate ids satisfied by a field value."""
+        number = _number(value)
+        if number is None:
+            return []
+        try:
+            thresholds, ids = self.tables.get(per_value, self.default)
+        except TypeError:
+            thresholds, ids = self.default
+        if self.operator == ">=":
+            return ids[:bisect.bisect_right(thresholds, number)]
+        if self.operator == ">":
+            return ids[:bisect.bisect_left(thresholds, number)]
+        if self.operator == "<=":
+            return ids[bisect.bisect_left(thresholds, number):]
+        return ids[bisect.bisect_right(thresholds, number):]
+
+class RulePlan:
+    """Rules compiled into shared, field-grouped predicates."""
+
+    def __init__(self, definitions: Dict[str, Any]):
+        if not isinstance(definitions, dict) or not isinstance(definitions.get("rules"), list):
+            raise ValueError("Rule definitions must contain a \"rules\" list")
+
+        self.rules: List[CompiledRule] = []
+        self.predicates: List[Tuple] = []
+        self.predicate_ids: Dict[Tuple, int] = {}
+        self.threshold_groups: Dict[Tuple[str, str, Optional[str]], ThresholdGroup] = {}
+        self.equality: Dict[str, Dict[Any, List[int]]] = {}
+        self.exclusion: Dict[str, List[Tuple[frozenset, int]]] = {}
+        self.exists: Dict[str, Tuple[List[int], List[int]]] = {}
+
+        for rule in definitions["rules"]:
+            if rule.get("enabled", True):
+                self._add_rule(rule)
+
+        for group in self.threshold_groups.values():
+            group.build()
+
+        self.fields = sorted({
+            field for predicate in self.predicates for field in (predicate[0], predicate[3]) if field
+        })
+        self.readers = [(field, _reader(field)) for field in self.fields]
+        self.rules_by_predicate: List[List[int]] = [[] for _ in self.predicates]
+        self.unconditional: List[int] = []
+        for index, rule in enumerate(self.rules):
+            for predicate_id in rule.predicates:
+                self.rules_by_predicate[predicate_id].append(index)
+            if not rule.predicates:
+                self.unconditional.append(index)
+
+        self.actions = sorted({rule.action for rule in self.rules})
+
+        # (rule id, field) -> lower bound, filled on first use
+        self.bounds: Dict[Tuple[str, str], Optional[Tuple[Optional[float], Optional[str], Dict[Any, float]]]] = {}
+
+    def lower_bound(self, rule_id: str, field: str) -> Optional[Tuple[Optional[float], Optional[str], Dict[Any, float]]]:
+        """
+        Get the lower bound (a >= or > condition) an enabled rule puts on a field.
+
+        Args:
+            rule_id: Rule to look up
+            field: Field the condition tests
+
+        Returns:
+            (default value, per-field, per-field limits), or None if the rule is missing,
+            disabled or has no such condition
+        """
+        key = (rule_id, field)
+        if key not in self.bounds:
+            bound = None
+            for rule in self.rules:
+                if rule.id != rule_id:
+                    continue
+                for predicate_id in rule.predicates:
+                    predicate_field, operator, value, per, limits = self.predicates[predicate_id]
+                    if predicate_field == field and operator in (">=", ">"):
+                        bound = (value, per, dict(limits))
+            self.bounds[key] = bound
+        return self.bounds[key]
+
+    def _add_rule(self, rule: Dict[str, Any]) -> None:
+        rule_id = rule.get("id")
+        if not rule_id or not rule.get("action"):
+            raise ValueError(f"Rule {rule_id or rule!r} needs an id and an action")
+
+        conditions = [rule[key] for key in ("condition", "additional_condition") if rule.get(key)]
+        conditions.extend(rule.get("conditions", []))
+        predicates = sorted({self._add_predicate(rule_id, condition) for condition in conditions})
+        self.rules.append(CompiledRule(rule_id, rule.get("name", rule_id), rule["action"], predicates))
+
+    def _add_predicate(self, rule_id: str, condition: Dict[str, Any]) -> int:
+        field = condition.get("field")
+        operator = condition.get("operator")
+        if not field or operator not in OPERATORS:
+            raise ValueError(f"Rule {rule_id} has an invalid condition: {condition!r}")
+
+        value = condition.get("value", True)
+        per = condition.get("per")
+        limits = condition.get("limits") or {}
+        if operator in THRESHOLD_OPERATORS:
+            value = None if value is None else float(value)
+            limits = {key: float(limit) for key, limit in limits.items()}
+        elif per or limits:
+            raise ValueError(f"Rule {rule_id}: per-field limits only apply to threshold operators")
+        if operator in ("in", "not_in"):
+            value = frozenset(value)
+
+        key = (field, operator, value, per, tuple(sorted(limits.items())))
+        if key in self.predicate_ids:
+            return self.predicate_ids[key]
+
+        predicate_id = len(self.predicates)
+        self.predicates.append(key)
+        self.predicate_ids[key] = predicate_id
+
+        if operator in THRESHOLD_OPERATORS:
+            group_key = (field, operator, per)
+            if group_key not in self.threshold_groups:
+                self.threshold_groups[group_key] = ThresholdGroup(field, operator, per)
+            self.threshold_groups[group_key].add(predicate_id, value, limits)
+        elif operator == "==":
+            self.equality.setdefault(field, {}).setdefault(value, []).append(predicate_id)
+        elif operator == "in":
+            for item in value:
+                self.equality.setdefault(field, {}).setdefault(item, []).append(predicate_id)
+        elif operator in ("!=", "not_in"):
+            excluded = frozenset([value]) if operator == "!=" else value
+            self.exclusion.setdefault(field, []).append((excluded, predicate_id))
+        else:
+            present, absent = self.exists.setdefault(field, ([], []))
+            (present if value else absent).append(predicate_id)
+        return predicate_id
+
+    def satisfied(self, event: Dict[str, Any]) -> List[int]:
+        """
+        Evaluate every predicate against an event, reading each field once.
+
+        Args:
+            event: Event data
+
+        Returns:
+            Ids of the satisfied predicates
+        """
+        values = {field: read(event) for field, read in self.readers}
+        satisfied = []
+        for group in self.threshold_groups.values():
+            satisfied.extend(group.match(values[group.field], values[group.per] if group.per else None))
+        for field, table in self.equality.items():
+            try:
+                satisfied.extend(table.get(values[field], ()))
+            except TypeError:
+                pass
+        for field, exclusions in self.exclusion.items():
+            value = values[field]
+            for excluded, predicate_id in exclusions:
+                try:
+                    if value not in excluded:
+                        satisfied.append(predicate_id)
+                except TypeError:
+                    satisfied.append(predicate_id)
+        for field, (present, absent) in self.exists.items():
+            satisfied.extend(present if values[field] is not None else absent)
+        return satisfied
+
+    def match(self, event: Dict[str, Any]) -> List[CompiledRule]:
+        """
+        Get the rules an event satisfies.
+
+        Args:
+            event: Event data
+
+        Returns:
+            Matching rules in definition order
+        """
+        fired = list(self.unconditional)
+        counts: Dict[int, int] = {}
+        for predicate_id in self.satisfied(event):
+            for index in self.rules_by_predicate[predicate_id]:
+                count = counts.get(index, 0) + 1
+                counts[index] = count
+                if count == len(self.rules[index].predicates):
+                    fired.append(index)
+        fired.sort()
+        return [self.rules[index] for index in fired]
+
+    def evaluate_batch(self, events: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized evaluation over a batch of events.
+
+        Args:
+            events: List of event data
+
+        Returns:
+            For every action, a boolean array that is True where a rule with that action matched
+        """
+        count = len(events)
+        columns = {field: [get_field(event, field) for event in events] for field in self.fields}
+        numeric: Dict[str, np.ndarray] = {}
+
+        def numbers(field: str) -> np.ndarray:
+            if field not in numeric:
+                numeric[field] = np.array(
+                    [np.nan if _number(v) is None else v for v in columns[field]], dtype=np.float64)
+            return numeric[field]
+
+        vectors = []
+        for field, operator, value, per, limits in self.predicates:
+            column = columns[field]
+            if operator in THRESHOLD_OPERATORS:
+                if per:
+                    limits = dict(limits)
+                    thresholds = np.array([self._limit(limits, p, value) for p in columns[per]], dtype=np.float64)
+                else:
+                    thresholds = np.nan if value is None else value
+                with np.errstate(invalid="ignore"):
+                    vector = {
+                        ">=": np.greater_equal, ">": np.greater, "<=": np.less_equal, "<": np.less
+                    }[operator](numbers(field), thresholds)
+            elif operator == "exists":
+                vector = np.fromiter(((v is not None) == bool(value) for v in column), dtype=bool, count=count)
+            else:
+                excluded = frozenset([value]) if operator in ("==", "!=") else value
+                vector = np.fromiter((self._contains(excluded, v) for v in column), dtype=bool, count=count)
+                if operator in ("!=", "not_in"):
+                    vector = ~vector
+            vectors.append(vector)
+
+        results = {action: np.zeros(count, dtype=bool) for action in self.actions}
+        for rule in self.rules:
+            matched = np.ones(count, dtype=bool)
+            for predicate_id in rule.predicates:
+                matched &= vectors[predicate_id]
+            results[rule.action] |= matched
+        return results
+
+    @staticmethod
+    def _limit(limits: Dict[Any, float], per_value: Any, default: Optional[float]) -> float:
+        try:
+            limit = limits.get(per_value, default)
+        except TypeError:
+            limit = default
+        return np.nan if limit is None else limit
+
+    @staticmethod
+    def _contains(values: frozenset, value: Any) -> bool:
+        try:
+            return value in values
+        except TypeError:
+            return False
+
+class RuleEngine:
+    """Compiled rule plan loaded from a definition file and reloaded when the file changes."""
+
+    def __init__(self, path: Optional[str] = None, definitions: Optional[Dict[str, Any]] = None,
+                 check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.mtime = self._mtime()
+        self.plan = RulePlan(definitions if definitions is not None else load_rule_definitions(path))
+        self.next_check = time.monotonic() + check_interval
+        logger.info(f"Rule engine loaded {len(self.plan.rules)} rules"
+                    f"{f' from {path}' if path and definitions is None else ''}")
+
+    def current_plan(self) -> RulePlan:
+        """Get the compiled plan, reloading the definition file first if it changed."""
+        if self.path is not None and time.monotonic() >= self.next_check:
+            with self.lock:
+                if time.monotonic() >= self.next_check:
+                    self.next_check = time.monotonic() + self.check_interval
+                    if self._mtime() != self.mtime:
+                        self.reload()
+        return self.plan
+
+    def reload(self) -> bool:
+        """
+        Recompile the definition file. A broken file leaves the current plan in place.
+
+        Returns:
+            True if the new plan was installed
+        """
+        mtime = self._mtime()
+        try:
+            plan = RulePlan(load_rule_definitions(self.path))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Keeping current rules, failed to reload {self.path}: {str(e)}")
+            self.mtime = mtime
+            return False
+        self.plan = plan
+        self.mtime = mtime
+        logger.info(f"Reloaded {len(plan.rules)} rules from {self.path}")
+        return True
+
+    def match(self, event: Dict[str, Any]) -> List[CompiledRule]:
+        """Get the rules an event satisfies."""
+        return self.current_plan().match(event)
+
+    def actions(self, event: Dict[str, Any]) -> Set[str]:
+        """Get the actions of the rules an event satisfies."""
+        rules = self.current_plan().match(event)
+        for rule in rules:
+            logger.debug("Rule %s matched: %s", rule.id, rule.action)
+            RULE_MATCHES.labels(rule.id, rule.action).inc()
+        return {rule.action for rule in rules}
+
+    def evaluate_batch(self, events: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Vectorized evaluation over a batch of events."""
+        return self.current_plan().evaluate_batch(events)
+
+    def lower_bound(self, rule_id: str, field: str) -> Optional[Tuple[Optional[float], Optional[str], Dict[Any, float]]]:
+        """Get the lower bound a rule puts on a field in the current plan (see RulePlan.lower_bound)."""
+        return self.current_plan().lower_bound(rule_id, field)
+
+    def _mtime(self) -> Optional[int]:
+        if self.path is None:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
@@ -3,29 +3,89 @@ Orchestration Rules for BHIV Core System
 
 This module implements the orchestration primitives for the BHIV Core system,
 including auto-escalation rules, duplicate wallet detection, and multisig triggers.
+The per-event rules are declared in a rule definition file (CORE_RULES_FILE,
+sample_rules.json by default) and evaluated by the compiled rule engine.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set
 import logging
+import os
+import numpy as np
+
+from core.orchestration.rule_engine import RuleEngine
+from core.storage.event_store import get_field
+from core.orchestration.risk_propagation import WalletRiskScores, DEFAULT_FLAG_SCORE, DEFAULT_PROPAGATED_ESCALATION
+from core.storage.metrics import metrics_registry, timed
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Evaluation time per OrchestrationRules method, exposed on /metrics
+RULES_SECONDS = metrics_registry.histogram(
+    "core_rules_duration_seconds", "Time spent in each orchestration rules method", ("method",))
+
+# Rule definitions used unless CORE_RULES_FILE points elsewhere
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_rules.json")
+
+# Actions named in rule definitions
+ESCALATE_ACTION = "escalate"
+MULTISIG_ACTION = "multisig_freeze"
+CROSS_CASE_ACTION = "cross_case_alert"
+
+# Rule whose metadata.amount threshold is the high-value reporting threshold
+HIGH_VALUE_RULE = "high_value_transfer"
+
 class OrchestrationRules:
     """Class to manage orchestration rules for the BHIV Core system."""
     
-    def __init__(self):
-        # Threshold for auto-escalation
-        self.risk_threshold = 80.0
+    def __init__(self, rules_file: Optional[str] = None, definitions: Optional[Dict[str, Any]] = None):
+        # Declarative rules, compiled once and reloaded when the file changes
+        if definitions is None:
+            rules_file = rules_file or os.environ.get("CORE_RULES_FILE", DEFAULT_RULES_FILE)
+        self.engine = RuleEngine(rules_file, definitions)
         
-        # Minimum transaction value for high-value transfer flagging (in USD)
-        self.high_value_threshold = 10000.0
+        # Wallet risk, when a scorer is attached: wallets flagged at or above the first threshold,
+        # or receiving propagated risk at or above the second, escalate
+        self.wallet_risk: Optional[WalletRiskScores] = None
+        self.wallet_risk_threshold = float(os.environ.get("CORE_WALLET_RISK_ESCALATION", DEFAULT_FLAG_SCORE))
+        self.propagated_risk_threshold = float(
+            os.environ.get("CORE_PROPAGATED_RISK_ESCALATION", DEFAULT_PROPAGATED_ESCALATION))
         
         # Multisig configuration (3/5 signers required)
         self.multisig_signers = 5
         self.multisig_required = 3
     
+    @timed(RULES_SECONDS, method="evaluate")
+    def evaluate(self, event: Dict[str, Any]) -> Set[str]:
+        """
+        Evaluate every rule against an event.
+        
+        Args:
+            event: Event data
+            
+        Returns:
+            Actions of the matching rules
+        """
+        return self.engine.actions(event)
+    
+    @timed(RULES_SECONDS, method="evaluate_batch")
+    def evaluate_batch(self, events: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized form of evaluate over a batch of events.
+        
+        Args:
+            events: List of event data
+            
+        Returns:
+            For every action in the rules, a boolean array that is True where it matched
+        """
+        results = self.engine.evaluate_batch(events)
+        for action, matched in results.items():
+            count = int(matched.sum())
+            if count:
+                logger.info(f"Rules with action {action} matched {count} of {len(events)} events")
+        return results
+    
+    @timed(RULES_SECONDS, method="check_auto_escalation")
     def check_auto_escalation(self, event: Dict[str, Any]) -> bool:
         """
         Check if an event should be auto-escalated based on risk score and transaction value.
@@ -36,23 +96,50 @@ class OrchestrationRules:
         Returns:
             True if event should be escalated, False otherwise
         """
-        risk_score = event.get("riskScore", 0)
-        metadata = event.get("metadata", {})
-        amount = metadata.get("amount", 0)
-        currency = metadata.get("currency", "USD")
+        return ESCALATE_ACTION in self.evaluate(event) or self.wallet_risk_exceeded(event)
+    
+    def high_value_threshold(self, event: Dict[str, Any]) -> Optional[float]:
+        """
+        Get the high-value transfer threshold that applies to an event.
         
-        # Check if risk score exceeds threshold
-        if risk_score >= self.risk_threshold:
-            logger.info(f"Auto-escalation triggered: risk score {risk_score} >= threshold {self.risk_threshold}")
-            return True
+        Args:
+            event: Event data, read for the rule's per-field (e.g. metadata.currency)
             
-        # Check if high-value transfer
-        if amount >= self.high_value_threshold:
-            logger.info(f"Auto-escalation triggered: high-value transfer {amount} {currency} >= threshold {self.high_value_threshold}")
-            return True
+        Returns:
+            The high_value_transfer rule's metadata.amount threshold for the event, or None
+            if the rule is disabled or missing
+        """
+        bound = self.engine.lower_bound(HIGH_VALUE_RULE, "metadata.amount")
+        if bound is None:
+            return None
+        default, per, limits = bound
+        if per and limits:
+            try:
+                return limits.get(get_field(event, per), default)
+            except TypeError:
+                return default
+        return default
+    
+    def wallet_risk_exceeded(self, event: Dict[str, Any]) -> bool:
+        """
+        Check the precomputed risk of the event's wallet against the escalation thresholds.
+        
+        Args:
+            event: Event data containing metadata.walletAddress
             
-        return False
+        Returns:
+            True if a wallet risk scorer is attached and the wallet's own flag or the risk
+            propagated to it reaches its threshold
+        """
+        if self.wallet_risk is None:
+            return False
+        wallet_address = (event.get("metadata") or {}).get("walletAddress")
+        if not wallet_address:
+            return False
+        return (self.wallet_risk.flag(wallet_address) >= self.wallet_risk_threshold
+                or self.wallet_risk.propagated_score(wallet_address) >= self.propagated_risk_threshold)
     
+    @timed(RULES_SECONDS, method="detect_duplicate_wallets")
     def detect_duplicate_wallets(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Detect duplicate wallets across multiple cases.
@@ -68,7 +155,7 @@ class OrchestrationRules:
         
         # Group cases by wallet address
         for event in events:
-            metadata = event.get("metadata", {})
+            metadata = event.get("metadata") or {}
             wallet_address = metadata.get("walletAddress")
             
             if wallet_address:
@@ -79,18 +166,94 @@ class OrchestrationRules:
         # Generate alerts for wallets involved in multiple cases
         for wallet, cases in wallet_cases.items():
             if len(cases) > 1:
-                alert = {
-                    "type": "duplicate_wallet",
-                    "walletAddress": wallet,
-                    "caseIds": [case["caseId"] for case in cases],
-                    "count": len(cases),
-                    "details": f"Wallet {wallet} appears in {len(cases)} cases"
-                }
+                alert = self.build_duplicate_wallet_alert(wallet, [case["caseId"] for case in cases])
                 alerts.append(alert)
-                logger.info(f"Duplicate wallet detected: {alert}")
+                logger.debug("Duplicate wallet detected: %s", alert["details"])
         
         return alerts
     
+    def build_duplicate_wallet_alert(self, wallet_address: str, case_ids: List[str]) -> Dict[str, Any]:
+        """
+        Build the alert payload for a wallet seen in more than one event.
+        
+        Args:
+            wallet_address: Wallet address shared by the events
+            case_ids: Case ID of every event referencing the wallet, in arrival order
+            
+        Returns:
+            Duplicate wallet alert
+        """
+        return {
+            "type": "duplicate_wallet",
+            "walletAddress": wallet_address,
+            "caseIds": list(case_ids),
+            "count": len(case_ids),
+            "details": f"Wallet {wallet_address} appears in {len(case_ids)} cases"
+        }
+    
+    def build_window_alert(self, alert_type: str, scope: str, wallet_address: Optional[str],
+                           case_ids: List[str], count: int, total_amount: float,
+                           window_seconds: float) -> Dict[str, Any]:
+        """
+        Build the alert payload for a sliding-window detector, in the duplicate wallet alert shape.
+        
+        Args:
+            alert_type: "velocity", "volume" or "structuring"
+            scope: "wallet" or "case", the key the window aggregates over
+            wallet_address: Wallet the window belongs to (None for case windows)
+            case_ids: Cases seen in the window, most recent last
+            count: Number of events that made the window exceed its limit
+            total_amount: Sum of amounts in the window
+            window_seconds: Window length
+            
+        Returns:
+            Window alert
+        """
+        subject = f"Wallet {wallet_address}" if scope == "wallet" else f"Case {case_ids[-1]}"
+        descriptions = {
+            "velocity": f"{count} events",
+            "volume": f"{count} events totalling {total_amount:g}",
+            "structuring": f"{count} amounts just under the reporting threshold"
+        }
+        return {
+            "type": alert_type,
+            "scope": scope,
+            "walletAddress": wallet_address,
+            "caseIds": list(case_ids),
+            "count": count,
+            "totalAmount": total_amount,
+            "windowSeconds": window_seconds,
+            "details": f"{subject} has {descriptions[alert_type]} in {window_seconds:g}s"
+        }
+    
+    def build_cluster_alert(self, wallet_address: str, case_ids: List[str], case_count: int,
+                            joined_count: int, wallet_count: int) -> Dict[str, Any]:
+        """
+        Build the alert payload for two clusters of linked cases that merged, in the duplicate wallet alert shape.
+        
+        Args:
+            wallet_address: Wallet whose event or transfer linked the clusters
+            case_ids: Cases of the merged cluster, those of the smaller side first (may be truncated)
+            case_count: Number of cases in the merged cluster
+            joined_count: Number of cases on the smaller side of the merge
+            wallet_count: Number of wallets in the merged cluster
+            
+        Returns:
+            Wallet cluster alert
+        """
+        return {
+            "type": "wallet_cluster",
+            "scope": "cluster",
+            "walletAddress": wallet_address,
+            "caseIds": list(case_ids),
+            "count": case_count,
+            "joinedCount": joined_count,
+            "walletCount": wallet_count,
+            "details": f"Wallet {wallet_address} links {joined_count} cases to a cluster of "
+                       f"{case_count - joined_count} cases ({wallet_count} wallets)"
+        }
+    
+    @timed(RULES_SECONDS, method="should_trigger_multisig")
     def should_trigger_multisig(self, event: Dict[str, Any]) -> bool:
         """
         Determine if a multisig freeze action should be triggered.
@@ -101,16 +264,9 @@ class OrchestrationRules:
         Returns:
             True if multisig should be triggered, False otherwise
         """
-        action_suggested = event.get("actionSuggested")
-        risk_score = event.get("riskScore", 0)
-        
-        # Trigger multisig for freeze actions with high risk
-        if action_suggested == "freeze" and risk_score >= 70:
-            logger.info("Multisig freeze trigger activated")
-            return True
-            
-        return False
+        return MULTISIG_ACTION in self.evaluate(event)
     
+    @timed(RULES_SECONDS, method="generate_cross_case_alerts")
     def generate_cross_case_alerts(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Generate cross-case alerts based on patterns across multiple events.
@@ -127,8 +283,8 @@ class OrchestrationRules:
         duplicate_alerts = self.detect_duplicate_wallets(events)
         alerts.extend(duplicate_alerts)
         
-        # Additional cross-case analysis could be added here
-        # For example, detecting patterns in transaction times, amounts, etc.
+        # Time-window patterns (velocity, volume, structuring) are detected
+        # incrementally per event by WindowDetectors in the orchestrator
         
         return alerts
 
@@ -139,6 +295,10 @@ def check_auto_escalation(event: Dict[str, Any]) -> bool:
     """Convenience function to check auto-escalation."""
     return orchestration_rules.check_auto_escalation(event)
 
+def wallet_risk_exceeded(event: Dict[str, Any]) -> bool:
+    """Convenience function to check the propagated risk of an event's wallet."""
+    return orchestration_rules.wallet_risk_exceeded(event)
+
 def detect_duplicate_wallets(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Convenience function to detect duplicate wallets."""
     return orchestration_rules.detect_duplicate_wallets(events)
@@ -149,4 +309,12 @@ def should_trigger_multisig(event: Dict[str, Any]) -> bool:
 
 def generate_cross_case_alerts(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Convenience function to generate cross-case alerts."""
-    return orchestration_rules.generate_cross_case_alerts(events)
\ No newline at end of file
+    return orchestration_rules.generate_cross_case_alerts(events)
+
+def evaluate_rules(event: Dict[str, Any]) -> Set[str]:
+    """Convenience function to get the actions of the rules an event matches."""
+    return orchestration_rules.evaluate(event)
+
+def evaluate_rules_batch(events: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convenience function to evaluate the rules over a batch of events."""
+    return orchestration_rules.evaluate_batch(events)
@@ -0,0 +1,301 @@
+"""
+Sharded Orchestrator for BHIV Core System
+
+This module spreads rule evaluation over several worker processes. Each shard
+is a single-process pool that owns its own CoreOrchestrator and WalletCaseIndex.
+Events are routed with a consistent hash ring: the caseId decides which shard
+stores the event and evaluates its per-event rules and case windows, and the
+walletAddress decides which shard tracks that wallet for duplicate detection
+and wallet windows. Because every
+wallet lives on exactly one shard, the alerts it returns are complete, and the
+merge step only has to attach them to the case shard's result. Repeated alerts
+are suppressed on the shard that raised them. Wallet clusters link wallets
+across shards, so the union-find cluster index stays in the parent process,
+where each link costs a few microseconds. Propagated wallet risk is also only
+held by the parent, so its escalations are added in the merge step.
+
+The number of shards is set with the CORE_ORCHESTRATOR_SHARDS environment
+variable; 0 (default) keeps the single in-process orchestrator.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
+import bisect
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+from core.orchestration.core_orchestrator import CoreOrchestrator, WALLET_RISK_REASON
+from core.orchestration.wallet_index import WalletCaseIndex
+from core.orchestration.wallet_clusters import WalletClusterIndex, CLUSTER_PAGE_SIZE
+from core.orchestration.window_detectors import WindowDetectors
+from core.orchestration.rules import evaluate_rules, wallet_risk_exceeded, CROSS_CASE_ACTION
+from core.orchestration.alert_suppression import AlertSuppressor, merge_alert_stats
+
+logger = logging.getLogger(__name__)
+
+class ConsistentHashRing:
+    """Consistent hash ring mapping string keys to shard numbers."""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = shards
+        points = sorted(
+            (self._hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self.points = [point for point, _ in points]
+        self.owners = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Stable across processes, unlike the built-in hash()
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def shard_for(self, key: str) -> int:
+        """Get the shard owning a key."""
+        index = bisect.bisect(self.points, self._hash(key)) % len(self.points)
+        return self.owners[index]
+
+# Per-process shard state, created by _init_shard in each worker
+_shard_orchestrator: Optional[CoreOrchestrator] = None
+_shard_wallet_index: Optional[WalletCaseIndex] = None
+_shard_wallet_windows: Optional[WindowDetectors] = None
+
+def _init_shard() -> None:
+    global _shard_orchestrator, _shard_wallet_index, _shard_wallet_windows
+    _shard_orchestrator = CoreOrchestrator(detect_cross_case=False)
+    _shard_wallet_index = WalletCaseIndex()
+    _shard_wallet_windows = WindowDetectors(scopes=("wallet",))
+
+def _process_on_shard(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [_shard_orchestrator.process_event(event) for event in events]
+
+def _index_wallets_on_shard(entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    # Wallet and case alert keys never collide, so the shard's suppressor handles both
+    suppressor = _shard_orchestrator.alert_suppressor
+    return [
+        suppressor.filter(_shard_wallet_index.add_event(entry) + _shard_wallet_windows.add_event(entry))
+        for entry in entries
+    ]
+
+def _shard_call(method: str, *args) -> Any:
+    return getattr(_shard_orchestrator, method)(*args)
+
+def _shard_alerts() -> List[Dict[str, Any]]:
+    return _shard_wallet_index.get_alerts()
+
+class ShardedOrchestrator:
+    """Orchestrator facade that routes events to per-shard worker processes."""
+
+    def __init__(self, shards: Optional[int] = None):
+        self.shard_count = shards or os.cpu_count() or 1
+        self.ring = ConsistentHashRing(self.shard_count)
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=_init_shard)
+            for _ in range(self.shard_count)
+        ]
+        self.wallet_clusters = WalletClusterIndex()
+        self.alert_suppressor = AlertSuppressor()
+        
+        # Serializes batches from several consumer threads: the parent's cluster index and
+        # suppressor are not thread-safe, and per-wallet alert order follows batch order
+        self.lock = threading.RLock()
+        logger.info(f"ShardedOrchestrator started with {self.shard_count} shards")
+
+    def process_event(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process one event on its shards.
+
+        Args:
+            event_data: Event data to process
+
+        Returns:
+            Processing result, equivalent to CoreOrchestrator.process_event
+        """
+        return self.process_events([event_data])[0]
+
+    def process_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of events, one round-trip per involved shard and phase.
+
+        Events are grouped by shard preserving their relative order, so alerts
+        for each wallet come out as if the batch were processed sequentially.
+
+        Args:
+            events: Event data to process
+
+        Returns:
+            Processing results in input order
+        """
+        with self.lock:
+            return self._process_events(events)
+
+    def _process_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        case_groups: Dict[int, List[int]] = {}
+        wallet_groups: Dict[int, List[int]] = {}
+        wallet_entries: Dict[int, Dict[str, Any]] = {}
+        cluster_alerts: Dict[int, List[Dict[str, Any]]] = {}
+
+        for i, event in enumerate(events):
+            if "coreEventId" not in event:
+                event["coreEventId"] = str(uuid.uuid4())
+            case_groups.setdefault(self.ring.shard_for(str(event.get("caseId"))), []).append(i)
+
+            wallet_address = (event.get("metadata") or {}).get("walletAddress")
+            if not wallet_address or "caseId" not in event:
+                continue
+            alerts = self.wallet_clusters.add_event(event)
+            if CROSS_CASE_ACTION in evaluate_rules(event):
+                if alerts:
+                    cluster_alerts[i] = alerts
+                # Wallet windows bucket on the timestamp and read per-currency thresholds from metadata
+                wallet_entries[i] = {
+                    "coreEventId": event["coreEventId"],
+                    "caseId": event["caseId"],
+                    "timestamp": event.get("timestamp"),
+                    "metadata": event["metadata"]
+                }
+                wallet_groups.setdefault(self.ring.shard_for(wallet_address), []).append(i)
+
+        # Both phases are submitted before waiting so all shards work in parallel
+        case_futures = {
+            shard: self.executors[shard].submit(_process_on_shard, [events[i] for i in indexes])
+            for shard, indexes in case_groups.items()
+        }
+        wallet_futures = {
+            shard: self.executors[shard].submit(_index_wallets_on_shard, [wallet_entries[i] for i in indexes])
+            for shard, indexes in wallet_groups.items()
+        }
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        for shard, future in case_futures.items():
+            for i, result in zip(case_groups[shard], future.result()):
+                results[i] = result
+                self._merge_wallet_risk(events[i], result)
+
+        shard_alerts: Dict[int, List[Dict[str, Any]]] = {}
+        for shard, future in wallet_futures.items():
+            for i, alerts in zip(wallet_groups[shard], future.result()):
+                shard_alerts[i] = alerts
+        
+        for i in sorted(set(shard_alerts) | set(cluster_alerts)):
+            alerts = shard_alerts.get(i, []) + self.alert_suppressor.filter(cluster_alerts.get(i, []))
+            if alerts and results[i]["status"] == "processed":
+                self._merge_alerts(results[i], alerts)
+
+        return results
+
+    def get_event_status(self, core_event_id: str, case_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the status of a specific event.
+
+        Args:
+            core_event_id: Core event ID
+            case_id: Case the event belongs to; without it every shard is asked
+
+        Returns:
+            Event status information
+        """
+        if case_id is not None:
+            shard = self.ring.shard_for(case_id)
+            return self.executors[shard].submit(_shard_call, "get_event_status", core_event_id).result()
+
+        futures = [executor.submit(_shard_call, "get_event_status", core_event_id) for executor in self.executors]
+        statuses = [future.result() for future in futures]
+        return next((s for s in statuses if s["status"] != "not_found"), statuses[0])
+
+    def get_cross_case_alerts(self) -> List[Dict[str, Any]]:
+        """
+        Get duplicate wallet alerts for every wallet on every shard.
+
+        Returns:
+            Merged list of alerts
+        """
+        futures = [executor.submit(_shard_alerts) for executor in self.executors]
+        alerts = []
+        for future in futures:
+            alerts.extend(future.result())
+        return alerts
+
+    def get_alert_stats(self) -> Dict[str, Any]:
+        """
+        Get emitted and suppressed cross-case alert counts summed over all shards.
+
+        Returns:
+            Alert suppression statistics
+        """
+        futures = [executor.submit(_shard_call, "get_alert_stats") for executor in self.executors]
+        with self.lock:
+            parent_stats = self.alert_suppressor.stats()
+        return merge_alert_stats([future.result() for future in futures] + [parent_stats])
+    
+    def get_cluster(self, wallet_address: Optional[str] = None, case_id: Optional[str] = None,
+                    offset: int = 0, limit: int = CLUSTER_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        Get the cluster of cases and wallets linked to a wallet or case.
+        
+        Args:
+            wallet_address: Wallet to look up
+            case_id: Case to look up (used when no wallet is given)
+            offset: Index of the first case ID returned
+            limit: Maximum number of case IDs returned
+            
+        Returns:
+            Cluster summary with a page of its case IDs, or None if the wallet or case is unknown
+        """
+        with self.lock:
+            return self.wallet_clusters.get_cluster(wallet_address, case_id, offset, limit)
+    
+    def add_transactions(self, transactions: Iterable[Dict[str, Any]]) -> int:
+        """
+        Link the wallets of raw transaction records into the wallet clusters.
+        
+        Args:
+            transactions: Records with from_address and to_address, such as a chain export
+            
+        Returns:
+            Number of records that linked two wallets
+        """
+        with self.lock:
+            return self.wallet_clusters.add_transactions(transactions)
+
+    def shutdown(self) -> None:
+        """Stop every shard process."""
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+    def _merge_wallet_risk(self, event: Dict[str, Any], result: Dict[str, Any]) -> None:
+        # Shards have no wallet risk scores; escalate here as CoreOrchestrator would, ahead of other actions
+        if result["status"] != "processed":
+            return
+        if any(action["action"] == "auto_escalation" for action in result["actionsTriggered"]):
+            return
+        if wallet_risk_exceeded(event):
+            result["actionsTriggered"].insert(0, {
+                "action": "auto_escalation",
+                "reason": WALLET_RISK_REASON,
+                "timestamp": result["processedAt"]
+            })
+
+    def _merge_alerts(self, result: Dict[str, Any], alerts: List[Dict[str, Any]]) -> None:
+        # Wallet alerts come before the case shard's own window alerts, as in CoreOrchestrator
+        alerts = alerts + result["crossCaseAlerts"]
+        result["crossCaseAlerts"] = alerts
+        for action in result["actionsTriggered"]:
+            if action["action"] == "cross_case_alerts":
+                action["alerts"] = alerts
+                return
+        result["actionsTriggered"].append({
+            "action": "cross_case_alerts",
+            "alerts": alerts,
+            "timestamp": result["processedAt"]
+        })
+
+    def __enter__(self) -> "ShardedOrchestrator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
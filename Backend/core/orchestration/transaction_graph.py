@@ -0,0 +1,364 @@
+"""
+Transaction Graph for BHIV Core System
+
+This module answers fund-flow questions such as "where did the funds from this
+wallet go within k hops and T hours". Transfers (from_address, to_address,
+amount, timestamp, tx_hash, as in bhx_transactions_backup.json) are kept as a
+compressed sparse row (CSR) adjacency. Addresses are interned to integers; the
+out-edges of every sender are stored contiguously in NumPy arrays and sorted
+by time, so the edges usable after a given time are found by binary search.
+
+Transfers added after the graph was built go to a small per-sender buffer that
+traces also read; the buffer is merged into the CSR arrays once it holds a
+tenth of the graph (or compact_threshold transfers), so each transfer is
+re-sorted O(1) times amortized.
+
+Traces are time-respecting breadth-first searches: a transfer out of a wallet
+is followed only if it happened at or after the earliest time funds reached
+that wallet. Work per trace is bounded by the number of transfers returned.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+import json
+import logging
+import math
+import threading
+
+import numpy as np
+
+from core.storage.monitoring_log import parse_time
+
+logger = logging.getLogger(__name__)
+
+# Transfers buffered before they are merged into the CSR arrays (at least)
+DEFAULT_COMPACT_THRESHOLD = 100000
+
+# Maximum number of transfers returned by one trace
+DEFAULT_TRACE_LIMIT = 1000
+
+# Transfers read from the CSR arrays at a time during a trace
+TRACE_CHUNK = 1024
+
+_NO_HASH = bytes(32)
+
+def _hash_bytes(tx_hash: Optional[str]) -> bytes:
+    if not tx_hash:
+        return _NO_HASH
+    tx_hash = tx_hash[2:] if tx_hash[:2].lower() == "0x" else tx_hash
+    try:
+        value = bytes.fromhex(tx_hash)
+    except ValueError:
+        return _NO_HASH
+    return value if len(value) == 32 else _NO_HASH
+
+class TransactionGraph:
+    """Directed transfer graph in CSR form with time-respecting traces."""
+
+    def __init__(self, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+
+        # Address interning
+        self.addresses: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+        # CSR arrays: out-edges of node i are indptr[i]:indptr[i + 1], sorted by time
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.targets = np.empty(0, dtype=np.int32)
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.times = np.empty(0, dtype=np.float64)
+        self.hashes = np.empty((0, 32), dtype=np.uint8)
+
+        # sender -> [(time, receiver, amount, hash bytes)] added since the last compaction
+        self.pending: Dict[int, List[Tuple[float, int, float, bytes]]] = {}
+        self.pending_count = 0
+
+    def intern(self, address: str) -> int:
+        """Get the node number of an address, adding it if new."""
+        node = self.addresses.get(address)
+        if node is None:
+            node = self.addresses[address] = len(self.labels)
+            self.labels.append(address)
+        return node
+
+    def add_transfer(self, from_address: str, to_address: str, amount: float, timestamp: float,
+                     tx_hash: Optional[str] = None) -> None:
+        """
+        Add one transfer.
+
+        Args:
+            from_address: Sending wallet
+            to_address: Receiving wallet
+            amount: Amount transferred
+            timestamp: Epoch seconds
+            tx_hash: Transaction hash (hex, with or without 0x)
+        """
+        with self.lock:
+            sender = self.intern(from_address)
+            receiver = self.intern(to_address)
+            self.pending.setdefault(sender, []).append(
+                (float(timestamp), receiver, float(amount or 0), _hash_bytes(tx_hash)))
+            self.pending_count += 1
+            if self.pending_count >= max(self.compact_threshold, len(self.targets) // 10):
+                self.compact()
+
+    def add_transactions(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add transaction records (bhx_transactions_backup.json format) and compact.
+
+        Args:
+            records: Records with from_address, to_address, amount, timestamp and tx_hash
+
+        Returns:
+            Number of transfers added; records without both addresses or a timestamp are skipped
+        """
+        added = 0
+        with self.lock:
+            for record in records:
+                sender, receiver = record.get("from_address"), record.get("to_address")
+                timestamp = record.get("timestamp")
+                if not sender or not receiver or not isinstance(timestamp, (int, float)):
+                    continue
+                self.add_transfer(sender, receiver, record.get("amount") or 0, timestamp, record.get("tx_hash"))
+                added += 1
+            self.compact()
+        return added
+
+    def add_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Add the transfer recorded by a case event, if it has one.
+
+        Args:
+            event: Event data with metadata.walletAddress, metadata.toAddress and optional
+                metadata.amount, timestamp (ISO or epoch seconds) and txHash
+
+        Returns:
+            True if a transfer was added
+        """
+        metadata = event.get("metadata") or {}
+        sender, receiver = metadata.get("walletAddress"), metadata.get("toAddress")
+        if not sender or not receiver:
+            return False
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str):
+            try:
+                timestamp = parse_time(timestamp)
+            except ValueError:
+                return False
+        if not isinstance(timestamp, (int, float)):
+            return False
+        amount = metadata.get("amount")
+        self.add_transfer(sender, receiver, amount if isinstance(amount, (int, float)) else 0, timestamp,
+                          event.get("txHash"))
+        return True
+
+    def load_arrays(self, labels: List[str], senders: np.ndarray, receivers: np.ndarray, amounts: np.ndarray,
+                    times: np.ndarray, hashes: Optional[np.ndarray] = None) -> None:
+        """
+        Replace the graph with transfers given as arrays, without per-transfer Python work.
+
+        Args:
+            labels: Address of every node number
+            senders: Sender node of each transfer
+            receivers: Receiver node of each transfer
+            amounts: Amount of each transfer
+            times: Epoch seconds of each transfer
+            hashes: Optional (n, 32) uint8 transaction hashes
+        """
+        with self.lock:
+            self.labels = list(labels)
+            self.addresses = {address: node for node, address in enumerate(self.labels)}
+            self.pending = {}
+            self.pending_count = 0
+            if hashes is None:
+                hashes = np.zeros((len(senders), 32), dtype=np.uint8)
+            self._build(np.asarray(senders, dtype=np.int64), np.asarray(receivers, dtype=np.int32),
+                        np.asarray(amounts, dtype=np.float64), np.asarray(times, dtype=np.float64), hashes)
+
+    def compact(self) -> None:
+        """Merge buffered transfers into the CSR arrays."""
+        with self.lock:
+            if not self.pending_count:
+                if len(self.indptr) < len(self.labels) + 1:
+                    self._extend_indptr()
+                return
+            edges = [(sender, *edge) for sender, entries in self.pending.items() for edge in entries]
+            senders = np.fromiter((e[0] for e in edges), dtype=np.int64, count=len(edges))
+            times = np.fromiter((e[1] for e in edges), dtype=np.float64, count=len(edges))
+            receivers = np.fromiter((e[2] for e in edges), dtype=np.int32, count=len(edges))
+            amounts = np.fromiter((e[3] for e in edges), dtype=np.float64, count=len(edges))
+            hashes = np.frombuffer(b"".join(e[4] for e in edges), dtype=np.uint8).reshape(-1, 32)
+
+            current = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+            self._build(
+                np.concatenate([current, senders]),
+                np.concatenate([self.targets, receivers]),
+                np.concatenate([self.amounts, amounts]),
+                np.concatenate([self.times, times]),
+                np.concatenate([self.hashes, hashes])
+            )
+            self.pending = {}
+            self.pending_count = 0
+
+    def _build(self, senders: np.ndarray, receivers: np.ndarray, amounts: np.ndarray, times: np.ndarray,
+               hashes: np.ndarray) -> None:
+        order = np.lexsort((times, senders))
+        self.targets = receivers[order]
+        self.amounts = amounts[order]
+        self.times = times[order]
+        self.hashes = hashes[order]
+        counts = np.bincount(senders, minlength=len(self.labels))
+        self.indptr = np.zeros(len(self.labels) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+    def _extend_indptr(self) -> None:
+        # Nodes interned without out-edges get empty ranges
+        missing = len(self.labels) + 1 - len(self.indptr)
+        self.indptr = np.concatenate([self.indptr, np.full(missing, self.indptr[-1], dtype=np.int64)])
+
+    def trace(self, address: str, max_hops: int = 3, window_seconds: Optional[float] = None,
+              start_time: Optional[float] = None, min_amount: float = 0.0,
+              limit: int = DEFAULT_TRACE_LIMIT) -> Optional[Dict[str, Any]]:
+        """
+        Follow funds out of a wallet.
+
+        Args:
+            address: Wallet to trace from
+            max_hops: Maximum number of transfers from the wallet
+            window_seconds: Only follow transfers within this long after the start
+            start_time: Epoch seconds to trace from; defaults to the wallet's first outgoing transfer
+            min_amount: Ignore transfers smaller than this
+            limit: Maximum number of transfers returned
+
+        Returns:
+            Reached wallets with their hop and earliest arrival time, the transfers
+            followed (hop order) and whether the limit cut the trace short, or None
+            for unknown addresses
+        """
+        with self.lock:
+            origin = self.addresses.get(address)
+            if origin is None:
+                return None
+            if len(self.indptr) < len(self.labels) + 1:
+                self._extend_indptr()
+
+            if start_time is None:
+                start_time = self._first_transfer_time(origin) if window_seconds is not None else -math.inf
+            end_time = start_time + window_seconds if window_seconds is not None else math.inf
+
+            arrival: Dict[int, float] = {origin: start_time}
+            hops: Dict[int, int] = {origin: 0}
+            frontier: Dict[int, float] = {origin: start_time}
+            followed = set()
+            transfers = []
+            truncated = False
+
+            for hop in range(1, max_hops + 1):
+                next_frontier: Dict[int, float] = {}
+                for node, since in frontier.items():
+                    for edge, receiver, amount, timestamp, tx_hash in self._out_edges(node, since, end_time, min_amount):
+                        if edge in followed:
+                            continue
+                        if len(transfers) >= limit:
+                            truncated = True
+                            break
+                        followed.add(edge)
+                        transfers.append({
+                            "from": self.labels[node],
+                            "to": self.labels[receiver],
+                            "amount": amount,
+                            "timestamp": timestamp,
+                            "txHash": tx_hash.hex() if tx_hash != _NO_HASH else None,
+                            "hop": hop
+                        })
+                        if timestamp < arrival.get(receiver, math.inf):
+                            arrival[receiver] = timestamp
+                            hops.setdefault(receiver, hop)
+                            next_frontier[receiver] = timestamp
+                    if truncated:
+                        break
+                if truncated or not next_frontier:
+                    break
+                frontier = next_frontier
+
+            return {
+                "address": address,
+                "startTime": start_time if math.isfinite(start_time) else None,
+                "endTime": end_time if math.isfinite(end_time) else None,
+                "maxHops": max_hops,
+                "minAmount": min_amount,
+                "wallets": [
+                    {"address": self.labels[node], "hop": hops[node], "arrivalTime": arrival[node]}
+                    for node in hops if node != origin
+                ],
+                "transfers": transfers,
+                "truncated": truncated
+            }
+
+    def _first_transfer_time(self, node: int) -> float:
+        times = [self.times[self.indptr[node]]] if self.indptr[node + 1] > self.indptr[node] else []
+        times.extend(entry[0] for entry in self.pending.get(node, ()))
+        return min(times) if times else -math.inf
+
+    def _out_edges(self, node: int, since: float, until: float, min_amount: float):
+        """Yield (edge key, receiver, amount, time, hash) of usable transfers, earliest first."""
+        lo, hi = self.indptr[node], self.indptr[node + 1]
+        if hi > lo:
+            times = self.times[lo:hi]
+            first = lo + int(np.searchsorted(times, since, "left"))
+            last = lo + int(np.searchsorted(times, until, "right"))
+            # Chunks keep the work proportional to what the trace consumes, even for hub wallets
+            for chunk in range(first, last, TRACE_CHUNK):
+                indexes = np.arange(chunk, min(chunk + TRACE_CHUNK, last))
+                if min_amount > 0:
+                    indexes = indexes[self.amounts[indexes] >= min_amount]
+                targets = self.targets[indexes].tolist()
+                amounts = self.amounts[indexes].tolist()
+                edge_times = self.times[indexes].tolist()
+                for i, edge in enumerate(indexes.tolist()):
+                    yield edge, targets[i], amounts[i], edge_times[i], self.hashes[edge].tobytes()
+
+        for i, (timestamp, receiver, amount, tx_hash) in enumerate(self.pending.get(node, ())):
+            if since <= timestamp <= until and amount >= min_amount:
+                yield ("pending", node, i), receiver, amount, timestamp, tx_hash
+
+    def transfer_arrays(self) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compact and return the whole graph as arrays for vectorized analysis.
+
+        Returns:
+            Node count, and the sender, receiver and amount of every transfer; the
+            arrays are replaced, never modified, by later compactions
+        """
+        with self.lock:
+            self.compact()
+            senders = np.repeat(np.arange(len(self.labels), dtype=np.int32), np.diff(self.indptr))
+            return len(self.labels), senders, self.targets, self.amounts
+
+    def stats(self) -> Dict[str, Any]:
+        """Wallet and transfer counts."""
+        return {"wallets": len(self.labels), "transfers": self.edge_count(), "pending": self.pending_count}
+
+    def edge_count(self) -> int:
+        """Number of transfers in the graph."""
+        return len(self.targets) + self.pending_count
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+def load_transactions(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a transaction export (a JSON array such as bhx_transactions_backup.json).
+
+    Args:
+        path: File to read
+
+    Returns:
+        Transaction records, or an empty list if the file cannot be read
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Transaction file {path} could not be loaded: {str(e)}")
+        return []
@@ -0,0 +1,230 @@
+"""
+Wallet Clusters for BHIV Core System
+
+This module links cases and wallets into clusters with an incremental
+union-find (disjoint-set) index. A case is linked to the wallet of each of its
+events, and a wallet is linked to every wallet it transferred to
+(metadata.toAddress, or from_address/to_address of a raw transaction). Cases in
+one cluster are therefore connected through shared wallets or chains of
+transfers, which the exact-address duplicate wallet check cannot see.
+
+Union by size with path halving keeps every link and lookup near O(alpha(n)),
+and each cluster root keeps its case list and wallet count, so no lookup rescans
+stored events. When a link joins two clusters that both contain cases, a
+cluster alert is raised, unless the link is a wallet already used directly by
+another case (that is a duplicate wallet alert). Links are never removed:
+evidence of a connection stays valid after the event is reprocessed.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable
+import logging
+
+from core.orchestration.rules import OrchestrationRules, orchestration_rules
+
+logger = logging.getLogger(__name__)
+
+# Case IDs listed in one cluster alert; the alert also carries the full count
+MAX_ALERT_CASE_IDS = 100
+
+# Case IDs returned per cluster lookup unless a limit is given
+CLUSTER_PAGE_SIZE = 100
+
+class WalletClusterIndex:
+    """Union-find index of cases and wallets connected by events and transfers."""
+
+    def __init__(self, rules: Optional[OrchestrationRules] = None):
+        self.rules = rules or orchestration_rules
+
+        # Node number of every case and wallet; both kinds share one forest
+        self.case_nodes: Dict[str, int] = {}
+        self.wallet_nodes: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+        # Forest state per node; sizes, wallet counts and case lists are valid on roots only
+        self.parent: List[int] = []
+        self.sizes: List[int] = []
+        self.wallet_counts: List[int] = []
+        self.cases: Dict[int, List[str]] = {}
+
+        # Wallets used directly by at least one case event
+        self.case_wallets = bytearray()
+
+        self.merges = 0
+
+    def add_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Link an event's case, wallet and transfer counterparty.
+
+        Args:
+            event: Event data containing caseId and metadata.walletAddress / toAddress
+
+        Returns:
+            Cluster alerts for clusters of cases this event joined
+        """
+        metadata = event.get("metadata") or {}
+        wallet_address = metadata.get("walletAddress")
+        case_id = event.get("caseId")
+        if not wallet_address:
+            return []
+
+        alerts = []
+        wallet = self._wallet(wallet_address)
+        if case_id is not None:
+            case = self._case(case_id)
+            # A case joining a wallet other cases already use is a duplicate wallet alert
+            alert = self._union(case, wallet, wallet_address, report=not self.case_wallets[wallet])
+            self.case_wallets[wallet] = 1
+            if alert is not None:
+                alerts.append(alert)
+
+        to_address = metadata.get("toAddress")
+        if to_address and to_address != wallet_address:
+            alert = self._union(wallet, self._wallet(to_address), wallet_address)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
+
+    def add_transaction(self, from_address: str, to_address: str) -> List[Dict[str, Any]]:
+        """
+        Link two wallets connected by a transfer.
+
+        Args:
+            from_address: Sending wallet
+            to_address: Receiving wallet
+
+        Returns:
+            Cluster alerts, if the transfer joined two clusters with cases
+        """
+        if not from_address or not to_address or from_address == to_address:
+            return []
+        alert = self._union(self._wallet(from_address), self._wallet(to_address), from_address)
+        return [alert] if alert is not None else []
+
+    def add_transactions(self, transactions: Iterable[Dict[str, Any]]) -> int:
+        """
+        Link the wallets of raw transaction records (from_address/to_address), such as a chain export.
+
+        Cluster alerts are not raised: the transfers predate the events already linked.
+
+        Args:
+            transactions: Transaction records
+
+        Returns:
+            Number of records that linked two wallets
+        """
+        linked = 0
+        for record in transactions:
+            from_address = record.get("from_address")
+            to_address = record.get("to_address")
+            if not from_address or not to_address or from_address == to_address:
+                continue
+            self._union(self._wallet(from_address), self._wallet(to_address), from_address, report=False)
+            linked += 1
+        return linked
+
+    def get_cluster(self, wallet_address: Optional[str] = None, case_id: Optional[str] = None,
+                    offset: int = 0, limit: int = CLUSTER_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        Get the cluster of a wallet or case, with one page of its case IDs.
+
+        Args:
+            wallet_address: Wallet to look up
+            case_id: Case to look up (used when no wallet is given)
+            offset: Index of the first case ID returned
+            limit: Maximum number of case IDs returned
+
+        Returns:
+            clusterId (the root's label, which changes when clusters merge), the page of
+            caseIds, caseCount, walletCount and offset, or None for unknown wallets and cases
+        """
+        node = self.wallet_nodes.get(wallet_address) if wallet_address is not None else self.case_nodes.get(case_id)
+        if node is None:
+            return None
+        root = self._find(node)
+        case_ids = self.cases.get(root, [])
+        return {
+            "clusterId": self.labels[root],
+            "caseIds": case_ids[offset:offset + limit],
+            "caseCount": len(case_ids),
+            "walletCount": self.wallet_counts[root],
+            "offset": offset
+        }
+
+    def same_cluster(self, first_case_id: str, second_case_id: str) -> bool:
+        """
+        Check whether two cases are connected.
+
+        Args:
+            first_case_id: Case ID
+            second_case_id: Case ID
+
+        Returns:
+            True if both are known and in the same cluster
+        """
+        first = self.case_nodes.get(first_case_id)
+        second = self.case_nodes.get(second_case_id)
+        return first is not None and second is not None and self._find(first) == self._find(second)
+
+    def _case(self, case_id: str) -> int:
+        node = self.case_nodes.get(case_id)
+        if node is None:
+            node = self.case_nodes[case_id] = self._add_node(f"case:{case_id}", 0)
+            self.cases[node] = [case_id]
+        return node
+
+    def _wallet(self, wallet_address: str) -> int:
+        node = self.wallet_nodes.get(wallet_address)
+        if node is None:
+            node = self.wallet_nodes[wallet_address] = self._add_node(f"wallet:{wallet_address}", 1)
+        return node
+
+    def _add_node(self, label: str, wallets: int) -> int:
+        node = len(self.parent)
+        self.labels.append(label)
+        self.parent.append(node)
+        self.sizes.append(1)
+        self.wallet_counts.append(wallets)
+        self.case_wallets.append(0)
+        return node
+
+    def _find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            # Path halving: point every other node on the path at its grandparent
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, first: int, second: int, wallet_address: str, report: bool = True) -> Optional[Dict[str, Any]]:
+        root, other = self._find(first), self._find(second)
+        if root == other:
+            return None
+        if self.sizes[root] < self.sizes[other]:
+            root, other = other, root
+        self.parent[other] = root
+        self.sizes[root] += self.sizes[other]
+        self.wallet_counts[root] += self.wallet_counts[other]
+
+        root_cases = self.cases.pop(root, None)
+        other_cases = self.cases.pop(other, None)
+        if not root_cases or not other_cases:
+            if root_cases or other_cases:
+                self.cases[root] = root_cases or other_cases
+            return None
+
+        # Append the smaller case list to the larger one
+        smaller, larger = sorted((root_cases, other_cases), key=len)
+        case_ids = smaller[:MAX_ALERT_CASE_IDS] + larger[:max(0, MAX_ALERT_CASE_IDS - len(smaller))]
+        larger.extend(smaller)
+        self.cases[root] = larger
+        self.merges += 1
+        if not report:
+            return None
+
+        alert = self.rules.build_cluster_alert(wallet_address, case_ids, len(larger), len(smaller),
+                                               self.wallet_counts[root])
+        logger.debug("Wallet cluster merged: %s", alert["details"])
+        return alert
+
+    def __len__(self) -> int:
+        return len(self.parent)
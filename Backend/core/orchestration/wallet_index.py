@@ -0,0 +1,126 @@
+"""
+Wallet Index for BHIV Core System
+
+This module maintains an incremental wallet address -> case index so that
+duplicate wallet alerts can be produced per event without rescanning every
+stored event.
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+from core.orchestration.rules import OrchestrationRules, orchestration_rules
+
+logger = logging.getLogger(__name__)
+
+class WalletCaseIndex:
+    """Incrementally maintained index of wallet addresses to the events and cases that reference them."""
+
+    def __init__(self, rules: Optional[OrchestrationRules] = None):
+        self.rules = rules or orchestration_rules
+
+        # walletAddress -> {coreEventId: caseId}, kept in arrival order
+        self.wallet_events: Dict[str, Dict[str, str]] = {}
+
+        # coreEventId -> walletAddress, used when an event is processed again
+        self.event_wallets: Dict[str, str] = {}
+
+    def add_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Index an event and return the duplicate wallet alerts it creates.
+
+        The alert payload for the event's wallet is identical to the one
+        OrchestrationRules.detect_duplicate_wallets would produce for that
+        wallet over all indexed events.
+
+        Args:
+            event: Event data containing coreEventId, caseId and metadata
+
+        Returns:
+            List with the duplicate wallet alert for the event's wallet, or an empty list
+        """
+        wallet_address = self.load_event(event)
+        if wallet_address is None:
+            return []
+
+        entries = self.wallet_events[wallet_address]
+        if len(entries) > 1:
+            alert = self.rules.build_duplicate_wallet_alert(wallet_address, entries.values())
+            logger.debug("Duplicate wallet detected: %s", alert["details"])
+            return [alert]
+
+        return []
+
+    def load_event(self, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Index an event without building alerts, e.g. when rebuilding from storage.
+
+        Args:
+            event: Event data containing coreEventId, caseId and metadata
+
+        Returns:
+            The event's wallet address, or None if it has none
+        """
+        core_event_id = event["coreEventId"]
+        metadata = event.get("metadata") or {}
+        wallet_address = metadata.get("walletAddress")
+
+        # A reprocessed event may have moved to a different wallet
+        previous_wallet = self.event_wallets.get(core_event_id)
+        if previous_wallet is not None and previous_wallet != wallet_address:
+            self._remove(core_event_id, previous_wallet)
+
+        if not wallet_address:
+            return None
+
+        self.wallet_events.setdefault(wallet_address, {})[core_event_id] = event["caseId"]
+        self.event_wallets[core_event_id] = wallet_address
+        return wallet_address
+
+    def remove_event(self, core_event_id: str) -> None:
+        """
+        Remove an event from the index.
+
+        Args:
+            core_event_id: Core event ID to remove
+        """
+        wallet_address = self.event_wallets.get(core_event_id)
+        if wallet_address is not None:
+            self._remove(core_event_id, wallet_address)
+
+    def get_case_ids(self, wallet_address: str) -> List[str]:
+        """
+        Get the distinct case IDs that reference a wallet.
+
+        Args:
+            wallet_address: Wallet address to look up
+
+        Returns:
+            Distinct case IDs in arrival order
+        """
+        entries = self.wallet_events.get(wallet_address, {})
+        return list(dict.fromkeys(entries.values()))
+
+    def get_alerts(self) -> List[Dict[str, Any]]:
+        """
+        Get duplicate wallet alerts for every indexed wallet.
+
+        Returns:
+            List of alerts, equivalent to a full detect_duplicate_wallets scan
+        """
+        return [
+            self.rules.build_duplicate_wallet_alert(wallet_address, entries.values())
+            for wallet_address, entries in self.wallet_events.items()
+            if len(entries) > 1
+        ]
+
+    def _remove(self, core_event_id: str, wallet_address: str) -> None:
+        entries = self.wallet_events.get(wallet_address)
+        if entries is not None:
+            entries.pop(core_event_id, None)
+            if not entries:
+                del self.wallet_events[wallet_address]
+        self.event_wallets.pop(core_event_id, None)
+
+    def __len__(self) -> int:
+        return len(self.wallet_events)
@@ -0,0 +1,211 @@
+"""
+Sliding-Window Detectors for BHIV Core System
+
+This module adds streaming pattern detection to the cross-case stage. For every
+wallet and every case it keeps time-window aggregates of the events seen: the
+number of events, the sum of their amounts and the number of amounts just under
+the high-value reporting threshold. Three alerts are derived from them:
+
+- velocity: too many events in the window
+- volume: too much value moved in the window
+- structuring: repeated amounts just under the threshold, a common way of
+  avoiding high-value review. The threshold is the high_value_transfer rule's
+  metadata.amount limit for the event (per currency when the rule sets
+  limits), read from the rule engine so the two cannot drift apart
+
+Events are bucketed by their own timestamp (ISO or epoch seconds), so a
+backfill of historical events is windowed as it happened; events without a
+usable timestamp use the clock.
+
+Each window is a ring of time buckets with running totals, so adding an event
+is O(1) amortized and memory per key is bounded by the bucket count. Keys that
+stay idle for longer than the TTL, or the least recently active keys beyond
+max_keys, are evicted.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from collections import OrderedDict
+import logging
+import time
+
+from core.orchestration.rules import OrchestrationRules, orchestration_rules
+from core.storage.monitoring_log import parse_time
+
+logger = logging.getLogger(__name__)
+
+class SlidingWindow:
+    """Bucketed sliding-window aggregates for one wallet or case."""
+
+    __slots__ = ["starts", "counts", "sums", "nears", "count", "total", "near", "cases", "last_bucket"]
+
+    def __init__(self, buckets: int):
+        # Bucket number currently held by each slot of the ring
+        self.starts = [-1] * buckets
+        self.counts = [0] * buckets
+        self.sums = [0.0] * buckets
+        self.nears = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.near = 0
+        # caseId -> bucket of its latest event, oldest first
+        self.cases: "OrderedDict[str, int]" = OrderedDict()
+        self.last_bucket = -1
+
+    def add(self, bucket: int, amount: float, near: bool, case_id: Optional[str], max_cases: int) -> None:
+        """Record an event in the given time bucket."""
+        size = len(self.starts)
+        bucket = max(bucket, self.last_bucket)
+        self._expire(bucket)
+
+        slot = bucket % size
+        if self.starts[slot] != bucket:
+            self.starts[slot] = bucket
+        self.counts[slot] += 1
+        self.sums[slot] += amount
+        self.count += 1
+        self.total += amount
+        if near:
+            self.nears[slot] += 1
+            self.near += 1
+
+        if case_id is not None:
+            self.cases[case_id] = bucket
+            self.cases.move_to_end(case_id)
+            if len(self.cases) > max_cases:
+                self.cases.popitem(last=False)
+        self.last_bucket = bucket
+
+    def case_ids(self) -> List[str]:
+        """Cases with an event in the current window, most recent last."""
+        return list(self.cases)
+
+    def _expire(self, bucket: int) -> None:
+        size = len(self.starts)
+        oldest_kept = bucket - size + 1
+        if bucket - self.last_bucket >= size:
+            # The whole window has passed since the last event
+            self.starts = [-1] * size
+            self.counts = [0] * size
+            self.sums = [0.0] * size
+            self.nears = [0] * size
+            self.count = 0
+            self.total = 0.0
+            self.near = 0
+            self.cases.clear()
+            return
+        # Only buckets that fell out of the window since the last event need clearing
+        for expired in range(self.last_bucket - size + 1, oldest_kept):
+            slot = expired % size
+            if self.starts[slot] == expired:
+                self.count -= self.counts[slot]
+                self.total -= self.sums[slot]
+                self.near -= self.nears[slot]
+                self.starts[slot] = -1
+                self.counts[slot] = 0
+                self.sums[slot] = 0.0
+                self.nears[slot] = 0
+        while self.cases and next(iter(self.cases.values())) < oldest_kept:
+            self.cases.popitem(last=False)
+
+class WindowDetectors:
+    """Velocity, volume and structuring detection over per-wallet and per-case sliding windows."""
+
+    def __init__(self, scopes: Iterable[str] = ("wallet", "case"), window_seconds: float = 3600.0,
+                 buckets: int = 60, velocity_limit: int = 10, volume_limit: float = 50000.0,
+                 structuring_threshold: Optional[float] = None, structuring_margin: float = 0.1,
+                 structuring_limit: int = 3, idle_ttl: Optional[float] = None, max_keys: int = 100000,
+                 max_case_ids: int = 20, rules: Optional[OrchestrationRules] = None,
+                 clock: Callable[[], float] = time.time):
+        self.rules = rules or orchestration_rules
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_width = window_seconds / buckets
+        self.velocity_limit = velocity_limit
+        self.volume_limit = volume_limit
+        # Amounts in [threshold * (1 - margin), threshold) count as near-threshold; without a
+        # fixed threshold the rules' high-value threshold for the event is used
+        self.structuring_threshold = structuring_threshold
+        self.structuring_margin = structuring_margin
+        self.structuring_limit = structuring_limit
+        self.idle_buckets = int((idle_ttl or window_seconds) // self.bucket_width)
+        self.max_keys = max_keys
+        self.max_case_ids = max_case_ids
+        self.clock = clock
+
+        # scope -> key -> window, least recently active first
+        self.windows: Dict[str, "OrderedDict[str, SlidingWindow]"] = {scope: OrderedDict() for scope in scopes}
+
+    def add_event(self, event: Dict[str, Any], include_wallet: bool = True) -> List[Dict[str, Any]]:
+        """
+        Add an event to its wallet and case windows and return the alerts they raise.
+
+        Args:
+            event: Event data containing caseId and metadata
+            include_wallet: Whether to update the wallet window (False when cross-case detection is off)
+
+        Returns:
+            List of window alerts
+        """
+        bucket = int(self._event_time(event) // self.bucket_width)
+        metadata = event.get("metadata") or {}
+        wallet_address = metadata.get("walletAddress")
+        case_id = event.get("caseId")
+        amount = metadata.get("amount")
+        amount = float(amount) if type(amount) in (int, float) else 0.0
+        threshold = self.structuring_threshold
+        if threshold is None:
+            threshold = self.rules.high_value_threshold(event)
+        near = threshold is not None and threshold * (1 - self.structuring_margin) <= amount < threshold
+
+        alerts = []
+        for scope, windows in self.windows.items():
+            key = wallet_address if scope == "wallet" else case_id
+            if not key or (scope == "wallet" and not include_wallet):
+                continue
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = SlidingWindow(self.buckets)
+            else:
+                windows.move_to_end(key)
+            window.add(bucket, amount, near, case_id, self.max_case_ids)
+            alerts.extend(self._check(scope, wallet_address if scope == "wallet" else None, window))
+            self._evict(windows, bucket)
+        return alerts
+
+    def _event_time(self, event: Dict[str, Any]) -> float:
+        timestamp = event.get("timestamp")
+        if type(timestamp) in (int, float):
+            return float(timestamp)
+        if isinstance(timestamp, str):
+            try:
+                return parse_time(timestamp)
+            except ValueError:
+                pass
+        return self.clock()
+
+    def _check(self, scope: str, wallet_address: Optional[str], window: SlidingWindow) -> List[Dict[str, Any]]:
+        triggered = []
+        if window.count >= self.velocity_limit:
+            triggered.append(("velocity", window.count))
+        if window.total >= self.volume_limit:
+            triggered.append(("volume", window.count))
+        if window.near >= self.structuring_limit:
+            triggered.append(("structuring", window.near))
+
+        alerts = []
+        for alert_type, count in triggered:
+            alert = self.rules.build_window_alert(alert_type, scope, wallet_address, window.case_ids(),
+                                                  count, window.total, self.window_seconds)
+            logger.debug("Window alert: %s", alert["details"])
+            alerts.append(alert)
+        return alerts
+
+    def _evict(self, windows: "OrderedDict[str, SlidingWindow]", bucket: int) -> None:
+        while windows:
+            oldest = next(iter(windows.values()))
+            if len(windows) <= self.max_keys and oldest.last_bucket > bucket - self.idle_buckets:
+                return
+            windows.popitem(last=False)
+
+    def __len__(self) -> int:
+        return sum(len(windows) for windows in self.windows.values())
@@ -0,0 +1,212 @@
+"""
+Compact Event Record for BHIV Core System
+
+This module provides the in-memory representation of stored case events. A
+plain event dict costs several hundred bytes before counting its nested
+metadata dict, 36-character UUID strings and ISO timestamp strings. EventRecord
+keeps the known fields in slots instead: UUIDs as 16 bytes, transaction hashes
+as raw bytes, timestamps as integer microseconds since the epoch and repeated
+strings (caseId, walletAddress, status, ...) interned so that every event of a
+case or wallet shares one string object. Identical metadata dicts (beyond
+walletAddress and amount) whose values are all scalars are shared between
+records; nested lists and dicts are copied in and out, so neither the caller
+nor other records see each other's changes.
+
+Records are converted back to dicts only when they leave the store. Values
+that cannot be stored compactly without changing them on the way out (for
+example a timestamp with a timezone) are kept unchanged in an overflow dict,
+so to_dict() always returns a dict equal to the one that was stored.
+"""
+
+from typing import Dict, Any, Optional, Callable, List, Tuple
+from datetime import datetime, timedelta
+import copy
+import sys
+import uuid
+
+class _Missing:
+    """Marks a field the stored event did not have. Pickled by name, so it stays one object."""
+
+    __slots__ = ()
+
+    def __reduce__(self) -> str:
+        return "_MISSING"
+
+    def __repr__(self) -> str:
+        return "_MISSING"
+
+_MISSING = _Missing()
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Shared read-only metadata remainders, keyed by their items
+_SHARED_METADATA: Dict[tuple, Dict[str, Any]] = {}
+
+# Immutable values that can be shared between records and handed out as they are
+_SCALARS = (str, int, float, bool, type(None))
+SHARED_METADATA_LIMIT = 65536
+
+def _encode_uuid(value: Any) -> Any:
+    if type(value) is str and len(value) == 36:
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return _MISSING
+        if str(parsed) == value:
+            return parsed.bytes
+    return _MISSING
+
+def _decode_uuid(value: bytes) -> str:
+    return str(uuid.UUID(bytes=value))
+
+def _encode_timestamp(value: Any) -> Any:
+    if type(value) is str:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return _MISSING
+        if parsed.tzinfo is None and parsed.isoformat() == value:
+            return (parsed - _EPOCH) // _MICROSECOND
+    return _MISSING
+
+def _decode_timestamp(value: int) -> str:
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+def _encode_hex(value: Any) -> Any:
+    if type(value) is str:
+        prefixed = value.startswith("0x")
+        digits = value[2:] if prefixed else value
+        try:
+            raw = bytes.fromhex(digits)
+        except ValueError:
+            return _MISSING
+        if raw.hex() == digits:
+            return (b"\x01" if prefixed else b"\x00") + raw
+    return _MISSING
+
+def _decode_hex(value: bytes) -> str:
+    return ("0x" if value[0] else "") + value[1:].hex()
+
+def _encode_interned(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else _MISSING
+
+def _encode_text(value: Any) -> Any:
+    return value if type(value) is str else _MISSING
+
+def _encode_score(value: Any) -> Any:
+    return value if type(value) in (int, float) else _MISSING
+
+def _copy_value(value: Any) -> Any:
+    return value if type(value) in _SCALARS else copy.deepcopy(value)
+
+# (event key, slot, encoder, decoder); encoders return _MISSING for values they cannot store
+_FIELDS: List[Tuple[str, str, Callable[[Any], Any], Optional[Callable[[Any], Any]]]] = [
+    ("coreEventId", "core_event_id", _encode_uuid, _decode_uuid),
+    ("caseId", "case_id", _encode_interned, None),
+    ("evidenceId", "evidence_id", _encode_text, None),
+    ("riskScore", "risk_score", _encode_score, None),
+    ("actionSuggested", "action_suggested", _encode_interned, None),
+    ("txHash", "tx_hash", _encode_hex, _decode_hex),
+    ("source", "source", _encode_interned, None),
+    ("status", "status", _encode_interned, None),
+    ("timestamp", "timestamp", _encode_timestamp, _decode_timestamp),
+    ("processedAt", "processed_at", _encode_timestamp, _decode_timestamp),
+]
+_FIELD_INDEX = {key: (slot, encode) for key, slot, encode, _ in _FIELDS}
+
+def _share(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    if not all(type(value) in _SCALARS for value in metadata.values()):
+        # Nested values are kept per record
+        return metadata
+    # Types are part of the key: 1, 1.0 and True are equal and hash alike
+    key = tuple((name, type(value), value) for name, value in metadata.items())
+    shared = _SHARED_METADATA.get(key)
+    if shared is not None:
+        return shared
+    if len(_SHARED_METADATA) < SHARED_METADATA_LIMIT:
+        _SHARED_METADATA[key] = metadata
+    return metadata
+
+class EventRecord:
+    """Slotted, compact copy of a case event dict."""
+
+    __slots__ = [slot for _, slot, _, _ in _FIELDS] + ["wallet_address", "amount", "metadata", "extra"]
+
+    def __init__(self):
+        for slot in EventRecord.__slots__:
+            setattr(self, slot, _MISSING)
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> "EventRecord":
+        """
+        Build a record from an event dict. The dict is not retained.
+
+        Args:
+            event: Event data
+
+        Returns:
+            Compact record
+        """
+        record = cls()
+        extra = None
+        for key, value in event.items():
+            field = _FIELD_INDEX.get(key)
+            if field is not None:
+                encoded = value if value is None else field[1](value)
+                if encoded is not _MISSING:
+                    setattr(record, field[0], encoded)
+                    continue
+            elif key == "metadata" and type(value) is dict:
+                record._set_metadata(value)
+                continue
+            if extra is None:
+                extra = {}
+            extra[key] = _copy_value(value)
+        record.extra = extra
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the record back to an event dict.
+
+        Returns:
+            New dict equal to the one the record was built from
+        """
+        event = {}
+        for key, slot, _, decode in _FIELDS:
+            value = getattr(self, slot)
+            if value is not _MISSING:
+                event[key] = value if decode is None or value is None else decode(value)
+        if self.metadata is not _MISSING:
+            metadata = {}
+            if self.wallet_address is not _MISSING:
+                metadata["walletAddress"] = self.wallet_address
+            if self.amount is not _MISSING:
+                metadata["amount"] = _copy_value(self.amount)
+            if self.metadata:
+                for key, value in self.metadata.items():
+                    metadata[key] = _copy_value(value)
+            event["metadata"] = metadata
+        if self.extra:
+            for key, value in self.extra.items():
+                event[key] = _copy_value(value)
+        return event
+
+    def _set_metadata(self, metadata: Dict[str, Any]) -> None:
+        rest = None
+        for key, value in metadata.items():
+            if key == "walletAddress" and type(value) is str:
+                self.wallet_address = sys.intern(value)
+            elif key == "amount":
+                self.amount = _copy_value(value)
+            else:
+                if rest is None:
+                    rest = {}
+                rest[key] = _copy_value(value)
+        # None means a metadata dict with no fields besides walletAddress and amount
+        self.metadata = rest if rest is None else _share(rest)
+
+    def __repr__(self) -> str:
+        return f"EventRecord({self.to_dict()!r})"
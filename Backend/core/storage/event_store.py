@@ -0,0 +1,508 @@
+"""
+Event Store for BHIV Core System
+
+This module provides the storage interface for core events, webhook events and
+monitoring events. Records are JSON documents grouped into named collections,
+each keyed by one field with optional secondary indexes. Two backends are
+available: an in-memory backend for development and tests, and a SQLite backend
+(WAL mode, batched commits) for deployments that need bounded memory and state
+that survives restarts. A third backend, in core.storage.wal_store, keeps state
+in memory and persists it with a write-ahead log and snapshots.
+
+The backend is selected with the CORE_STORE_URL environment variable:
+"memory" (default), "sqlite:///path/to/core.db" or "wal:///path/to/directory".
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Type
+from operator import itemgetter
+import atexit
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def get_field(record: Dict[str, Any], field: str) -> Any:
+    """
+    Read a possibly dotted field (e.g. "payload.eventType") from a record.
+
+    Args:
+        record: Record to read from
+        field: Field name, with dots separating nested keys
+
+    Returns:
+        Field value, or None if any part of the path is missing
+    """
+    value = record
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+class EventCollection(ABC):
+    """
+    Collection of JSON records keyed by one field, with optional secondary indexes.
+
+    Backends that hold records in process memory store them as record_type
+    (a class with from_dict/to_dict, such as EventRecord) when one is given.
+    Reads always return dicts.
+    """
+
+    def __init__(self, name: str, key_field: str, index_fields: Iterable[str] = (),
+                 record_type: Optional[Type] = None):
+        self.name = name
+        self.key_field = key_field
+        self.index_fields = list(index_fields)
+        self.record_type = record_type
+
+    @abstractmethod
+    def put(self, record: Dict[str, Any]) -> None:
+        """Insert or replace a record, keyed by its key field."""
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a record by key."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete a record by key, if present."""
+
+    @abstractmethod
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Get all records whose field equals value, in insertion order."""
+
+    def find_range(self, field: str, start: Any = None, end: Any = None) -> List[Dict[str, Any]]:
+        """Get all records with start <= field < end (either bound optional), in insertion order."""
+        return [
+            record for record in self.values()
+            if get_field(record, field) is not None
+            and (start is None or get_field(record, field) >= start)
+            and (end is None or get_field(record, field) < end)
+        ]
+
+    @abstractmethod
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over all records in insertion order."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every record."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace several records."""
+        for record in records:
+            self.put(record)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        record = self.get(key)
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __setitem__(self, key: str, record: Dict[str, Any]) -> None:
+        if record.get(self.key_field) != key:
+            raise ValueError(f"Record {self.key_field} does not match key {key}")
+        self.put(record)
+
+class EventStore(ABC):
+    """Storage backend holding named event collections."""
+
+    def __init__(self):
+        self.collections: Dict[str, EventCollection] = {}
+
+    def collection(self, name: str, key_field: str, index_fields: Iterable[str] = (),
+                   record_type: Optional[Type] = None) -> EventCollection:
+        """
+        Get or create a collection.
+
+        Args:
+            name: Collection name
+            key_field: Field holding the unique record key
+            index_fields: Fields to maintain secondary indexes on
+            record_type: Compact in-memory representation of the records (from_dict/to_dict)
+
+        Returns:
+            The collection
+        """
+        if name not in self.collections:
+            self.collections[name] = self._create_collection(name, key_field, index_fields, record_type)
+        return self.collections[name]
+
+    @abstractmethod
+    def _create_collection(self, name: str, key_field: str, index_fields: Iterable[str],
+                           record_type: Optional[Type]) -> EventCollection:
+        pass
+
+    def flush(self) -> None:
+        """Persist any buffered writes."""
+
+    def close(self) -> None:
+        """Flush and release backend resources."""
+        self.flush()
+
+class InMemoryEventCollection(EventCollection):
+    """Event collection held in Python dicts (or record_type instances)."""
+
+    def __init__(self, name: str, key_field: str, index_fields: Iterable[str] = (),
+                 record_type: Optional[Type] = None):
+        super().__init__(name, key_field, index_fields, record_type)
+        self.lock = threading.RLock()
+        self.records: Dict[str, Any] = {}
+
+        # key -> position of the record's first insertion
+        self.ordinals: Dict[str, int] = {}
+        self.next_ordinal = 0
+
+        # field -> value -> {key: None}, used as an insertion-ordered set
+        self.indexes: Dict[str, Dict[Any, Dict[str, None]]] = {field: {} for field in self.index_fields}
+
+        # (field, value) entries that received a record out of insertion order
+        self.unsorted = set()
+
+        # field -> [(value, ordinal, key)] sorted by value, built by the first find_range over an indexed field
+        self.ranges: Dict[str, List[tuple]] = {}
+
+    def put(self, record: Dict[str, Any]) -> None:
+        key = record[self.key_field]
+        with self.lock:
+            previous = self.records.get(key)
+            if previous is not None:
+                self._unindex(key, self._load(previous))
+            else:
+                self.ordinals[key] = self.next_ordinal
+                self.next_ordinal += 1
+            self.records[key] = record if self.record_type is None else self.record_type.from_dict(record)
+
+            ordinal = self.ordinals[key]
+            for field, index in self.indexes.items():
+                value = get_field(record, field)
+                keys = index.setdefault(value, {})
+                if keys and self.ordinals[next(reversed(keys))] > ordinal:
+                    self.unsorted.add((field, value))
+                keys[key] = None
+
+                ranges = self.ranges.get(field)
+                if ranges is not None and value is not None:
+                    try:
+                        # Values that arrive in order (such as receivedAt) are appended at the end
+                        bisect.insort(ranges, (value, ordinal, key))
+                    except TypeError:
+                        # Values that do not compare with the others: find_range scans instead
+                        del self.ranges[field]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        record = self.records.get(key)
+        return default if record is None else self._load(record)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            record = self.records.pop(key, None)
+            if record is not None:
+                self._unindex(key, self._load(record))
+                del self.ordinals[key]
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        with self.lock:
+            if field in self.indexes:
+                index = self.indexes[field]
+                if (field, value) in self.unsorted and value in index:
+                    index[value] = dict.fromkeys(sorted(index[value], key=self.ordinals.__getitem__))
+                    self.unsorted.discard((field, value))
+                return [self._load(self.records[key]) for key in index.get(value, {})]
+            records = map(self._load, self.records.values())
+            return [record for record in records if get_field(record, field) == value]
+
+    def find_range(self, field: str, start: Any = None, end: Any = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            ranges = self._range_index(field)
+            if ranges is None:
+                return super().find_range(field, start, end)
+            low = 0 if start is None else bisect.bisect_left(ranges, (start,))
+            high = len(ranges) if end is None else bisect.bisect_left(ranges, (end,))
+            entries = sorted(ranges[low:high], key=itemgetter(1))
+            return [self._load(self.records[key]) for _, _, key in entries]
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        with self.lock:
+            records = list(self.records.values())
+        return iter(records) if self.record_type is None else map(self._load, records)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.records.clear()
+            self.ordinals.clear()
+            self.unsorted.clear()
+            self.ranges.clear()
+            for index in self.indexes.values():
+                index.clear()
+
+    def _load(self, stored: Any) -> Dict[str, Any]:
+        return stored if self.record_type is None else stored.to_dict()
+
+    def _range_index(self, field: str) -> Optional[List[tuple]]:
+        if field not in self.indexes:
+            return None
+        ranges = self.ranges.get(field)
+        if ranges is None:
+            # Built from the hash index, so no record is decoded
+            ranges = [(value, self.ordinals[key], key)
+                      for value, keys in self.indexes[field].items() if value is not None for key in keys]
+            try:
+                ranges.sort()
+            except TypeError:
+                return None
+            self.ranges[field] = ranges
+        return ranges
+
+    def _unindex(self, key: str, record: Dict[str, Any]) -> None:
+        for field, index in self.indexes.items():
+            value = get_field(record, field)
+            keys = index.get(value)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del index[value]
+
+            ranges = self.ranges.get(field)
+            if ranges is not None and value is not None:
+                entry = (value, self.ordinals[key], key)
+                position = bisect.bisect_left(ranges, entry)
+                if position < len(ranges) and ranges[position] == entry:
+                    del ranges[position]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+class InMemoryEventStore(EventStore):
+    """Event store that keeps every collection in process memory."""
+
+    def _create_collection(self, name: str, key_field: str, index_fields: Iterable[str],
+                           record_type: Optional[Type]) -> EventCollection:
+        return InMemoryEventCollection(name, key_field, index_fields, record_type)
+
+class SQLiteEventCollection(EventCollection):
+    """Event collection stored in one SQLite table."""
+
+    def __init__(self, store: "SQLiteEventStore", name: str, key_field: str, index_fields: Iterable[str] = (),
+                 record_type: Optional[Type] = None):
+        # Records live in SQLite, so record_type is not needed
+        super().__init__(name, key_field, index_fields, record_type)
+        self.store = store
+        self.pending: List[tuple] = []
+
+        table = self.name
+        columns = {field: "idx_" + field.replace(".", "_") for field in self.index_fields}
+        self.columns = columns
+
+        column_defs = "".join(f", {column}" for column in columns.values())
+        store.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY{column_defs}, data TEXT NOT NULL)"
+        )
+        for column in columns.values():
+            store.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+        store.connection.commit()
+
+        # Statements are built once and reused so sqlite3 serves them from its statement cache
+        placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+        updates = "".join(f"{column} = excluded.{column}, " for column in columns.values())
+        self.upsert_sql = (
+            f"INSERT INTO {table} (key{column_defs}, data) VALUES ({placeholders}) "
+            f"ON CONFLICT(key) DO UPDATE SET {updates}data = excluded.data"
+        )
+        self.get_sql = f"SELECT data FROM {table} WHERE key = ?"
+        self.delete_sql = f"DELETE FROM {table} WHERE key = ?"
+        self.count_sql = f"SELECT COUNT(*) FROM {table}"
+        self.page_sql = f"SELECT rowid, data FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        self.find_sql = {
+            field: f"SELECT data FROM {table} WHERE {column} = ? ORDER BY rowid"
+            for field, column in columns.items()
+        }
+
+    def put(self, record: Dict[str, Any]) -> None:
+        row = (record[self.key_field],)
+        row += tuple(get_field(record, field) for field in self.columns)
+        row += (json.dumps(record, default=str, separators=(",", ":")),)
+        with self.store.lock:
+            self.pending.append(row)
+            self.store.note_writes(1)
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        rows = [
+            (record[self.key_field],)
+            + tuple(get_field(record, field) for field in self.columns)
+            + (json.dumps(record, default=str, separators=(",", ":")),)
+            for record in records
+        ]
+        with self.store.lock:
+            self.pending.extend(rows)
+            self.store.note_writes(len(rows))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.store.lock:
+            self.write_pending()
+            row = self.store.connection.execute(self.get_sql, (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def delete(self, key: str) -> None:
+        with self.store.lock:
+            self.write_pending()
+            self.store.connection.execute(self.delete_sql, (key,))
+            self.store.note_writes(1)
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        if field not in self.find_sql:
+            return [record for record in self.values() if get_field(record, field) == value]
+        with self.store.lock:
+            self.write_pending()
+            rows = self.store.connection.execute(self.find_sql[field], (value,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_range(self, field: str, start: Any = None, end: Any = None) -> List[Dict[str, Any]]:
+        if field not in self.columns:
+            return super().find_range(field, start, end)
+        column = self.columns[field]
+        conditions = [f"{column} IS NOT NULL"]
+        params = []
+        if start is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{column} < ?")
+            params.append(end)
+        sql = f"SELECT data FROM {self.name} WHERE {' AND '.join(conditions)} ORDER BY rowid"
+        with self.store.lock:
+            self.write_pending()
+            rows = self.store.connection.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def values(self, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        last_rowid = 0
+        while True:
+            with self.store.lock:
+                self.write_pending()
+                rows = self.store.connection.execute(self.page_sql, (last_rowid, page_size)).fetchall()
+            for rowid, data in rows:
+                yield json.loads(data)
+            if len(rows) < page_size:
+                return
+            last_rowid = rows[-1][0]
+
+    def clear(self) -> None:
+        with self.store.lock:
+            self.pending.clear()
+            self.store.connection.execute(f"DELETE FROM {self.name}")
+            self.store.connection.commit()
+
+    def write_pending(self) -> None:
+        """Send buffered rows to SQLite inside the current transaction (caller holds the lock)."""
+        if self.pending:
+            self.store.connection.executemany(self.upsert_sql, self.pending)
+            self.pending.clear()
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            self.write_pending()
+            return self.store.connection.execute(self.count_sql).fetchone()[0]
+
+class SQLiteEventStore(EventStore):
+    """
+    Event store backed by a SQLite database in WAL mode.
+
+    Writes are buffered per collection and committed in batches, either once
+    commit_batch_size writes have accumulated or commit_interval seconds have
+    passed since the last commit. Reads on the same store always see buffered
+    writes.
+    """
+
+    def __init__(self, path: str, commit_batch_size: int = 500, commit_interval: float = 1.0):
+        super().__init__()
+        self.path = path
+        self.commit_batch_size = commit_batch_size
+        self.commit_interval = commit_interval
+        self.lock = threading.RLock()
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        atexit.register(self.close)
+        logger.info(f"SQLite event store opened at {path}")
+
+    def _create_collection(self, name: str, key_field: str, index_fields: Iterable[str],
+                           record_type: Optional[Type]) -> EventCollection:
+        with self.lock:
+            return SQLiteEventCollection(self, name, key_field, index_fields, record_type)
+
+    def note_writes(self, count: int) -> None:
+        """Record buffered writes and commit if the batch is full or stale (caller holds the lock)."""
+        self.uncommitted += count
+        if self.uncommitted >= self.commit_batch_size or time.monotonic() - self.last_commit >= self.commit_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.connection is None:
+                return
+            for collection in self.collections.values():
+                collection.write_pending()
+            self.connection.commit()
+            self.uncommitted = 0
+            self.last_commit = time.monotonic()
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is None:
+                return
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+def create_event_store(url: Optional[str] = None) -> EventStore:
+    """
+    Create an event store from a store URL.
+
+    Args:
+        url: "memory", "sqlite:///path/to/file.db" or "wal:///path/to/directory";
+             defaults to CORE_STORE_URL or "memory"
+
+    Returns:
+        A new event store
+    """
+    url = url or os.environ.get("CORE_STORE_URL", "memory")
+    if url == "memory":
+        return InMemoryEventStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteEventStore(url[len("sqlite:///"):])
+    if url.startswith("wal:///"):
+        # Imported here because wal_store builds on the collections defined in this module
+        from core.storage.wal_store import WALEventStore
+        return WALEventStore(url[len("wal:///"):])
+    raise ValueError(f"Unsupported event store URL: {url}")
+
+# Process-wide store shared by the core services
+_event_store: Optional[EventStore] = None
+
+def get_event_store() -> EventStore:
+    """Get the process-wide event store, creating it from CORE_STORE_URL on first use."""
+    global _event_store
+    if _event_store is None:
+        _event_store = create_event_store()
+    return _event_store
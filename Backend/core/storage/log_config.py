@@ -0,0 +1,87 @@
+"""
+Logging Configuration for BHIV Core System
+
+This module keeps logging off the event processing hot path. Per-event messages
+are logged at DEBUG with lazy %-formatting, and only for a sample of events
+(LogSampler), so at the default INFO level they cost one level check.
+Modules only create their loggers; the entry points (the API startup hooks and
+the import command) call configure_logging(), which adds a stderr handler, sets
+the level and moves handler I/O to a background thread: records are put on a
+queue by a QueueHandler and written by a QueueListener.
+
+Settings come from environment variables:
+- CORE_LOG_LEVEL: root log level (default INFO)
+- CORE_LOG_QUEUE: set to 0 to write log records on the calling thread
+- CORE_LOG_SAMPLE_EVERY: log per-event DEBUG details for 1 in N events (default 100)
+"""
+
+from typing import Optional
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+
+logger = logging.getLogger(__name__)
+
+# Per-event DEBUG details are logged for one event in this many
+DEFAULT_SAMPLE_EVERY = 100
+
+class LogSampler:
+    """Decides which events get their DEBUG details logged."""
+
+    def __init__(self, target: logging.Logger, every: Optional[int] = None):
+        self.logger = target
+        self.every = max(1, every or int(os.environ.get("CORE_LOG_SAMPLE_EVERY", DEFAULT_SAMPLE_EVERY)))
+        self.counter = itertools.count()
+
+    def __call__(self) -> bool:
+        """True if DEBUG is enabled and this event is in the sample."""
+        return self.logger.isEnabledFor(logging.DEBUG) and next(self.counter) % self.every == 0
+
+# Listener writing queued records, when queued logging is configured
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(level: Optional[str] = None, queued: Optional[bool] = None) -> None:
+    """
+    Set the root log level and optionally route records through a background writer.
+
+    Args:
+        level: Level name; defaults to CORE_LOG_LEVEL or INFO
+        queued: Write records on a background thread; defaults to CORE_LOG_QUEUE (on)
+    """
+    global _listener
+    # Adds a stderr handler unless the root logger already has handlers
+    logging.basicConfig()
+    root = logging.getLogger()
+    root.setLevel((level or os.environ.get("CORE_LOG_LEVEL", "INFO")).upper())
+    if queued is None:
+        queued = os.environ.get("CORE_LOG_QUEUE", "1").lower() not in ("0", "false", "no")
+    if not queued or _listener is not None:
+        return
+
+    # The existing handlers (stderr from basicConfig) move behind the queue
+    handlers = list(root.handlers)
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    logger.info(f"Queued logging enabled at level {logging.getLevelName(root.level)}")
+
+def stop_logging() -> None:
+    """Write out queued log records and restore the original handlers."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
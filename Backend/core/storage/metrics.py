@@ -0,0 +1,301 @@
+"""
+Metrics for BHIV Core System
+
+This module provides counters, gauges and histograms exposed in the Prometheus
+text format on the /metrics endpoints of the core services. Instruments are
+registered in a process-wide registry. Values that already live elsewhere
+(queue depths, storage sizes, alert and delivery totals) are read at scrape time
+by collectors the apps register, so they cost nothing on the hot path.
+
+Hot paths are timed with the `timed` decorator or `Histogram.time()`. When
+metrics are disabled with CORE_METRICS_ENABLED=0, timers skip the clock and
+only pay for one flag check.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+from bisect import bisect_left
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from 10µs (a single rule evaluation) to 10s (slow requests)
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric name, labels, value) as produced by collectors
+Sample = Tuple[str, Dict[str, Any], float]
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base for metrics with optional labels; each label combination gets a child."""
+
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values: Any, **labels: Any):
+        """Get the child for a combination of label values."""
+        key = tuple(str(v) for v in values) if values else tuple(str(labels[n]) for n in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[Sample]:
+        result = []
+        for key, child in list(self.children.items()):
+            result.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return result
+
+class _CounterChild:
+    def __init__(self, registry: "MetricsRegistry"):
+        self.registry = registry
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: Dict[str, Any]) -> List[Sample]:
+        return [(f"{name}_total", labels, self.value)]
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self.registry)
+
+    def inc(self, amount: float = 1) -> None:
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+
+class _HistogramChild:
+    def __init__(self, registry: "MetricsRegistry", buckets: Tuple[float, ...]):
+        self.registry = registry
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not self.registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def samples(self, name: str, labels: Dict[str, Any]) -> List[Sample]:
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            result.append((f"{name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative))
+        result.append((f"{name}_sum", labels, total))
+        result.append((f"{name}_count", labels, cumulative))
+        return result
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies in seconds) over cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.registry, self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record a value in the unlabelled histogram."""
+        self.labels().observe(value)
+
+    def time(self) -> "_Timer":
+        """Context manager recording the duration of its block."""
+        return _Timer(self.labels())
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+        self.start = None
+
+    def __enter__(self) -> "_Timer":
+        if self.child.registry.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.start is not None:
+            self.child.observe(time.perf_counter() - self.start)
+
+class MetricsRegistry:
+    """Process-wide set of metrics and scrape-time collectors."""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.environ.get("CORE_METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+        self.enabled = enabled
+        self.metrics: Dict[str, _Metric] = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                # Modules imported twice (e.g. as script and module) share the instrument
+                return existing
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Create or get a counter; the exposed name gets a _total suffix."""
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create or get a histogram."""
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def render(self, collectors: Iterable[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = ()) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Args:
+            collectors: Callables returning (name, type, help, samples) families read at scrape time
+
+        Returns:
+            Exposition text
+        """
+        families = [(m.name, m.kind, m.documentation, m.samples()) for m in list(self.metrics.values())]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def timed(histogram: Histogram, **labels: Any) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording each call's duration in a histogram.
+
+    Args:
+        histogram: Histogram to record in
+        labels: Label values of the child to record in
+
+    Returns:
+        Decorator
+    """
+    child = histogram.labels(**labels)
+    registry = histogram.registry
+
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def gauge_family(name: str, documentation: str, values: Iterable[Tuple[Dict[str, Any], float]]):
+    """Build a gauge family for a collector from (labels, value) pairs."""
+    return (name, "gauge", documentation, [(name, labels, value) for labels, value in values])
+
+def counter_family(name: str, documentation: str, values: Iterable[Tuple[Dict[str, Any], float]]):
+    """Build a counter family for a collector from (labels, value) pairs of running totals."""
+    return (name, "counter", documentation, [(f"{name}_total", labels, value) for labels, value in values])
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per method, route template and status."""
+
+    def __init__(self, app, service: str, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.service = service
+        self.registry = registry or metrics_registry
+        self.histogram = self.registry.histogram(
+            "core_http_request_duration_seconds", "HTTP request latency", ("service", "method", "route", "status"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Route templates keep path parameters out of the label values
+            route = scope.get("route")
+            self.histogram.labels(
+                service=self.service,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code
+            ).observe(time.perf_counter() - start)
+
+# Process-wide registry shared by the core services
+metrics_registry = MetricsRegistry()
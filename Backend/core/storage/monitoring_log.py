@@ -0,0 +1,287 @@
+"""
+Monitoring Log for BHIV Core System
+
+This module provides a fixed-capacity ring buffer for monitoring events with a
+per-eventType index, arrival-time range queries and cursor pagination. Each
+logged event is assigned an increasing "sequence" number that clients pass back
+as the "since" cursor. With a persistent event store (SQLite or WAL), the
+retained window is mirrored to a collection in it so the log survives restarts;
+with the in-memory store the ring buffer is the only copy. Listeners are
+called with every newly logged event, in sequence order.
+
+The capacity is set with the CORE_MONITORING_CAPACITY environment variable
+(default 10000).
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from datetime import datetime
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+
+from core.storage.event_store import EventCollection, EventStore, InMemoryEventStore, get_event_store
+
+logger = logging.getLogger(__name__)
+
+# Default number of monitoring events retained
+DEFAULT_CAPACITY = 10000
+
+# Event IDs for high-volume monitoring events: a random per-process prefix and a counter
+_EVENT_ID_PREFIX = uuid.uuid4().hex[:16]
+_event_id_counter = itertools.count()
+
+def new_event_id() -> str:
+    """Get a unique monitoring event ID, much cheaper than uuid4()."""
+    return f"{_EVENT_ID_PREFIX}-{next(_event_id_counter):016x}"
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an ISO 8601 timestamp into epoch seconds.
+
+    Args:
+        value: ISO timestamp, optionally ending in "Z"
+
+    Returns:
+        Epoch seconds, or None if value is None
+    """
+    if value is None:
+        return None
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value).timestamp()
+
+def local_isoformat(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize an ISO 8601 timestamp to the naive local time form stored fields
+    such as receivedAt use (datetime.now().isoformat()), so the two compare correctly.
+
+    Args:
+        value: ISO timestamp, optionally ending in "Z" or carrying an offset
+
+    Returns:
+        Naive local ISO timestamp, or None if value is None
+    """
+    seconds = parse_time(value)
+    return None if seconds is None else datetime.fromtimestamp(seconds).isoformat()
+
+class MonitoringLog:
+    """Ring buffer of monitoring events indexed by sequence, eventType and arrival time."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, collection: Optional[EventCollection] = None):
+        self.capacity = capacity
+        self.collection = collection
+        self.lock = threading.Lock()
+
+        # Slot for sequence n is n % capacity
+        self.records: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.times: List[float] = [0.0] * capacity
+        self.next_sequence = 0
+
+        # Sequences below the floor were cleared and are never returned
+        self.floor = 0
+
+        # eventType -> increasing sequences; entries before the head have been evicted
+        self.type_sequences: Dict[str, List[int]] = {}
+        self.type_heads: Dict[str, int] = {}
+
+        # Called with each appended record while the lock is held, so they must not block
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        if collection is not None:
+            self._load(collection)
+
+    @property
+    def first_sequence(self) -> int:
+        """Sequence number of the oldest retained event."""
+        return max(self.floor, self.next_sequence - self.capacity)
+
+    def append(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Log a monitoring event, evicting the oldest one when the buffer is full.
+
+        Args:
+            event: Monitoring event with eventId, eventType, status and timestamp
+
+        Returns:
+            The stored event, including its assigned sequence number
+        """
+        with self.lock:
+            record = dict(event)
+            record["sequence"] = self.next_sequence
+            record.setdefault("loggedAt", time.time())
+            if self.next_sequence >= self.capacity:
+                self._evict(self.next_sequence - self.capacity)
+
+            slot = self.next_sequence % self.capacity
+            self.records[slot] = record
+            self.times[slot] = record["loggedAt"]
+            self.type_sequences.setdefault(record.get("eventType"), []).append(self.next_sequence)
+            self.type_heads.setdefault(record.get("eventType"), 0)
+            self.next_sequence += 1
+
+            if self.collection is not None:
+                self.collection.put(record)
+            for listener in self.listeners:
+                listener(record)
+            return record
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call listener with every event logged from now on."""
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Stop calling a listener added with add_listener."""
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def query(self, event_type: Optional[str] = None, since: Optional[int] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get retained monitoring events in sequence order.
+
+        Args:
+            event_type: Only return events of this type
+            since: Only return events with a sequence greater than this cursor
+            start: Only return events logged at or after this epoch time
+            end: Only return events logged before this epoch time
+            limit: Maximum number of events; without a cursor the most recent ones are returned
+
+        Returns:
+            List of monitoring events
+        """
+        with self.lock:
+            if event_type is None:
+                sequences = range(self.first_sequence, self.next_sequence)
+            else:
+                type_list = self.type_sequences.get(event_type)
+                if not type_list:
+                    return []
+                sequences = _ListView(type_list, self.type_heads[event_type])
+
+            lo, hi = 0, len(sequences)
+            if since is not None:
+                lo = max(lo, _bisect(sequences, since, lo, hi, lambda seq: seq))
+            if start is not None:
+                lo = max(lo, _bisect(sequences, start, lo, hi, self._time_of, right=False))
+            if end is not None:
+                hi = min(hi, _bisect(sequences, end, lo, hi, self._time_of, right=False))
+
+            if limit is not None and hi - lo > limit:
+                if since is None:
+                    lo = hi - limit
+                else:
+                    hi = lo + limit
+
+            records = (self.records[sequences[i] % self.capacity] for i in range(lo, hi))
+            return [record for record in records if record is not None]
+
+    def _time_of(self, sequence: int) -> float:
+        return self.times[sequence % self.capacity]
+
+    def _evict(self, sequence: int) -> None:
+        slot = sequence % self.capacity
+        record = self.records[slot]
+        self.records[slot] = None
+        if record is None:
+            return
+
+        event_type = record.get("eventType")
+        head = self.type_heads[event_type] + 1
+        type_list = self.type_sequences[event_type]
+        if head == len(type_list):
+            del self.type_sequences[event_type]
+            del self.type_heads[event_type]
+        elif head > 1024 and head * 2 > len(type_list):
+            # Compact the evicted prefix so type lists stay proportional to the window
+            del type_list[:head]
+            self.type_heads[event_type] = 0
+        else:
+            self.type_heads[event_type] = head
+
+        if self.collection is not None:
+            self.collection.delete(sequence)
+
+    def _load(self, collection: EventCollection) -> None:
+        records = sorted(collection.values(), key=lambda record: record["sequence"])
+        for record in records[:-self.capacity]:
+            collection.delete(record["sequence"])
+        records = records[-self.capacity:]
+        if records:
+            self.next_sequence = self.floor = records[0]["sequence"]
+        collection, self.collection = self.collection, None
+        for record in records:
+            self.next_sequence = record["sequence"]
+            self.append(record)
+        self.collection = collection
+        if records:
+            logger.info(f"Restored {len(records)} monitoring events")
+
+    def clear(self) -> None:
+        """Remove every retained event."""
+        with self.lock:
+            self.records = [None] * self.capacity
+            self.times = [0.0] * self.capacity
+            self.type_sequences.clear()
+            self.type_heads.clear()
+            self.floor = self.next_sequence
+            if self.collection is not None:
+                self.collection.clear()
+
+    def __len__(self) -> int:
+        return self.next_sequence - self.first_sequence
+
+class _ListView:
+    """Read-only view of a list from a head offset onwards."""
+
+    def __init__(self, items: List[int], head: int):
+        self.items = items
+        self.head = head
+
+    def __getitem__(self, index: int) -> int:
+        return self.items[self.head + index]
+
+    def __len__(self) -> int:
+        return len(self.items) - self.head
+
+def _bisect(sequences, value, lo: int, hi: int, key, right: bool = True) -> int:
+    """Binary search over increasing key(sequences[i]); right=True skips entries equal to value."""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_value = key(sequences[mid])
+        if mid_value < value or (right and mid_value == value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+# Process-wide monitoring log shared by the core services
+_monitoring_log: Optional[MonitoringLog] = None
+
+def monitoring_collection(store: EventStore) -> Optional[EventCollection]:
+    """
+    Get the collection a monitoring log should mirror its window to.
+
+    Args:
+        store: Event store of the service
+
+    Returns:
+        The store's monitoring_events collection, or None for the in-memory
+        backend, where the ring buffer is the only copy
+    """
+    if isinstance(store, InMemoryEventStore):
+        return None
+    return store.collection("monitoring_events", "sequence")
+
+def get_monitoring_log() -> MonitoringLog:
+    """Get the process-wide monitoring log, persisted in the process-wide event store when it is persistent."""
+    global _monitoring_log
+    if _monitoring_log is None:
+        capacity = int(os.environ.get("CORE_MONITORING_CAPACITY", DEFAULT_CAPACITY))
+        _monitoring_log = MonitoringLog(capacity, monitoring_collection(get_event_store()))
+    return _monitoring_log
@@ -0,0 +1,498 @@
+"""
+Write-Ahead Log Event Store for BHIV Core System
+
+This module provides an event store that keeps every collection in process
+memory (like InMemoryEventStore) and makes it durable with an append-only
+write-ahead log and periodic snapshots:
+
+- Every put, delete and clear is appended to the current WAL segment as a
+  length-prefixed binary frame (payload length, CRC32, op, collection name,
+  JSON payload). Frames are buffered in memory and a background committer
+  thread writes them with one write + fsync per group: once group_commit_size
+  writes have accumulated or every group_commit_interval seconds. Writers only
+  append to the buffer, so no I/O happens on the caller's thread (or event loop).
+- Every snapshot_every writes (or on snapshot()) the WAL is rotated to a new
+  segment and the full state is written to a snapshot file, after which older
+  segments are deleted. Snapshots are copy-on-write: the record maps are copied
+  (references only) at rotation, and because writes replace records rather than
+  modify them, the copy is serialized on a background thread while writes and
+  group commits continue.
+- A snapshot section holds the collection's records as they are kept in memory
+  (EventRecord instances or dicts), pickled in chunks together with their keys
+  and the values of the indexed fields. Recovery loads each chunk with one
+  pickle.loads and fills the record, ordinal and index maps in bulk, with no
+  per-record JSON decoding or EventRecord construction. Snapshots are local
+  files written by this store and are trusted as such.
+- On startup the snapshot is memory-mapped and each collection is rebuilt from
+  its snapshot section when it is first opened. The WAL segments written after
+  the snapshot are parsed once and their frames kept per collection until it
+  is opened. A torn or corrupt frame at the end of the log (a crash mid-write)
+  ends the replay.
+
+Writes acknowledged since the last group commit can be lost on a crash, the
+same trade-off as the batched SQLite backend.
+
+The backend is selected with CORE_STORE_URL="wal:///path/to/directory".
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Tuple, Type
+import atexit
+import gc
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from core.storage.event_store import EventCollection, EventStore, InMemoryEventCollection, get_field
+
+logger = logging.getLogger(__name__)
+
+OP_PUT = 1
+OP_DELETE = 2
+OP_CLEAR = 3
+OP_CREATE = 4
+
+# WAL frame header: payload length, CRC32 of name + payload, op, name length
+_FRAME = struct.Struct("<IIBB")
+
+# Snapshot header: magic, WAL generation the snapshot includes. Version 1 snapshots
+# (one JSON document per record) are still read.
+SNAPSHOT_MAGIC = b"BHIVSNP2"
+JSON_SNAPSHOT_MAGIC = b"BHIVSNP1"
+_SNAPSHOT_HEADER = struct.Struct("<8sq")
+
+# Records per pickled snapshot chunk
+SNAPSHOT_CHUNK = 65536
+
+# Snapshot section header: name length, key field length, record count, record bytes
+_SECTION = struct.Struct("<BBQQ")
+_LENGTH = struct.Struct("<I")
+
+SNAPSHOT_FILE = "snapshot.bin"
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+def encode_frame(op: int, name: bytes, payload: bytes = b"") -> bytes:
+    """
+    Encode one WAL frame.
+
+    Args:
+        op: OP_PUT, OP_DELETE, OP_CLEAR or OP_CREATE
+        name: Collection name
+        payload: Encoded record, key or key field
+
+    Returns:
+        Frame bytes
+    """
+    body = name + payload
+    return _FRAME.pack(len(payload), zlib.crc32(body), op, len(name)) + body
+
+def read_frames(path: str) -> Tuple[List[Tuple[int, str, bytes]], int]:
+    """
+    Read the valid frames of a WAL segment.
+
+    Args:
+        path: Segment file
+
+    Returns:
+        (op, collection name, payload) frames in log order, and the byte length
+        of the valid prefix; anything after it is a torn or corrupt tail
+    """
+    frames = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return frames, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            while offset + _FRAME.size <= size:
+                length, crc, op, name_length = _FRAME.unpack_from(data, offset)
+                start = offset + _FRAME.size
+                end = start + name_length + length
+                if end > size:
+                    break
+                body = data[start:end]
+                if zlib.crc32(body) != crc:
+                    break
+                frames.append((op, body[:name_length].decode("utf-8"), body[name_length:]))
+                offset = end
+    return frames, offset
+
+class WALEventCollection(InMemoryEventCollection):
+    """In-memory event collection whose changes are logged to the store's WAL."""
+
+    def __init__(self, store: "WALEventStore", name: str, key_field: str, index_fields: Iterable[str] = (),
+                 record_type: Optional[Type] = None):
+        super().__init__(name, key_field, index_fields, record_type)
+        self.store = store
+        self.encoded_name = name.encode("utf-8")
+
+    def put(self, record: Dict[str, Any]) -> None:
+        frame = encode_frame(OP_PUT, self.encoded_name, _encode(record))
+        with self.store.lock:
+            self.store.log(frame)
+            super().put(record)
+        self.store.note_writes(1)
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        records = list(records)
+        frames = b"".join(encode_frame(OP_PUT, self.encoded_name, _encode(record)) for record in records)
+        with self.store.lock:
+            self.store.log(frames, len(records))
+            for record in records:
+                super().put(record)
+        self.store.note_writes(len(records))
+
+    def delete(self, key: str) -> None:
+        with self.store.lock:
+            if key not in self.records:
+                return
+            self.store.log(encode_frame(OP_DELETE, self.encoded_name, _encode(key)))
+            super().delete(key)
+        self.store.note_writes(1)
+
+    def clear(self) -> None:
+        with self.store.lock:
+            self.store.log(encode_frame(OP_CLEAR, self.encoded_name))
+            super().clear()
+        self.store.note_writes(1)
+
+    def load_chunk(self, keys: List[str], stored: List[Any], columns: Dict[str, List[Any]]) -> None:
+        """
+        Add a snapshot chunk during recovery, without logging it again.
+
+        Args:
+            keys: Record keys, in insertion order
+            stored: Records as they were held in memory
+            columns: Indexed field -> value of each record
+        """
+        if stored:
+            # Convert records written under another record_type
+            if self.record_type is None and type(stored[0]) is not dict:
+                stored = [record.to_dict() for record in stored]
+            elif self.record_type is not None and type(stored[0]) is not self.record_type:
+                stored = [self.record_type.from_dict(record if type(record) is dict else record.to_dict())
+                          for record in stored]
+        with self.lock:
+            # Range indexes are rebuilt by the next find_range
+            self.ranges.clear()
+            first = self.next_ordinal
+            self.records.update(zip(keys, stored))
+            self.ordinals.update(zip(keys, range(first, first + len(keys))))
+            self.next_ordinal += len(keys)
+            for field, index in self.indexes.items():
+                values = columns.get(field)
+                if values is None:
+                    values = [get_field(self._load(record), field) for record in stored]
+                for key, value in zip(keys, values):
+                    keys_with_value = index.get(value)
+                    if keys_with_value is None:
+                        keys_with_value = index[value] = {}
+                    keys_with_value[key] = None
+
+    def apply(self, op: int, payload: bytes) -> None:
+        """Apply a logged change during recovery, without logging it again."""
+        if op == OP_PUT:
+            InMemoryEventCollection.put(self, json.loads(payload))
+        elif op == OP_DELETE:
+            InMemoryEventCollection.delete(self, json.loads(payload))
+        elif op == OP_CLEAR:
+            InMemoryEventCollection.clear(self)
+
+class WALEventStore(EventStore):
+    """
+    Event store held in memory and persisted with a write-ahead log and snapshots.
+
+    Collections are recovered from the snapshot and the WAL tail when they are
+    first opened with collection().
+    """
+
+    def __init__(self, directory: str, group_commit_size: int = 1000, group_commit_interval: float = 0.01,
+                 fsync: bool = True, snapshot_every: int = 1000000):
+        super().__init__()
+        self.directory = directory
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+
+        # lock guards the buffer and collections; io_lock serializes commits and is always taken first;
+        # snapshot_lock allows one snapshot at a time and is taken before both
+        self.lock = threading.RLock()
+        self.io_lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()
+        self.buffer = bytearray()
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+        self.writes_since_snapshot = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.snapshot_file = None
+        self.snapshot_map: Optional[mmap.mmap] = None
+        self.snapshot_generation = -1
+        self.snapshot_pickled = True
+        # name -> (key field, offset of first record, record count)
+        self.sections: Dict[str, Tuple[str, int, int]] = {}
+        self._open_snapshot()
+
+        # name -> key field of every collection in the snapshot or the WAL tail
+        self.key_fields: Dict[str, str] = {name: section[0] for name, section in self.sections.items()}
+        self.segments: List[Tuple[int, str]] = []
+        # name -> (op, payload) frames of the WAL tail, held until the collection is opened
+        self.tail: Dict[str, List[Tuple[int, bytes]]] = {}
+        self._scan_segments()
+
+        self.generation = max([self.snapshot_generation] + [generation for generation, _ in self.segments]) + 1
+        self.wal = open(self._segment_path(self.generation), "ab")
+
+        # Group commits and snapshots run off the writers' threads
+        self.wake = threading.Event()
+        self.closing = False
+        self.snapshot_thread: Optional[threading.Thread] = None
+        self.committer = threading.Thread(target=self._run_committer, name="wal-committer", daemon=True)
+        self.committer.start()
+        atexit.register(self.close)
+        logger.info(f"WAL event store opened at {directory} (snapshot generation {self.snapshot_generation}, "
+                    f"{len(self.segments)} WAL segments to replay)")
+
+    def _segment_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"wal-{generation:010d}.log")
+
+    def _open_snapshot(self) -> None:
+        if not os.path.exists(self.snapshot_path) or os.path.getsize(self.snapshot_path) == 0:
+            return
+        self.snapshot_file = open(self.snapshot_path, "rb")
+        data = self.snapshot_map = mmap.mmap(self.snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.snapshot_generation = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic not in (SNAPSHOT_MAGIC, JSON_SNAPSHOT_MAGIC):
+            raise ValueError(f"Not a snapshot file: {self.snapshot_path}")
+        self.snapshot_pickled = magic == SNAPSHOT_MAGIC
+
+        # Only section headers are read here; records are decoded when their collection is opened
+        offset = _SNAPSHOT_HEADER.size
+        while offset < len(data):
+            name_length, key_length, count, size = _SECTION.unpack_from(data, offset)
+            offset += _SECTION.size
+            name = data[offset:offset + name_length].decode("utf-8")
+            offset += name_length
+            key_field = data[offset:offset + key_length].decode("utf-8")
+            offset += key_length
+            self.sections[name] = (key_field, offset, count)
+            offset += size
+
+    def _close_snapshot(self) -> None:
+        if self.snapshot_map is not None:
+            self.snapshot_map.close()
+            self.snapshot_file.close()
+        self.snapshot_map = None
+        self.snapshot_file = None
+        self.sections = {}
+
+    def _scan_segments(self) -> None:
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith("wal-") and filename.endswith(".log")):
+                continue
+            generation = int(filename[4:-4])
+            path = os.path.join(self.directory, filename)
+            if generation <= self.snapshot_generation:
+                # Left behind by a crash between writing a snapshot and deleting the segments it includes
+                os.remove(path)
+                continue
+            frames, valid = read_frames(path)
+            if valid < os.path.getsize(path):
+                logger.warning(f"Truncating torn WAL tail of {filename} at byte {valid}")
+                os.truncate(path, valid)
+            for op, name, payload in frames:
+                if op == OP_CREATE:
+                    self.key_fields[name] = payload.decode("utf-8")
+                else:
+                    self.tail.setdefault(name, []).append((op, payload))
+            self.writes_since_snapshot += len(frames)
+            self.segments.append((generation, path))
+
+    def _create_collection(self, name: str, key_field: str, index_fields: Iterable[str],
+                           record_type: Optional[Type]) -> EventCollection:
+        with self.lock:
+            collection = WALEventCollection(self, name, key_field, index_fields, record_type)
+            started = time.perf_counter()
+            self._recover(collection)
+            if len(collection):
+                logger.info(f"Recovered {len(collection)} {name} records in {time.perf_counter() - started:.2f}s")
+            self.key_fields[name] = key_field
+            self.log(encode_frame(OP_CREATE, collection.encoded_name, key_field.encode("utf-8")), count=0)
+            return collection
+
+    def _recover(self, collection: WALEventCollection) -> None:
+        section = self.sections.get(collection.name)
+        if section is not None:
+            put = InMemoryEventCollection.put
+            data = self.snapshot_map
+            _, offset, count = section
+            if self.snapshot_pickled:
+                # Every object unpickled here lives on; cyclic GC passes over them would only slow recovery down
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    loaded = 0
+                    while loaded < count:
+                        (length,) = _LENGTH.unpack_from(data, offset)
+                        offset += _LENGTH.size
+                        keys, stored, columns = pickle.loads(data[offset:offset + length])
+                        collection.load_chunk(keys, stored, columns)
+                        offset += length
+                        loaded += len(keys)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+            else:
+                for _ in range(count):
+                    (length,) = _LENGTH.unpack_from(data, offset)
+                    offset += _LENGTH.size
+                    put(collection, json.loads(data[offset:offset + length]))
+                    offset += length
+
+        for op, payload in self.tail.pop(collection.name, ()):
+            collection.apply(op, payload)
+
+    def log(self, frames: bytes, count: int = 1) -> None:
+        """Buffer encoded frames for the next group commit (caller holds the lock)."""
+        self.buffer += frames
+        self.uncommitted += count
+        self.writes_since_snapshot += count
+
+    def note_writes(self, count: int) -> None:
+        """Wake the committer when the buffered group is full or a snapshot is due; never does I/O itself."""
+        if self.uncommitted >= self.group_commit_size or self._snapshot_due():
+            self.wake.set()
+
+    def _snapshot_due(self) -> bool:
+        return bool(self.snapshot_every) and self.writes_since_snapshot >= self.snapshot_every
+
+    def _run_committer(self) -> None:
+        while not self.closing:
+            self.wake.wait(self.group_commit_interval)
+            self.wake.clear()
+            try:
+                if self._snapshot_due() and not self.snapshot_lock.locked():
+                    self.snapshot_thread = threading.Thread(target=self.snapshot, name="wal-snapshot", daemon=True)
+                    self.snapshot_thread.start()
+                self.flush()
+            except Exception as e:
+                logger.error(f"WAL group commit failed: {str(e)}")
+
+    def flush(self) -> None:
+        with self.io_lock:
+            with self.lock:
+                if self.wal is None or not self.buffer:
+                    return
+                data, self.buffer = self.buffer, bytearray()
+                self.uncommitted = 0
+                self.last_commit = time.monotonic()
+            # Writers keep appending to the new buffer while this group is written
+            self.wal.write(data)
+            self.wal.flush()
+            if self.fsync:
+                os.fsync(self.wal.fileno())
+
+    def snapshot(self) -> None:
+        """Write the full state to a new snapshot and drop the WAL segments it includes."""
+        with self.snapshot_lock:
+            with self.io_lock:
+                with self.lock:
+                    if self.wal is None:
+                        return
+                    started = time.perf_counter()
+                    # Collections nobody opened in this process must not be dropped from the snapshot
+                    for name, key_field in list(self.key_fields.items()):
+                        if name not in self.collections:
+                            self.collection(name, key_field)
+
+                    # Rotate: everything up to this generation goes into the snapshot
+                    data, self.buffer = self.buffer, bytearray()
+                    self.uncommitted = 0
+                    self.writes_since_snapshot = 0
+                    old_wal = self.wal
+                    generation = self.generation
+                    self.generation += 1
+                    self.wal = open(self._segment_path(self.generation), "ab")
+                    for collection in self.collections.values():
+                        self.buffer += encode_frame(OP_CREATE, collection.encoded_name,
+                                                    collection.key_field.encode("utf-8"))
+
+                    # Copy-on-write view: the record maps are copied, the records themselves are shared
+                    views = [(collection, list(collection.records.items())) for collection in self.collections.values()]
+                old_wal.write(data)
+                old_wal.flush()
+                if self.fsync:
+                    os.fsync(old_wal.fileno())
+                old_wal.close()
+            paused = time.perf_counter() - started
+
+            records = self._write_snapshot(generation, views)
+
+            with self.lock:
+                self._close_snapshot()
+                self._open_snapshot()
+                for _, path in self.segments:
+                    os.remove(path)
+                old_path = self._segment_path(generation)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+                self.segments = []
+            logger.info(f"Snapshot of {records} records written in {time.perf_counter() - started:.2f}s "
+                        f"(writes paused {paused * 1000:.1f}ms)")
+
+    def _write_snapshot(self, generation: int, views: List[Tuple[WALEventCollection, List[Tuple[str, Any]]]]) -> int:
+        temporary = self.snapshot_path + ".tmp"
+        total = 0
+        with open(temporary, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation))
+            for collection, stored in views:
+                name = collection.encoded_name
+                key_field = collection.key_field.encode("utf-8")
+                header_at = f.tell()
+                f.write(_SECTION.pack(len(name), len(key_field), 0, 0) + name + key_field)
+                start = f.tell()
+                for chunk_start in range(0, len(stored), SNAPSHOT_CHUNK):
+                    chunk = stored[chunk_start:chunk_start + SNAPSHOT_CHUNK]
+                    keys = [key for key, _ in chunk]
+                    records = [record for _, record in chunk]
+                    columns = {}
+                    if collection.index_fields:
+                        loaded = [collection._load(record) for record in records]
+                        columns = {field: [get_field(record, field) for record in loaded]
+                                   for field in collection.index_fields}
+                    data = pickle.dumps((keys, records, columns), protocol=pickle.HIGHEST_PROTOCOL)
+                    f.write(_LENGTH.pack(len(data)))
+                    f.write(data)
+                end = f.tell()
+                f.seek(header_at)
+                f.write(_SECTION.pack(len(name), len(key_field), len(stored), end - start))
+                f.seek(end)
+                total += len(stored)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        return total
+
+    def close(self) -> None:
+        with self.snapshot_lock:
+            self.closing = True
+            self.wake.set()
+            if self.committer is not threading.current_thread():
+                self.committer.join()
+            self.flush()
+            with self.io_lock:
+                with self.lock:
+                    if self.wal is None:
+                        return
+                    self.wal.close()
+                    self.wal = None
+                    self._close_snapshot()
@@ -0,0 +1,113 @@
+"""
+Test suite for cross-case alert deduplication and suppression
+"""
+import unittest
+
+from core.orchestration.alert_suppression import AlertSuppressor, merge_alert_stats
+from core.orchestration.core_orchestrator import CoreOrchestrator
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def wallet_alert(wallet, case_ids, alert_type="duplicate_wallet"):
+    return {"type": alert_type, "walletAddress": wallet, "caseIds": case_ids, "count": len(case_ids)}
+
+class TestAlertSuppressor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.suppressor = AlertSuppressor(window_seconds=60, max_entries=3, clock=self.clock)
+
+    def test_repeated_alert_is_suppressed_until_cases_change(self):
+        """Test that only new alerts and alerts with new cases are emitted."""
+        first = wallet_alert("0xa", ["case-1", "case-2"])
+        self.assertEqual(self.suppressor.filter([first]), [first])
+        # Another event of an already listed case does not change the alert
+        self.assertEqual(self.suppressor.filter([wallet_alert("0xa", ["case-1", "case-2", "case-2"])]), [])
+
+        changed = wallet_alert("0xa", ["case-1", "case-2", "case-3"])
+        self.assertEqual(self.suppressor.filter([changed]), [changed])
+        self.assertEqual(self.suppressor.filter([changed]), [])
+
+        stats = self.suppressor.stats()
+        self.assertEqual(stats["emitted"], 2)
+        self.assertEqual(stats["suppressed"], 2)
+        self.assertEqual(stats["byType"], {"duplicate_wallet": {"emitted": 2, "suppressed": 2}})
+
+    def test_alert_is_emitted_again_after_window(self):
+        """Test that an unchanged alert is re-emitted once the suppression window has passed."""
+        alert = wallet_alert("0xa", ["case-1", "case-2"])
+        self.suppressor.filter([alert])
+        self.clock.now += 59
+        self.assertEqual(self.suppressor.filter([alert]), [])
+        self.clock.now += 1
+        self.assertEqual(self.suppressor.filter([alert]), [alert])
+        # Expired state is dropped, then re-created by the emission
+        self.assertEqual(self.suppressor.stats()["tracked"], 1)
+
+    def test_keys_separate_type_scope_and_subject(self):
+        """Test that alerts for different types, wallets and cases do not suppress each other."""
+        alerts = [
+            wallet_alert("0xa", ["case-1"]),
+            wallet_alert("0xa", ["case-1"], "velocity"),
+            {"type": "velocity", "scope": "case", "walletAddress": None, "caseIds": ["case-1"]},
+        ]
+        self.assertEqual(self.suppressor.filter(alerts), alerts)
+        self.assertEqual(self.suppressor.filter(alerts), [])
+
+    def test_least_recently_emitted_keys_are_evicted(self):
+        """Test that the state store stays within max_entries."""
+        for i in range(4):
+            self.suppressor.filter([wallet_alert(f"0x{i}", ["case-1", "case-2"])])
+        self.assertEqual(self.suppressor.stats()["tracked"], 3)
+        # The evicted wallet is treated as new again
+        self.assertEqual(len(self.suppressor.filter([wallet_alert("0x0", ["case-1", "case-2"])])), 1)
+        self.assertEqual(self.suppressor.filter([wallet_alert("0x3", ["case-1", "case-2"])]), [])
+
+    def test_zero_window_disables_suppression(self):
+        """Test that a zero window emits every alert."""
+        suppressor = AlertSuppressor(window_seconds=0)
+        alert = wallet_alert("0xa", ["case-1", "case-2"])
+        self.assertEqual(suppressor.filter([alert]), [alert])
+        self.assertEqual(suppressor.filter([alert]), [alert])
+
+    def test_merge_alert_stats(self):
+        """Test that per-shard stats add up."""
+        other = AlertSuppressor(window_seconds=60)
+        self.suppressor.filter([wallet_alert("0xa", ["case-1"])] * 2)
+        other.filter([wallet_alert("0xb", ["case-1"], "volume")])
+
+        merged = merge_alert_stats([self.suppressor.stats(), other.stats()])
+        self.assertEqual(merged["emitted"], 2)
+        self.assertEqual(merged["suppressed"], 1)
+        self.assertEqual(merged["tracked"], 2)
+        self.assertEqual(merged["byType"]["duplicate_wallet"], {"emitted": 1, "suppressed": 1})
+        self.assertEqual(merged["byType"]["volume"], {"emitted": 1, "suppressed": 0})
+
+class TestOrchestratorSuppression(unittest.TestCase):
+    def test_duplicate_wallet_alert_emitted_once_per_change(self):
+        """Test that later events for a flagged wallet do not repeat its alert."""
+        orchestrator = CoreOrchestrator(alert_suppressor=AlertSuppressor(window_seconds=300))
+        results = [
+            orchestrator.process_event({"caseId": case_id, "riskScore": 10, "metadata": {"walletAddress": "0xdup"}})
+            for case_id in ["case-a", "case-b", "case-b", "case-a", "case-c"]
+        ]
+
+        alerts = [[a["caseIds"] for a in r["crossCaseAlerts"] if a["type"] == "duplicate_wallet"] for r in results]
+        self.assertEqual(alerts[0], [])
+        self.assertEqual(len(alerts[1]), 1)
+        self.assertEqual(alerts[2], [])
+        self.assertEqual(alerts[3], [])
+        self.assertEqual(len(alerts[4]), 1)
+
+        stats = orchestrator.get_alert_stats()
+        self.assertEqual(stats["byType"]["duplicate_wallet"], {"emitted": 2, "suppressed": 2})
+
+        processed = orchestrator.get_monitoring_events("event_processed")
+        self.assertEqual([m["alertsSuppressed"] for m in processed], [0, 0, 1, 1, 0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+"""
+Test suite for the benchmark data generator and regression comparison
+"""
+import unittest
+
+from core import benchmark_core
+
+class TestBenchmarkCore(unittest.TestCase):
+    def test_synthetic_events_are_deterministic(self):
+        """Test that the same seed produces the same events, modelled on the seed file."""
+        transactions = benchmark_core.load_seed_transactions()
+        first = list(benchmark_core.synthetic_events(transactions, 50))
+        second = list(benchmark_core.synthetic_events(transactions, 50))
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["txHash"], transactions[0]["tx_hash"])
+        self.assertTrue(all(0 <= e["riskScore"] <= 100 for e in first))
+
+    def test_compare_flags_regressions(self):
+        """Test that slower throughput or p99 beyond the threshold is reported."""
+        def report(throughput, p99):
+            result = {"name": "process_event", "size": 1000, "throughput": throughput, "p99_us": p99}
+            return {"runs": [{"size": 1000, "results": [result]}]}
+
+        baseline = report(1000, 100)
+        self.assertEqual(benchmark_core.compare(report(900, 110), baseline, 0.2), [])
+        regressions = benchmark_core.compare(report(700, 150), baseline, 0.2)
+        self.assertEqual(len(regressions), 2)
+
+if __name__ == "__main__":
+    unittest.main()
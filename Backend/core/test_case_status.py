@@ -0,0 +1,93 @@
+"""
+Test suite for case status lookups in the Core Events API
+"""
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.events.reconciliation import ChainClient, ReconciliationService
+
+class StubChainClient(ChainClient):
+    """Chain where 0x1-0x3 are confirmed and 0x4 is still pending."""
+
+    async def get_transactions(self, tx_hashes):
+        chain = {"1": "confirmed", "2": "confirmed", "3": "confirmed", "4": "pending"}
+        return {h: {"status": chain[h], "blockNumber": 7} for h in tx_hashes if h in chain}
+
+class TestCaseStatus(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with empty event storage and cache."""
+        core_events.events_storage.clear()
+        core_events.case_status_cache.clear()
+        core_events.idempotency_index.clear()
+        self.original_service = core_events.reconciliation_service
+        core_events.reconciliation_service = ReconciliationService(StubChainClient())
+        self.client = TestClient(core_events.app)
+
+    def tearDown(self):
+        core_events.reconciliation_service = self.original_service
+
+    def post_event(self, case_id, evidence_id, tx_hash=None):
+        event = {
+            "caseId": case_id,
+            "evidenceId": evidence_id,
+            "riskScore": 50,
+            "actionSuggested": "review",
+            "txHash": tx_hash
+        }
+        response = self.client.post("/core/events", json=event)
+        self.assertEqual(response.status_code, 202)
+
+    def test_case_status_only_includes_case_events(self):
+        """Test that the status lists exactly the case's evidence."""
+        self.post_event("case-a", "ev-1", "0x1")
+        self.post_event("case-b", "ev-2", "0x2")
+        self.post_event("case-a", "ev-3", "0x3")
+
+        data = self.client.get("/core/case/case-a/status").json()
+        self.assertEqual([r["evidenceId"] for r in data["reconciliation"]], ["ev-1", "ev-3"])
+        self.assertEqual(data["overallStatus"], "ok")
+
+    def test_new_event_invalidates_cached_status(self):
+        """Test that a cached summary is refreshed when its case changes."""
+        self.post_event("case-a", "ev-1", "0x1")
+        self.assertEqual(self.client.get("/core/case/case-a/status").json()["overallStatus"], "ok")
+        self.assertIn("case-a", core_events.case_status_cache)
+
+        self.post_event("case-b", "ev-2")
+        self.assertIn("case-a", core_events.case_status_cache)
+
+        self.post_event("case-a", "ev-3")
+        self.assertNotIn("case-a", core_events.case_status_cache)
+        data = self.client.get("/core/case/case-a/status").json()
+        self.assertEqual(len(data["reconciliation"]), 2)
+        self.assertEqual(data["overallStatus"], "mismatch")
+
+    def test_batch_invalidates_cached_status(self):
+        """Test that batch ingestion also refreshes cached summaries."""
+        self.post_event("case-a", "ev-1", "0x1")
+        self.client.get("/core/case/case-a/status")
+
+        batch = {"events": [{"caseId": "case-a", "evidenceId": "ev-2", "riskScore": 1, "actionSuggested": "review"}]}
+        self.client.post("/core/events:batch", json=batch)
+        data = self.client.get("/core/case/case-a/status").json()
+        self.assertEqual(len(data["reconciliation"]), 2)
+
+    def test_unconfirmed_transactions_not_cached(self):
+        """Test that pending and unknown transactions are reported but not cached."""
+        self.post_event("case-a", "ev-1", "0x4")
+        self.post_event("case-a", "ev-2", "0x5")
+
+        data = self.client.get("/core/case/case-a/status").json()
+        self.assertEqual([r["status"] for r in data["reconciliation"]], ["pending", "mismatch"])
+        self.assertEqual(data["overallStatus"], "mismatch")
+        self.assertNotIn("case-a", core_events.case_status_cache)
+
+    def test_unknown_case(self):
+        """Test that unknown cases return 404."""
+        response = self.client.get("/core/case/missing/status")
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Test suite for the fast request/response codec
+"""
+import json
+import random
+import unittest
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from core.events import codec, core_events, webhooks
+from core.events.codec import PayloadCodec, compile_validator, json_response
+from core.events.payloads import EventPayload
+from core.events.webhooks import WebhookPayload
+
+VALID_EVENT = {"caseId": "case-1", "evidenceId": "ev-1", "riskScore": 42, "actionSuggested": "review",
+               "metadata": {"walletAddress": "0xabc", "amount": 12.5}}
+
+# Bodies sent to both a model-typed endpoint and a codec endpoint: (content, content type)
+EVENT_BODIES = [
+    (json.dumps(VALID_EVENT), "application/json"),
+    (json.dumps(dict(VALID_EVENT, riskScore=99.5, txHash="0x1", source="x", extra=[1])), "application/json"),
+    (json.dumps(dict(VALID_EVENT, riskScore="50")), "application/json"),
+    (json.dumps(dict(VALID_EVENT, riskScore=101)), "application/json"),
+    (json.dumps(dict(VALID_EVENT, riskScore=True)), "application/json"),
+    (json.dumps(dict(VALID_EVENT, riskScore=10 ** 30)), "application/json"),
+    (json.dumps(dict(VALID_EVENT, caseId=7)), "application/json"),
+    (json.dumps(dict(VALID_EVENT, metadata=[1, 2])), "application/json"),
+    (json.dumps(dict(VALID_EVENT, metadata=None, txHash=None)), "application/json"),
+    (json.dumps({"caseId": "case-1"}), "application/json"),
+    (json.dumps([VALID_EVENT]), "application/json"),
+    ('{"caseId": ', "application/json"),
+    ("null", "application/json"),
+    ("", "application/json"),
+    (json.dumps(VALID_EVENT), "text/plain"),
+    (json.dumps(VALID_EVENT), "application/vnd.core+json; charset=utf-8"),
+]
+
+def reference_app():
+    """Endpoints typed with the Pydantic models, as they were before the codec."""
+    app = FastAPI()
+    event_codec = PayloadCodec(EventPayload)
+    webhook_codec = PayloadCodec(WebhookPayload)
+
+    @app.post("/model/event")
+    async def model_event(payload: EventPayload):
+        return payload.dict()
+
+    @app.post("/codec/event")
+    async def codec_event(request: Request):
+        return await event_codec.read(request)
+
+    @app.post("/model/webhook")
+    async def model_webhook(payload: WebhookPayload):
+        return payload.dict()
+
+    @app.post("/codec/webhook")
+    async def codec_webhook(request: Request):
+        return await webhook_codec.read(request)
+
+    return app
+
+class TestPayloadCodec(unittest.TestCase):
+    def test_matches_model_endpoints(self):
+        """Test that codec endpoints accept and reject exactly like model-typed endpoints."""
+        client = TestClient(reference_app())
+        webhook = {"outcomeId": "o", "caseId": "c", "eventType": "t", "result": {"ok": True}, "timestamp": "now"}
+        cases = [("event", body, content_type) for body, content_type in EVENT_BODIES] + [
+            ("webhook", json.dumps(webhook), "application/json"),
+            ("webhook", json.dumps(dict(webhook, result="ok")), "application/json"),
+            ("webhook", json.dumps({"outcomeId": "o"}), "application/json")
+        ]
+        for kind, body, content_type in cases:
+            expected = client.post(f"/model/{kind}", content=body, headers={"content-type": content_type})
+            actual = client.post(f"/codec/{kind}", content=body, headers={"content-type": content_type})
+            self.assertEqual((actual.status_code, actual.json()), (expected.status_code, expected.json()),
+                             f"{kind} body {body!r} ({content_type})")
+
+    def test_fast_validator_matches_model(self):
+        """Test the compiled validator against the model on random payloads."""
+        validate = compile_validator(EventPayload)
+        self.assertIsNotNone(validate)
+        rng = random.Random(11)
+        values = [None, "x", 0, 50, 100, 101, -1, 7.5, True, {}, {"a": 1}, [], "0xhash"]
+        fields = ["caseId", "evidenceId", "riskScore", "actionSuggested", "txHash", "source", "metadata", "other"]
+        fast = 0
+        for _ in range(2000):
+            body = dict(VALID_EVENT)
+            for field in rng.sample(fields, rng.randrange(4)):
+                if rng.random() < 0.2:
+                    body.pop(field, None)
+                else:
+                    body[field] = rng.choice(values)
+            try:
+                expected = EventPayload(**body).dict()
+            except ValidationError:
+                expected = None
+            result = validate(body)
+            if result is not None:
+                fast += 1
+                self.assertEqual(result, expected, body)
+                self.assertEqual([type(v) for v in result.values()], [type(v) for v in expected.values()])
+        self.assertGreater(fast, 100)
+
+    def test_disabled_codec_uses_model(self):
+        """Test that a disabled codec validates through Pydantic."""
+        event_codec = PayloadCodec(EventPayload, enabled=False)
+        event_codec.fast_validate = lambda body: self.fail("fast validator used while disabled")
+        self.assertEqual(event_codec.validate(VALID_EVENT), EventPayload(**VALID_EVENT).dict())
+        with self.assertRaises(ValidationError):
+            event_codec.validate({"caseId": "case-1"})
+
+class TestJsonResponse(unittest.TestCase):
+    def test_renders_like_default_encoder(self):
+        """Test that orjson responses decode to what FastAPI's encoder returns."""
+        content = [{"sequence": 1, "details": "café", "score": 0.1, "nested": {"a": [1, None]}, 2: "x"}]
+        response = json_response(content, status_code=202, enabled=True)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.body), json.loads(json.dumps(content)))
+        self.assertIs(json_response(content, enabled=False), content)
+
+    def test_endpoints_with_codec_off(self):
+        """Test that the services answer identically with the codec switched off."""
+        core_client = TestClient(core_events.app)
+        webhook_client = TestClient(webhooks.app)
+        callback = {"outcomeId": "o-1", "caseId": "case-codec", "eventType": "resolved", "result": {}, "timestamp": "t"}
+        responses = []
+        for enabled in (True, False):
+            codec.FAST_CODEC = enabled
+            try:
+                accepted = core_client.post("/core/events", json=dict(VALID_EVENT, caseId="case-codec",
+                                                                      evidenceId=f"ev-codec-{enabled}"))
+                callback_response = webhook_client.post("/callbacks/resolution", json=callback)
+                invalid = core_client.post("/core/events", json={"caseId": "case-codec"})
+                events = webhook_client.get("/monitoring/events", params={"limit": 5})
+            finally:
+                codec.FAST_CODEC = True
+            self.assertEqual(accepted.status_code, 202)
+            self.assertEqual(callback_response.status_code, 200)
+            self.assertEqual(events.status_code, 200)
+            responses.append((sorted(accepted.json()), accepted.json()["processedAt"], sorted(callback_response.json()),
+                              invalid.status_code, invalid.json()))
+        self.assertEqual(responses[0], responses[1])
+
+if __name__ == "__main__":
+    unittest.main()
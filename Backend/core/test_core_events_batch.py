@@ -0,0 +1,81 @@
+"""
+Test suite for the batch ingestion endpoint of the Core Events API
+"""
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.orchestration.rules import check_auto_escalation, should_trigger_multisig
+
+class TestBatchEvents(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with empty event storage."""
+        core_events.events_storage.clear()
+        core_events.idempotency_index.clear()
+        self.client = TestClient(core_events.app)
+        self.events = [
+            {
+                "caseId": f"batch-case-{i % 7}",
+                "evidenceId": f"batch-evidence-{i}",
+                "riskScore": (i * 13) % 101,
+                "actionSuggested": "freeze" if i % 3 == 0 else "review",
+                "txHash": f"0x{i:064x}",
+                "metadata": {"walletAddress": f"0xwallet{i % 5}", "amount": (i * 997) % 20000}
+            }
+            for i in range(200)
+        ]
+
+    def test_batch_accepts_all_valid_events(self):
+        """Test that a valid batch stores every event."""
+        response = self.client.post("/core/events:batch", json={"events": self.events})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data["accepted"], len(self.events))
+        self.assertEqual(data["rejected"], 0)
+        self.assertEqual(len(core_events.events_storage), len(self.events))
+
+        for result in data["results"]:
+            self.assertEqual(result["status"], "accepted")
+            response = self.client.get(f"/core/events/{result['coreEventId']}")
+            self.assertEqual(response.status_code, 200)
+
+    def test_batch_rules_match_scalar_rules(self):
+        """Test that the vectorized rules agree with the per-event rules."""
+        events = self.events + [
+            {"caseId": "c", "evidenceId": "e", "riskScore": 10, "actionSuggested": "approve"},
+            {"caseId": "c", "evidenceId": "e2", "riskScore": 10, "actionSuggested": "approve", "metadata": {}}
+        ]
+        response = self.client.post("/core/events:batch", json={"events": events})
+        data = response.json()
+
+        for event, result in zip(events, data["results"]):
+            self.assertEqual(result["autoEscalation"], check_auto_escalation(event))
+            self.assertEqual(result["multisigTrigger"], should_trigger_multisig(event))
+
+    def test_batch_reports_per_item_errors(self):
+        """Test that invalid items are rejected without failing the batch."""
+        events = [
+            self.events[0],
+            {"caseId": "missing-fields"},
+            dict(self.events[1], riskScore=150),
+            self.events[2]
+        ]
+        response = self.client.post("/core/events:batch", json={"events": events})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data["accepted"], 2)
+        self.assertEqual(data["rejected"], 2)
+        self.assertEqual([r["status"] for r in data["results"]], ["accepted", "rejected", "rejected", "accepted"])
+        self.assertIsNone(data["results"][1]["coreEventId"])
+        self.assertTrue(data["results"][1]["errors"])
+        self.assertEqual(data["results"][2]["errors"][0]["loc"], ["riskScore"])
+
+    def test_batch_size_limit(self):
+        """Test that oversized batches are rejected."""
+        events = [self.events[0]] * (core_events.MAX_BATCH_SIZE + 1)
+        response = self.client.post("/core/events:batch", json={"events": events})
+        self.assertEqual(response.status_code, 413)
+
+if __name__ == "__main__":
+    unittest.main()
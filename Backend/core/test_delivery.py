@@ -0,0 +1,211 @@
+"""
+Test suite for outbound webhook delivery against a local stub HTTP server
+"""
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fastapi.testclient import TestClient
+
+from core.events import webhooks
+from core.events.delivery import DeliveryEngine
+
+class StubServer:
+    """HTTP server whose response status per path is scripted by the test."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses = {}
+        self.received = {}
+        self.active = 0
+        self.peak = 0
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                    stub.received.setdefault(self.path, []).append(body)
+                    script = stub.statuses.get(self.path, [200])
+                    code = script.pop(0) if len(script) > 1 else script[0]
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.active -= 1
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class TestDeliveryEngine(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubServer()
+        self.results = []
+
+    def tearDown(self):
+        self.stub.close()
+
+    def run_engine(self, deliveries, **options):
+        async def run():
+            engine = DeliveryEngine(base_delay=0.001, max_delay=0.01, on_result=self.results.append, **options)
+            for path, payload in deliveries:
+                engine.submit(self.stub.url + path, payload, payload.get("messageId"))
+            await engine.stop()
+            return engine
+        return asyncio.run(run())
+
+    def test_retries_until_delivered(self):
+        """Test that transient failures are retried with backoff."""
+        self.stub.statuses["/flaky"] = [503, 500, 200]
+        engine = self.run_engine([("/flaky", {"messageId": "m1"})])
+        self.assertEqual(engine.delivered, 1)
+        self.assertEqual(engine.retried, 2)
+        self.assertEqual(len(self.stub.received["/flaky"]), 3)
+        self.assertEqual(len(engine.dead_letters), 0)
+
+    def test_dead_letters_after_max_attempts(self):
+        """Test that persistent failures end up in the dead-letter store."""
+        self.stub.statuses["/down"] = [503]
+        self.stub.statuses["/reject"] = [400]
+        engine = self.run_engine([("/down", {"messageId": "m1"}), ("/reject", {"messageId": "m2"})], max_attempts=3)
+        self.assertEqual(len(self.stub.received["/down"]), 3)
+        self.assertEqual(len(self.stub.received["/reject"]), 1)
+
+        dead_letters = {d["messageId"]: d for d in engine.dead_letters.values()}
+        self.assertEqual(dead_letters["m1"]["lastError"], "HTTP 503")
+        self.assertEqual(dead_letters["m1"]["attempts"], 3)
+        self.assertEqual(dead_letters["m2"]["lastError"], "HTTP 400")
+        self.assertEqual(sorted(r["status"] for r in self.results), ["dead_lettered", "dead_lettered"])
+
+    def test_per_destination_concurrency_limit(self):
+        """Test that one destination never sees more than the configured concurrency."""
+        self.stub.delay = 0.02
+        deliveries = [("/ok", {"messageId": f"m{i}"}) for i in range(12)]
+        engine = self.run_engine(deliveries, workers=8, per_destination_limit=2)
+        self.assertEqual(engine.delivered, 12)
+        self.assertEqual(self.stub.peak, 2)
+
+    def test_slow_destination_does_not_block_others(self):
+        """Test that deliveries to a fast destination finish while a slow one holds its workers."""
+        slow = StubServer()
+        self.addCleanup(slow.close)
+        slow.delay = 0.5
+
+        async def run():
+            engine = DeliveryEngine(workers=4, per_destination_limit=2, on_result=self.results.append)
+            for i in range(6):
+                engine.submit(slow.url + "/slow", {"messageId": f"slow-{i}"})
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            for i in range(6):
+                engine.submit(self.stub.url + "/fast", {"messageId": f"fast-{i}"})
+            while len(self.stub.received.get("/fast", [])) < 6:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+            await engine.stop()
+            return engine, elapsed
+
+        engine, elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(engine.delivered, 12)
+        self.assertEqual(slow.peak, 2)
+
+    def test_redeliver_keeps_dead_letter_until_queued(self):
+        """Test that a dead letter survives a full queue and is re-queued under its own deliveryId."""
+        dead_letter = {"deliveryId": "d1", "messageId": "m1", "destination": self.stub.url + "/ok",
+                       "payload": {"messageId": "m1"}, "attempts": 2, "lastError": "HTTP 503",
+                       "failedAt": "2025-10-06T10:30:00"}
+
+        async def run():
+            engine = DeliveryEngine(queue_size=1, on_result=self.results.append)
+            engine.dead_letters.put(dict(dead_letter))
+            engine.submit(self.stub.url + "/ok", {"messageId": "m0"})
+            self.assertEqual(engine.drain_dead_letters(), [])
+            self.assertEqual(list(engine.dead_letters.values()), [dead_letter])
+
+            await engine.join()
+            self.assertEqual(engine.drain_dead_letters(), ["d1"])
+            await engine.stop()
+            return engine
+
+        engine = asyncio.run(run())
+        self.assertEqual(len(engine.dead_letters), 0)
+        self.assertEqual([body["messageId"] for body in self.stub.received["/ok"]], ["m0", "m1"])
+        self.assertIn("delivery d1,", self.results[-1]["details"])
+
+class TestWebhookDelivery(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubServer()
+        webhooks.webhook_events.clear()
+        webhooks.delivery_engine.dead_letters.clear()
+        webhooks.delivery_engine.base_delay = 0.001
+        webhooks.delivery_engine.max_delay = 0.01
+        self.destinations = webhooks.webhook_destinations
+        webhooks.webhook_destinations = [self.stub.url + "/outcomes"]
+        self.callback = {
+            "outcomeId": "outcome-1",
+            "caseId": "case-1",
+            "eventType": "escalation_completed",
+            "result": {"status": "approved"},
+            "timestamp": "2025-10-06T10:30:00Z"
+        }
+
+    def tearDown(self):
+        webhooks.webhook_destinations = self.destinations
+        self.stub.close()
+
+    def test_replay_drains_dead_letters(self):
+        """Test that failed deliveries are dead-lettered and drained by replay."""
+        self.stub.statuses["/outcomes"] = [404]
+        with TestClient(webhooks.app) as client:
+            message_id = client.post("/callbacks/escalation-result", json=self.callback).json()["messageId"]
+            asyncio.run_coroutine_threadsafe(webhooks.delivery_engine.join(), webhooks.delivery_engine.loop).result()
+
+            dead_letters = client.get("/monitoring/dead-letters").json()
+            self.assertEqual([d["messageId"] for d in dead_letters], [message_id])
+
+            self.stub.statuses["/outcomes"] = [200]
+            response = client.post("/monitoring/replay", json={"deadLetters": True})
+            self.assertEqual(response.json()["deadLetters"], [dead_letters[0]["deliveryId"]])
+
+        self.assertEqual(len(webhooks.delivery_engine.dead_letters), 0)
+        self.assertEqual(len(self.stub.received["/outcomes"]), 2)
+        self.assertEqual(self.stub.received["/outcomes"][-1]["messageId"], message_id)
+
+    def test_oversized_replay_leaves_dead_letters(self):
+        """Test that a replay rejected as too large does not re-submit dead letters."""
+        self.stub.statuses["/outcomes"] = [404]
+        with TestClient(webhooks.app) as client:
+            client.post("/callbacks/escalation-result", json=self.callback)
+            asyncio.run_coroutine_threadsafe(webhooks.delivery_engine.join(), webhooks.delivery_engine.loop).result()
+            self.assertEqual(len(webhooks.delivery_engine.dead_letters), 1)
+
+            limit = webhooks.MAX_REPLAY_BATCH
+            webhooks.MAX_REPLAY_BATCH = 0
+            try:
+                response = client.post("/monitoring/replay", json={"start": "2000-01-01T00:00:00",
+                                                                   "deadLetters": True})
+            finally:
+                webhooks.MAX_REPLAY_BATCH = limit
+            self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(webhooks.delivery_engine.dead_letters), 1)
+        self.assertEqual(len(self.stub.received["/outcomes"]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Test suite for the compact event record used by the in-memory event store
+"""
+import unittest
+import uuid
+
+from core.storage.event_record import EventRecord
+from core.storage.event_store import InMemoryEventStore
+
+class TestEventRecord(unittest.TestCase):
+    def test_round_trip_preserves_events(self):
+        """Test that to_dict returns a dict equal to the stored event, whatever its shape."""
+        events = [
+            {
+                "coreEventId": str(uuid.uuid4()),
+                "caseId": "case-1",
+                "evidenceId": "evidence-1",
+                "riskScore": 85.5,
+                "actionSuggested": "freeze",
+                "txHash": "0x" + "ab" * 32,
+                "source": "ml",
+                "metadata": {"walletAddress": "0xabc", "amount": 15000, "currency": "USD"},
+                "timestamp": "2025-10-06T10:30:00.123456",
+                "status": "processed",
+                "actionsTriggered": [{"action": "auto_escalation"}]
+            },
+            {
+                "coreEventId": "not-a-uuid",
+                "caseId": "case-2",
+                "riskScore": "high",
+                "txHash": "0xNotHex",
+                "metadata": None,
+                "timestamp": "2025-10-06T10:30:00Z",
+                "processedAt": None
+            },
+            {"coreEventId": str(uuid.uuid4()).upper(), "metadata": {"tags": ["a"], "walletAddress": 7}},
+            {"coreEventId": "e-4", "txHash": "deadbeef", "metadata": {}}
+        ]
+        for event in events:
+            self.assertEqual(EventRecord.from_dict(event).to_dict(), event)
+
+    def test_round_trip_preserves_types(self):
+        """Test that equal values of different types, and nested values, come back as stored."""
+        events = [
+            {"coreEventId": "e-1", "riskScore": 85, "metadata": {"verified": True, "score": 1}},
+            {"coreEventId": "e-2", "riskScore": 85.0, "metadata": {"verified": 1.0, "score": 1}},
+            {"coreEventId": "e-3", "riskScore": 1, "metadata": {"verified": 1, "score": True}},
+            {"coreEventId": "e-4", "riskScore": 0.5, "metadata": {"verified": False, "score": 0.0}},
+            {"coreEventId": "e-5", "metadata": {"amount": 10, "nested": {"a": [1, {"b": 2.0}]}, "flag": True}},
+        ]
+        records = [EventRecord.from_dict(event) for event in events]
+        for event, record in zip(events, records):
+            restored = record.to_dict()
+            self.assertEqual(restored, event)
+            self.assertEqual(type(restored.get("riskScore")), type(event.get("riskScore")))
+            self.assertEqual({k: type(v) for k, v in restored["metadata"].items()},
+                             {k: type(v) for k, v in event["metadata"].items()})
+
+    def test_nested_values_not_shared(self):
+        """Test that nested metadata and extra values are copied in and out."""
+        event = {"coreEventId": "e-1", "metadata": {"tags": ["a"], "detail": {"k": 1}}, "actionsTriggered": [{"a": 1}]}
+        record = EventRecord.from_dict(event)
+        event["metadata"]["tags"].append("b")
+        event["actionsTriggered"][0]["a"] = 2
+        restored = record.to_dict()
+        self.assertEqual(restored["metadata"]["tags"], ["a"])
+        self.assertEqual(restored["actionsTriggered"], [{"a": 1}])
+        restored["metadata"]["detail"]["k"] = 5
+        self.assertEqual(record.to_dict()["metadata"]["detail"], {"k": 1})
+
+    def test_collection_returns_copies(self):
+        """Test that the store does not retain or hand out the caller's dict."""
+        events = InMemoryEventStore().collection("events", "coreEventId", ["caseId"], EventRecord)
+        event = {"coreEventId": str(uuid.uuid4()), "caseId": "case-1", "riskScore": 50,
+                 "metadata": {"walletAddress": "0xabc"}}
+        events.put(event)
+        event["caseId"] = "changed"
+        stored = events.get(event["coreEventId"])
+        stored["metadata"]["walletAddress"] = "changed"
+
+        self.assertEqual(events[event["coreEventId"]]["caseId"], "case-1")
+        self.assertEqual(events[event["coreEventId"]]["metadata"], {"walletAddress": "0xabc"})
+        self.assertEqual([e["coreEventId"] for e in events.find("caseId", "case-1")], [event["coreEventId"]])
+
+        events.put(dict(stored, caseId="case-2"))
+        self.assertEqual(events.find("caseId", "case-1"), [])
+        self.assertEqual(len(events.find("caseId", "case-2")), 1)
+
+if __name__ == "__main__":
+    unittest.main()
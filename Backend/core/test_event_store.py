@@ -0,0 +1,327 @@
+"""
+Test suite for the BHIV Core event store backends
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from core.orchestration.core_orchestrator import CoreOrchestrator
+from core.storage.event_store import InMemoryEventStore, SQLiteEventStore, create_event_store
+from core.storage.event_record import EventRecord
+from core.storage import wal_store
+from core.storage.wal_store import WALEventStore
+
+class EventStoreContract:
+    """Behaviour shared by every event store backend."""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        """Set up an events collection indexed on caseId."""
+        self.store = self.make_store()
+        self.events = self.store.collection("events", "coreEventId", ["caseId", "metadata.walletAddress"])
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_put_and_get(self):
+        """Test storing and reading back a record."""
+        self.events.put({"coreEventId": "e1", "caseId": "c1", "riskScore": 50.5})
+        self.assertIn("e1", self.events)
+        self.assertNotIn("e2", self.events)
+        self.assertEqual(self.events["e1"]["riskScore"], 50.5)
+        self.assertIsNone(self.events.get("e2"))
+        self.assertEqual(len(self.events), 1)
+
+    def test_find_uses_current_index_values(self):
+        """Test that replacing a record moves it between index entries."""
+        self.events.put({"coreEventId": "e1", "caseId": "c1", "metadata": {"walletAddress": "0xa"}})
+        self.events.put({"coreEventId": "e2", "caseId": "c1", "metadata": {"walletAddress": "0xb"}})
+        self.events.put({"coreEventId": "e1", "caseId": "c2", "metadata": {"walletAddress": "0xb"}})
+
+        self.assertEqual([e["coreEventId"] for e in self.events.find("caseId", "c1")], ["e2"])
+        self.assertEqual([e["coreEventId"] for e in self.events.find("caseId", "c2")], ["e1"])
+        self.assertEqual([e["coreEventId"] for e in self.events.find("metadata.walletAddress", "0xb")], ["e1", "e2"])
+        self.assertEqual(self.events.find("riskScore", 1), [])
+
+    def test_values_keep_insertion_order(self):
+        """Test that iteration follows first insertion, even across replacements."""
+        self.events.put_many({"coreEventId": f"e{i}", "caseId": "c"} for i in range(2500))
+        self.events.put({"coreEventId": "e0", "caseId": "changed"})
+        keys = [e["coreEventId"] for e in self.events.values()]
+        self.assertEqual(keys, [f"e{i}" for i in range(2500)])
+
+    def test_find_range(self):
+        """Test that range queries follow replacements and deletes and return records in insertion order."""
+        logs = self.store.collection("logs", "sequence", ["receivedAt"])
+        for i, minute in enumerate([3, 1, 4, 1, 5, 9]):
+            logs.put({"sequence": f"s{i}", "receivedAt": f"2024-01-01T00:0{minute}:00"})
+        self.assertEqual([r["sequence"] for r in logs.find_range("receivedAt", "2024-01-01T00:01:00", "2024-01-01T00:05:00")],
+                         ["s0", "s1", "s2", "s3"])
+
+        logs.put({"sequence": "s2", "receivedAt": "2024-01-01T00:08:00"})
+        logs.delete("s3")
+        logs.put({"sequence": "s6", "receivedAt": "2024-01-01T00:02:00"})
+        logs.put({"sequence": "s7"})
+        self.assertEqual([r["sequence"] for r in logs.find_range("receivedAt", "2024-01-01T00:01:00", "2024-01-01T00:05:00")],
+                         ["s0", "s1", "s6"])
+        self.assertEqual([r["sequence"] for r in logs.find_range("receivedAt", start="2024-01-01T00:05:00")],
+                         ["s2", "s4", "s5"])
+        self.assertEqual(len(logs.find_range("receivedAt")), 6)
+
+    def test_delete_and_clear(self):
+        """Test removing records."""
+        self.events.put({"coreEventId": "e1", "caseId": "c1"})
+        self.events.put({"coreEventId": "e2", "caseId": "c1"})
+        self.events.delete("e1")
+        self.assertEqual([e["coreEventId"] for e in self.events.find("caseId", "c1")], ["e2"])
+        self.events.clear()
+        self.assertEqual(len(self.events), 0)
+
+class TestInMemoryEventStore(EventStoreContract, unittest.TestCase):
+    def make_store(self):
+        return InMemoryEventStore()
+
+class TestSQLiteEventStore(EventStoreContract, unittest.TestCase):
+    def make_store(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "core.db")
+        return SQLiteEventStore(self.path, commit_batch_size=100)
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def test_uses_wal_mode(self):
+        """Test that the database runs in WAL mode."""
+        mode = self.store.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_orchestrator_state_survives_restart(self):
+        """Test that a new orchestrator on the same file sees earlier events."""
+        orchestrator = CoreOrchestrator(self.store)
+        orchestrator.process_event({"caseId": "c1", "riskScore": 10, "metadata": {"walletAddress": "0xa"}})
+        orchestrator.handle_webhook_callback("escalation-result", {"caseId": "c1"})
+        self.store.close()
+
+        self.store = SQLiteEventStore(self.path)
+        restarted = CoreOrchestrator(self.store)
+        self.assertEqual(len(restarted.events_storage), 1)
+        self.assertEqual(len(restarted.webhook_events), 1)
+        self.assertEqual(len(restarted.get_monitoring_events("event_processed")), 1)
+
+        result = restarted.process_event({"caseId": "c2", "riskScore": 10, "metadata": {"walletAddress": "0xa"}})
+        self.assertEqual(result["crossCaseAlerts"][0]["caseIds"], ["c1", "c2"])
+
+class TestWALEventStore(EventStoreContract, unittest.TestCase):
+    def make_store(self):
+        self.directory = tempfile.TemporaryDirectory()
+        return self.open_store()
+
+    def open_store(self, **options):
+        return WALEventStore(self.directory.name, **options)
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def reopen(self, **options):
+        self.store.close()
+        self.store = self.open_store(**options)
+        self.events = self.store.collection("events", "coreEventId", ["caseId", "metadata.walletAddress"])
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory.name) if name.startswith("wal-"))
+
+    def wait_until(self, condition, timeout=5.0):
+        # Commits and automatic snapshots run on background threads
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out waiting for the WAL committer")
+            time.sleep(0.005)
+
+    def test_state_recovered_from_wal(self):
+        """Test that puts, deletes and clears are replayed after a restart."""
+        logs = self.store.collection("logs", "sequence")
+        logs.put({"sequence": 1})
+        logs.clear()
+        logs.put({"sequence": 2})
+        for i in range(5):
+            self.events.put({"coreEventId": f"e{i}", "caseId": f"c{i % 2}", "metadata": {"walletAddress": "0xa"}})
+        self.events.delete("e0")
+        self.events.put({"coreEventId": "e1", "caseId": "c9"})
+
+        self.reopen()
+        self.assertEqual([e["coreEventId"] for e in self.events.values()], ["e1", "e2", "e3", "e4"])
+        self.assertEqual([e["coreEventId"] for e in self.events.find("caseId", "c0")], ["e2", "e4"])
+        self.assertEqual(self.events["e1"], {"coreEventId": "e1", "caseId": "c9"})
+        self.assertEqual(list(self.store.collection("logs", "sequence").values()), [{"sequence": 2}])
+
+    def test_snapshot_then_wal_tail(self):
+        """Test recovery from a snapshot plus the writes logged after it."""
+        for i in range(10):
+            self.events.put({"coreEventId": f"e{i}", "caseId": "c"})
+        self.store.snapshot()
+        self.events.delete("e3")
+        self.events.put({"coreEventId": "e10", "caseId": "c"})
+        self.assertEqual(len(self.segments()), 1)
+
+        self.reopen()
+        self.assertEqual(self.store.snapshot_generation, 0)
+        self.assertEqual(len(self.events), 10)
+        self.assertNotIn("e3", self.events)
+        self.assertIn("e10", self.events)
+
+    def test_automatic_snapshot_keeps_unopened_collections(self):
+        """Test that periodic snapshots include collections not opened since the restart."""
+        self.store.collection("webhooks", "messageId").put({"messageId": "m1"})
+        self.reopen(snapshot_every=5)
+        for i in range(5):
+            self.events.put({"coreEventId": f"e{i}", "caseId": "c"})
+        self.wait_until(lambda: self.store.snapshot_generation == 1)
+
+        self.reopen()
+        self.assertEqual(len(self.events), 5)
+        self.assertEqual(list(self.store.collection("webhooks", "messageId").values()), [{"messageId": "m1"}])
+
+    def test_torn_tail_is_truncated(self):
+        """Test that a partially written last frame is dropped on recovery."""
+        self.events.put({"coreEventId": "e1", "caseId": "c"})
+        self.events.put({"coreEventId": "e2", "caseId": "c"})
+        self.store.close()
+        path = os.path.join(self.directory.name, self.segments()[-1])
+        size = os.path.getsize(path)
+        os.truncate(path, size - 3)
+
+        self.reopen()
+        self.assertEqual([e["coreEventId"] for e in self.events.values()], ["e1"])
+        self.assertLess(os.path.getsize(path), size - 3)
+
+    def test_group_commit(self):
+        """Test that writes reach the log file in groups."""
+        self.reopen(group_commit_size=3, group_commit_interval=3600)
+        path = os.path.join(self.directory.name, self.segments()[-1])
+        self.events.put({"coreEventId": "e1", "caseId": "c"})
+        self.events.put({"coreEventId": "e2", "caseId": "c"})
+        self.assertEqual(os.path.getsize(path), 0)
+        self.events.put({"coreEventId": "e3", "caseId": "c"})
+        self.wait_until(lambda: os.path.getsize(path) > 0)
+
+    def test_writes_continue_during_snapshot(self):
+        """Test that puts and group commits are not held up while a snapshot is serialized."""
+        for i in range(10):
+            self.events.put({"coreEventId": f"e{i}", "caseId": "c"})
+        started, release = threading.Event(), threading.Event()
+        write_snapshot = self.store._write_snapshot
+
+        def slow_write(*args):
+            started.set()
+            release.wait(5)
+            return write_snapshot(*args)
+
+        self.store._write_snapshot = slow_write
+        snapshot = threading.Thread(target=self.store.snapshot)
+        snapshot.start()
+        self.assertTrue(started.wait(5))
+        begin = time.monotonic()
+        self.events.put({"coreEventId": "e3", "caseId": "changed"})
+        self.events.put({"coreEventId": "e10", "caseId": "c"})
+        self.store.flush()
+        self.assertLess(time.monotonic() - begin, 1)
+        release.set()
+        snapshot.join()
+
+        self.reopen()
+        self.assertEqual(len(self.events), 11)
+        self.assertEqual(self.events["e3"]["caseId"], "changed")
+
+    def test_wal_tail_parsed_once(self):
+        """Test that recovery reads each WAL segment once, however many collections are opened."""
+        for name in ("a", "b", "c"):
+            self.store.collection(name, "id").put({"id": name})
+        self.store.close()
+        with mock.patch.object(wal_store, "read_frames", wraps=wal_store.read_frames) as read_frames:
+            self.store = self.open_store()
+            for name in ("a", "b", "c"):
+                self.assertEqual(list(self.store.collection(name, "id").values()), [{"id": name}])
+        self.assertEqual(read_frames.call_count, len(self.segments()) - 1)
+
+    def test_compact_records_recovered(self):
+        """Test that EventRecord collections round-trip through the snapshot and the log."""
+        event = {"coreEventId": "0b4ad2c6-8c8f-4f5e-9c57-2f3a8c9e1d10", "caseId": "c1", "riskScore": 75.0,
+                 "txHash": "0xabcdef", "timestamp": "2024-01-01T00:00:00", "metadata": {"walletAddress": "0xa"}}
+        records = self.store.collection("records", "coreEventId", ["caseId"], EventRecord)
+        records.put(event)
+        self.store.snapshot()
+        records.put(dict(event, coreEventId="c3f1a7e2-3b9d-4a51-8f0e-6d2c1b7a9e44"))
+        self.store.close()
+
+        self.store = self.open_store()
+        records = self.store.collection("records", "coreEventId", ["caseId"], EventRecord)
+        self.assertEqual(records[event["coreEventId"]], event)
+        self.assertEqual(len(records.find("caseId", "c1")), 2)
+
+    def test_snapshot_chunks_recovered(self):
+        """Test that records and index entries spread over several snapshot chunks are recovered in order."""
+        records = self.store.collection("records", "coreEventId", ["caseId"], EventRecord)
+        for i in range(5):
+            records.put({"coreEventId": f"e{i}", "caseId": f"c{i % 2}", "riskScore": i})
+        with mock.patch.object(wal_store, "SNAPSHOT_CHUNK", 2):
+            self.store.snapshot()
+        self.store.close()
+
+        self.store = self.open_store()
+        records = self.store.collection("records", "coreEventId", ["caseId"], EventRecord)
+        self.assertEqual([e["coreEventId"] for e in records.values()], [f"e{i}" for i in range(5)])
+        self.assertEqual(records["e3"], {"coreEventId": "e3", "caseId": "c1", "riskScore": 3})
+        self.assertEqual([e["coreEventId"] for e in records.find("caseId", "c0")], ["e0", "e2", "e4"])
+        records.put({"coreEventId": "e5", "caseId": "c0"})
+        self.assertEqual([e["coreEventId"] for e in records.values()][-1], "e5")
+
+    def test_json_snapshot_still_read(self):
+        """Test that a snapshot written in the earlier one-JSON-document-per-record format is recovered."""
+        self.store.close()
+        documents = [json.dumps({"coreEventId": f"e{i}", "caseId": "c"}).encode("utf-8") for i in range(3)]
+        body = b"".join(wal_store._LENGTH.pack(len(document)) + document for document in documents)
+        with open(os.path.join(self.directory.name, wal_store.SNAPSHOT_FILE), "wb") as f:
+            f.write(wal_store._SNAPSHOT_HEADER.pack(wal_store.JSON_SNAPSHOT_MAGIC, -1))
+            f.write(wal_store._SECTION.pack(len(b"events"), len(b"coreEventId"), len(documents), len(body)))
+            f.write(b"events" + b"coreEventId" + body)
+
+        self.reopen()
+        self.assertEqual([e["coreEventId"] for e in self.events.find("caseId", "c")], ["e0", "e1", "e2"])
+
+    def test_orchestrator_state_survives_restart(self):
+        """Test that a new orchestrator on the same directory sees earlier events."""
+        orchestrator = CoreOrchestrator(self.store)
+        orchestrator.process_event({"caseId": "c1", "riskScore": 10, "metadata": {"walletAddress": "0xa"}})
+        orchestrator.handle_webhook_callback("escalation-result", {"caseId": "c1"})
+        self.store.close()
+
+        self.store = self.open_store()
+        restarted = CoreOrchestrator(self.store)
+        self.assertEqual(len(restarted.events_storage), 1)
+        self.assertEqual(len(restarted.webhook_events), 1)
+        self.assertEqual(len(restarted.get_monitoring_events("event_processed")), 1)
+
+        result = restarted.process_event({"caseId": "c2", "riskScore": 10, "metadata": {"walletAddress": "0xa"}})
+        self.assertEqual(result["crossCaseAlerts"][0]["caseIds"], ["c1", "c2"])
+
+class TestCreateEventStore(unittest.TestCase):
+    def test_rejects_unknown_url(self):
+        """Test that unsupported store URLs are rejected."""
+        self.assertIsInstance(create_event_store("memory"), InMemoryEventStore)
+        with tempfile.TemporaryDirectory() as directory:
+            store = create_event_store(f"wal:///{directory.lstrip('/')}")
+            self.assertIsInstance(store, WALEventStore)
+            store.close()
+        with self.assertRaises(ValueError):
+            create_event_store("postgres://localhost/core")
+
+if __name__ == "__main__":
+    unittest.main()
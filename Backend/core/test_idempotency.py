@@ -0,0 +1,134 @@
+"""
+Test suite for idempotent event ingestion
+"""
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.events.idempotency import BloomFilter, IdempotencyIndex, idempotency_key
+
+class TestIdempotencyIndex(unittest.TestCase):
+    def test_bloom_filter_error_rate(self):
+        """Test that the Bloom filter has no false negatives and stays near its false positive rate."""
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(f"in-{i}")
+        self.assertTrue(all(f"in-{i}" in bloom for i in range(10000)))
+        false_positives = sum(f"out-{i}" in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+        self.assertLess(len(bloom.bits), 10000 * 10 // 8 + 64)
+
+    def test_key_prefers_header(self):
+        """Test that header keys and payload keys are kept apart."""
+        event = {"caseId": "c", "evidenceId": "e", "txHash": None}
+        self.assertEqual(idempotency_key(event), idempotency_key(dict(event, txHash="")))
+        self.assertNotEqual(idempotency_key(event), idempotency_key(dict(event, txHash="0x1")))
+        self.assertEqual(idempotency_key(event, "k"), idempotency_key(dict(event, evidenceId="x", idempotencyKey="k")))
+        self.assertNotEqual(idempotency_key(event, "k"), idempotency_key(event))
+
+    def test_evicted_keys_resolved_by_lookup(self):
+        """Test that keys beyond the LRU are found through the Bloom filter and the lookup."""
+        stored = {}
+        lookups = []
+
+        def lookup(key, event):
+            lookups.append(key)
+            return stored.get(key)
+
+        index = IdempotencyIndex(lookup, cache_size=10, history=1000)
+        for i in range(100):
+            stored[f"k{i}"] = f"id-{i}"
+            index.add(f"k{i}", f"id-{i}")
+        self.assertEqual(len(index.recent), 10)
+
+        self.assertEqual(index.get("k99", {}), "id-99")
+        self.assertEqual(lookups, [])
+        self.assertEqual(index.get("k3", {}), "id-3")
+        self.assertEqual(lookups, ["k3"])
+        self.assertEqual(index.get("k3", {}), "id-3")
+        self.assertEqual(lookups, ["k3"])
+
+        # New keys rarely reach the lookup, and never return an ID when they do
+        self.assertTrue(all(index.get(f"new{i}", {}) is None for i in range(1000)))
+        self.assertLess(len(lookups), 1 + 30)
+        self.assertEqual(index.stats()["falsePositives"], len(lookups) - 1)
+
+    def test_rotation_caps_memory(self):
+        """Test that Bloom filter generations rotate and memory stays fixed."""
+        index = IdempotencyIndex(lambda key, event: "found", cache_size=5, history=100)
+        index.add("first", "id-first")
+        size = index.memory_bytes()
+        for i in range(150):
+            index.add(f"k{i}", f"id-{i}")
+        self.assertEqual(index.rotations, 1)
+        self.assertEqual(index.get("first", {}), "found")
+        for i in range(150, 400):
+            index.add(f"k{i}", f"id-{i}")
+        self.assertEqual(index.rotations, 4)
+        self.assertLessEqual(index.memory_bytes(), 2 * size)
+        self.assertLessEqual(len(index.recent), 5)
+
+class TestIdempotentIngestion(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with empty event storage and idempotency index."""
+        core_events.events_storage.clear()
+        core_events.idempotency_index.clear()
+        self.client = TestClient(core_events.app)
+        self.event = {
+            "caseId": "idem-case",
+            "evidenceId": "idem-evidence",
+            "riskScore": 30,
+            "actionSuggested": "review",
+            "txHash": "0xidem"
+        }
+
+    def test_retry_returns_original_event(self):
+        """Test that a retried event returns its original coreEventId without being stored again."""
+        first = self.client.post("/core/events", json=self.event)
+        self.assertEqual(first.status_code, 202)
+        retry = self.client.post("/core/events", json=dict(self.event, riskScore=31))
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.headers[core_events.REPLAY_HEADER], "true")
+        self.assertEqual(retry.json()["coreEventId"], first.json()["coreEventId"])
+        self.assertEqual(len(core_events.events_storage), 1)
+
+        other = self.client.post("/core/events", json=dict(self.event, txHash="0xother"))
+        self.assertEqual(other.status_code, 202)
+        self.assertEqual(len(core_events.events_storage), 2)
+
+    def test_idempotency_key_header(self):
+        """Test that the Idempotency-Key header identifies retries, even after the LRU forgets them."""
+        headers = {"Idempotency-Key": "client-request-1"}
+        first = self.client.post("/core/events", json=self.event, headers=headers)
+        self.assertEqual(first.status_code, 202)
+        core_event_id = first.json()["coreEventId"]
+        self.assertEqual(core_events.events_storage[core_event_id]["idempotencyKey"], "client-request-1")
+
+        # Same payload under a different key is a new submission
+        second = self.client.post("/core/events", json=self.event, headers={"Idempotency-Key": "client-request-2"})
+        self.assertEqual(second.status_code, 202)
+
+        core_events.idempotency_index.recent.clear()
+        retry = self.client.post("/core/events", json=dict(self.event, evidenceId="changed"), headers=headers)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()["coreEventId"], core_event_id)
+        self.assertEqual(len(core_events.events_storage), 2)
+
+    def test_batch_duplicates(self):
+        """Test that the batch endpoint reports retried and repeated items as duplicates."""
+        first = self.client.post("/core/events", json=self.event).json()
+        events = [self.event, dict(self.event, evidenceId="idem-2"), dict(self.event, evidenceId="idem-2"),
+                  {"caseId": "missing-fields"}]
+        data = self.client.post("/core/events:batch", json={"events": events}).json()
+        self.assertEqual([r["status"] for r in data["results"]], ["duplicate", "accepted", "duplicate", "rejected"])
+        self.assertEqual((data["accepted"], data["rejected"], data["duplicates"]), (1, 1, 2))
+        self.assertEqual(data["results"][0]["coreEventId"], first["coreEventId"])
+        self.assertEqual(data["results"][2]["coreEventId"], data["results"][1]["coreEventId"])
+        self.assertEqual(len(core_events.events_storage), 2)
+
+        retry = self.client.post("/core/events", json=dict(self.event, evidenceId="idem-2"))
+        self.assertEqual(retry.json()["coreEventId"], data["results"][1]["coreEventId"])
+
+if __name__ == "__main__":
+    unittest.main()
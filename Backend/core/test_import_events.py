@@ -0,0 +1,93 @@
+"""
+Test suite for the bulk import CLI
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from core import import_events
+from core.orchestration.core_orchestrator import CoreOrchestrator
+from core.storage.event_store import InMemoryEventStore
+
+class TestRecordParsing(unittest.TestCase):
+    def test_json_array_items_across_chunk_boundaries(self):
+        """Test that the incremental parser matches json.load with tiny read sizes."""
+        records = [{"id": i, "nested": {"values": list(range(i))}, "text": "a, ]" * i} for i in range(20)]
+        records += [12345, -6.5e3, "last", None, True]
+        text = "  " + json.dumps(records, indent=1)
+        for read_size in (1, 3, 7, 64):
+            parsed = list(import_events.iter_json_array(io.StringIO(text), read_size=read_size))
+            self.assertEqual(parsed, records)
+
+    def test_auto_detects_format(self):
+        """Test that JSON arrays and NDJSON are both recognised."""
+        self.assertEqual(list(import_events.iter_records(io.StringIO('\n [{"a": 1}, {"a": 2}]'))), [{"a": 1}, {"a": 2}])
+        self.assertEqual(list(import_events.iter_records(io.StringIO('{"a": 1}\n\n{"a": 2}\n'))), [{"a": 1}, {"a": 2}])
+        self.assertEqual(list(import_events.iter_records(io.StringIO(""))), [])
+        with self.assertRaises(ValueError):
+            list(import_events.iter_records(io.StringIO('[{"a": 1}'), "json"))
+
+class TestRecordMapping(unittest.TestCase):
+    def test_transaction_maps_to_event_payload(self):
+        """Test that transaction records become valid case events with stable IDs."""
+        transaction = {"tx_hash": "ab" * 32, "from_address": "cd" * 32, "to_address": "ef" * 32,
+                       "amount": 96, "token": "BHX", "status": "confirmed", "timestamp": 1754390503}
+        first, error = import_events.to_event(transaction)
+        second, _ = import_events.to_event(transaction)
+        self.assertIsNone(error)
+        self.assertEqual(first["caseId"], "case-" + "cd" * 32)
+        self.assertEqual(first["txHash"], "ab" * 32)
+        self.assertEqual(first["metadata"]["walletAddress"], "cd" * 32)
+        self.assertEqual(first["metadata"]["amount"], 96)
+        self.assertEqual(first["coreEventId"], second["coreEventId"])
+
+    def test_invalid_records_rejected(self):
+        """Test that records failing EventPayload validation are reported."""
+        event, error = import_events.to_event({"caseId": "c1", "evidenceId": "e1", "riskScore": 500,
+                                               "actionSuggested": "escalate"})
+        self.assertIsNone(event)
+        self.assertIn("riskScore", error)
+        self.assertEqual(import_events.to_event([1, 2])[1], "Record is not an object")
+
+    def test_cli_does_not_start_core_events(self):
+        """Test that importing the CLI leaves the Core Events service and its startup work unloaded."""
+        code = "import sys; from core import import_events; print('core.events.core_events' in sys.modules)"
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+class TestImportEvents(unittest.TestCase):
+    def setUp(self):
+        self.orchestrator = CoreOrchestrator(InMemoryEventStore())
+        self.records = [
+            {"tx_hash": f"{i:064x}", "from_address": f"{i % 3:064x}", "amount": 20000, "timestamp": 1754390503 + i}
+            for i in range(10)
+        ] + [{"caseId": "c1", "evidenceId": "e1", "riskScore": 90, "actionSuggested": "escalate"}, "bad"]
+
+    def test_import_in_batches(self):
+        """Test that valid records are orchestrated and stored, and re-importing is idempotent."""
+        summary = import_events.import_events(iter(self.records), self.orchestrator, batch_size=4)
+        self.assertEqual(summary["processed"], 11)
+        self.assertEqual(summary["rejected"], 1)
+        self.assertEqual(summary["errors"], 0)
+        self.assertGreaterEqual(summary["actions"]["auto_escalation"], 1)
+        self.assertEqual(len(self.orchestrator.events_storage), 11)
+        self.assertTrue(all(e["status"] == "processed" for e in self.orchestrator.events_storage.values()))
+
+        import_events.import_events(iter(self.records[:10]), self.orchestrator, batch_size=4)
+        self.assertEqual(len(self.orchestrator.events_storage), 11)
+
+    def test_parallel_validation_keeps_file_order(self):
+        """Test that worker processes validate batches without reordering them."""
+        summary = import_events.import_events(iter(self.records), self.orchestrator, batch_size=2, workers=2,
+                                              limit=10)
+        self.assertEqual(summary["processed"], 10)
+        timestamps = [e["timestamp"] for e in self.orchestrator.events_storage.values()]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+if __name__ == "__main__":
+    unittest.main()
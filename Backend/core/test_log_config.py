@@ -0,0 +1,75 @@
+"""
+Test suite for hot-path logging configuration
+"""
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+from core.storage import log_config
+from core.storage.monitoring_log import new_event_id
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+class TestLogSampler(unittest.TestCase):
+    def test_samples_only_when_debug_enabled(self):
+        """Test that 1 in N events is sampled, and none below DEBUG."""
+        target = logging.getLogger("test.sampler")
+        sampler = log_config.LogSampler(target, every=10)
+
+        target.setLevel(logging.INFO)
+        self.assertFalse(any(sampler() for _ in range(100)))
+
+        target.setLevel(logging.DEBUG)
+        self.assertEqual(sum(sampler() for _ in range(100)), 10)
+        target.setLevel(logging.NOTSET)
+
+class TestQueuedLogging(unittest.TestCase):
+    def test_records_written_by_listener(self):
+        """Test that queued logging delivers records to the original handlers."""
+        # App startup in other tests may already have queued logging enabled
+        log_config.stop_logging()
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        handler = ListHandler()
+        root.handlers = [handler]
+        try:
+            log_config.configure_logging("INFO", queued=True)
+            self.assertIsInstance(root.handlers[0], logging.handlers.QueueHandler)
+            logging.getLogger("test.queued").info("event %s", 1)
+            logging.getLogger("test.queued").debug("hidden")
+            log_config.stop_logging()
+            self.assertIn("event 1", handler.messages)
+            self.assertNotIn("hidden", handler.messages)
+            self.assertEqual(root.handlers, [handler])
+        finally:
+            log_config.stop_logging()
+            root.handlers = saved_handlers
+            root.setLevel(saved_level)
+
+    def test_import_leaves_root_logger_alone(self):
+        """Test that importing the services configures no logging until configure_logging() is called."""
+        script = ("import logging, core.events.core_events, core.events.webhooks, core.import_events; "
+                  "root = logging.getLogger(); print(len(root.handlers), root.level); "
+                  "from core.storage.log_config import configure_logging; configure_logging(queued=False); "
+                  "print(len(root.handlers), root.level)")
+        backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+        output = subprocess.run([sys.executable, "-c", script], cwd=backend, capture_output=True, text=True,
+                                check=True, env=dict(os.environ, CORE_STORE_URL="memory")).stdout.split()
+        self.assertEqual(output, ["0", str(logging.WARNING), "1", str(logging.INFO)])
+
+class TestEventIds(unittest.TestCase):
+    def test_event_ids_unique(self):
+        """Test that generated monitoring event IDs do not repeat."""
+        ids = [new_event_id() for _ in range(1000)]
+        self.assertEqual(len(set(ids)), 1000)
+
+if __name__ == "__main__":
+    unittest.main()
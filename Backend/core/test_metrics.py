@@ -0,0 +1,84 @@
+"""
+Test suite for the metrics registry and /metrics endpoints
+"""
+import timeit
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.storage.metrics import MetricsRegistry, timed
+from core.events import core_events, webhooks
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram samples follow the Prometheus exposition format."""
+        registry = MetricsRegistry(enabled=True)
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.labels(route='/a"b').observe(value)
+
+        text = registry.render()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{route="/a\\"b"} 3', text)
+
+    def test_timers_and_counters(self):
+        """Test that timed functions and counters record samples."""
+        registry = MetricsRegistry(enabled=True)
+        counter = registry.counter("calls", "Calls", ("kind",))
+        histogram = registry.histogram("call_seconds", "Call time")
+
+        @timed(histogram)
+        def work(x):
+            counter.labels(kind="work").inc()
+            return x * 2
+
+        self.assertEqual(work(2), 4)
+        with histogram.time():
+            pass
+        text = registry.render()
+        self.assertIn('calls_total{kind="work"} 1', text)
+        self.assertIn("call_seconds_count 2", text)
+
+    def test_disabled_registry_records_nothing_cheaply(self):
+        """Test that disabled timers skip recording and add under 1µs per call."""
+        registry = MetricsRegistry(enabled=False)
+        histogram = registry.histogram("call_seconds", "Call time")
+
+        def plain():
+            return None
+
+        wrapped = timed(histogram)(plain)
+        wrapped()
+        self.assertIn("call_seconds_count 0", registry.render())
+
+        calls = 100000
+        plain_time = min(timeit.repeat(plain, number=calls, repeat=5)) / calls
+        wrapped_time = min(timeit.repeat(wrapped, number=calls, repeat=5)) / calls
+        self.assertLess(wrapped_time - plain_time, 1e-6)
+
+class TestMetricsEndpoints(unittest.TestCase):
+    def test_core_events_metrics(self):
+        """Test that the Core Events API exposes request, queue and storage metrics."""
+        client = TestClient(core_events.app)
+        client.get("/core/events/missing-event")
+        text = client.get("/metrics").text
+        self.assertIn('core_http_request_duration_seconds_count{service="core_events",method="GET",'
+                      'route="/core/events/{core_event_id}",status="404"}', text)
+        self.assertIn("core_event_queue_depth ", text)
+        self.assertIn("core_events_stored ", text)
+        self.assertIn("# TYPE core_process_event_duration_seconds histogram", text)
+
+    def test_webhooks_metrics(self):
+        """Test that the Webhooks API exposes delivery outcomes and queue depths."""
+        client = TestClient(webhooks.app)
+        response = client.get("/metrics")
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('core_webhook_deliveries_total{outcome="dead_lettered"}', response.text)
+        self.assertIn("core_replay_queue_depth ", response.text)
+        self.assertIn("core_dead_letters_stored ", response.text)
+
+if __name__ == "__main__":
+    unittest.main()
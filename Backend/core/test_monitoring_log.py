@@ -0,0 +1,114 @@
+"""
+Test suite for the bounded monitoring log and GET /monitoring/events
+"""
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import webhooks
+from core.storage.event_store import InMemoryEventStore, SQLiteEventStore
+from core.storage.monitoring_log import MonitoringLog, monitoring_collection
+
+def make_event(i, event_type):
+    return {
+        "eventId": f"mon-{i}",
+        "eventType": event_type,
+        "status": "success",
+        "timestamp": "2025-10-06T12:00:00",
+        "loggedAt": 1000.0 + i
+    }
+
+class TestMonitoringLog(unittest.TestCase):
+    def setUp(self):
+        """Set up a small log holding more events than it can retain."""
+        self.collection = InMemoryEventStore().collection("monitoring_events", "sequence")
+        self.log = MonitoringLog(capacity=50, collection=self.collection)
+        self.types = ["event_processed", "replay", "webhook_escalation-result"]
+        for i in range(120):
+            self.log.append(make_event(i, self.types[i % 3]))
+
+    def test_capacity_is_bounded(self):
+        """Test that only the newest events are retained."""
+        self.assertEqual(len(self.log), 50)
+        self.assertEqual(len(self.collection), 50)
+        sequences = [e["sequence"] for e in self.log.query()]
+        self.assertEqual(sequences, list(range(70, 120)))
+
+    def test_type_filter_matches_scan(self):
+        """Test that the per-type index agrees with filtering the window."""
+        window = self.log.query()
+        for event_type in self.types:
+            expected = [e for e in window if e["eventType"] == event_type]
+            self.assertEqual(self.log.query(event_type=event_type), expected)
+        self.assertEqual(self.log.query(event_type="unknown"), [])
+
+    def test_cursor_pagination(self):
+        """Test paging forward with since and limit."""
+        pages = []
+        cursor = -1
+        while True:
+            page = self.log.query(event_type="replay", since=cursor, limit=4)
+            if not page:
+                break
+            pages.extend(page)
+            cursor = page[-1]["sequence"]
+        self.assertEqual(pages, self.log.query(event_type="replay"))
+
+    def test_limit_without_cursor_returns_latest(self):
+        """Test that an uncursored limit returns the most recent events."""
+        sequences = [e["sequence"] for e in self.log.query(limit=3)]
+        self.assertEqual(sequences, [117, 118, 119])
+
+    def test_time_range(self):
+        """Test filtering by arrival time."""
+        events = self.log.query(start=1100.0, end=1105.0)
+        self.assertEqual([e["sequence"] for e in events], list(range(100, 105)))
+        events = self.log.query(event_type="event_processed", start=1100.0, end=1110.0)
+        self.assertEqual([e["sequence"] for e in events], [102, 105, 108])
+
+    def test_restores_from_collection(self):
+        """Test that a new log picks up the persisted window."""
+        restored = MonitoringLog(capacity=50, collection=self.collection)
+        self.assertEqual(restored.query(), self.log.query())
+        record = restored.append(make_event(999, "replay"))
+        self.assertEqual(record["sequence"], 120)
+
+    def test_mirrored_only_to_persistent_stores(self):
+        """Test that the in-memory store gets no second copy of the log, and SQLite does."""
+        memory = InMemoryEventStore()
+        self.assertIsNone(monitoring_collection(memory))
+        self.assertNotIn("monitoring_events", memory.collections)
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = SQLiteEventStore(os.path.join(directory, "core.db"))
+            log = MonitoringLog(capacity=5, collection=monitoring_collection(store))
+            log.append(make_event(0, "replay"))
+            self.assertEqual(len(store.collection("monitoring_events", "sequence")), 1)
+            store.close()
+
+class TestMonitoringEventsEndpoint(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with an empty monitoring log."""
+        webhooks.monitoring_events.clear()
+        self.client = TestClient(webhooks.app)
+
+    def test_paginates_logged_events(self):
+        """Test logging events and reading them back by cursor."""
+        for i in range(5):
+            event = {"eventId": f"e{i}", "eventType": "test_event", "status": "success", "timestamp": "2025-10-06T12:00:00Z"}
+            self.assertEqual(self.client.post("/monitoring/events", json=event).status_code, 200)
+
+        first = self.client.get("/monitoring/events", params={"since": -1, "limit": 2}).json()
+        self.assertEqual([e["eventId"] for e in first], ["e0", "e1"])
+        rest = self.client.get("/monitoring/events", params={"since": first[-1]["sequence"]}).json()
+        self.assertEqual([e["eventId"] for e in rest], ["e2", "e3", "e4"])
+
+    def test_rejects_invalid_time(self):
+        """Test that malformed time bounds return 400."""
+        response = self.client.get("/monitoring/events", params={"start": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
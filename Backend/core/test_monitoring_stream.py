@@ -0,0 +1,154 @@
+"""
+Test suite for the streaming monitoring feed
+"""
+import asyncio
+import json
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.events.core_events import process_queued_event, monitoring_log
+from core.events.monitoring_stream import MonitoringStream
+from core.events.webhooks import app
+from core.storage.monitoring_log import MonitoringLog
+
+def monitoring_event(i, event_type="event_processed"):
+    return {"eventId": f"evt-{i}", "eventType": event_type, "status": "success", "timestamp": "2024-01-01T00:00:00"}
+
+async def take(iterator, count):
+    return [await asyncio.wait_for(iterator.__anext__(), 1) for _ in range(count)]
+
+class TestMonitoringStream(unittest.TestCase):
+    def setUp(self):
+        self.log = MonitoringLog(capacity=100)
+        self.stream = MonitoringStream(self.log, queue_size=5, heartbeat_seconds=0.05, page_size=3)
+
+    def test_resume_sends_backlog_then_live_events(self):
+        """Test that a cursor replays retained events once, then continues live."""
+        for i in range(5):
+            self.log.append(monitoring_event(i))
+
+        async def run():
+            feed = self.stream.stream(since=1, stream_format="ndjson")
+            backlog = await take(feed, 3)
+            self.log.append(monitoring_event(5))
+            live = await take(feed, 1)
+            await feed.aclose()
+            return backlog + live
+
+        lines = [json.loads(line) for line in asyncio.run(run())]
+        self.assertEqual([line["sequence"] for line in lines], [2, 3, 4, 5])
+        self.assertEqual(self.stream.subscriber_count(), 0)
+
+    def test_sse_encoding_filter_and_heartbeat(self):
+        """Test SSE framing, event type filtering and keepalives while idle."""
+        async def run():
+            feed = self.stream.stream(event_type="cross_case_alert")
+            first = asyncio.ensure_future(feed.__anext__())
+            await asyncio.sleep(0)
+            self.log.append(monitoring_event(0))
+            self.log.append(monitoring_event(1, "cross_case_alert"))
+            message = await asyncio.wait_for(first, 1)
+            heartbeat = await take(feed, 1)
+            await feed.aclose()
+            return message, heartbeat[0]
+
+        message, heartbeat = asyncio.run(run())
+        self.assertTrue(message.startswith("id: 1\nevent: cross_case_alert\ndata: "))
+        self.assertEqual(json.loads(message.split("data: ", 1)[1])["eventId"], "evt-1")
+        self.assertEqual(heartbeat, ": keepalive\n\n")
+
+    def test_slow_consumer_is_dropped_with_resume_cursor(self):
+        """Test that overflowing a subscriber queue ends its stream with a cursor to resume from."""
+        async def run():
+            feed = self.stream.stream(since=-1, stream_format="ndjson")
+            self.log.append(monitoring_event(0))
+            messages = await take(feed, 1)
+            for i in range(1, 10):
+                self.log.append(monitoring_event(i))
+            async for message in feed:
+                messages.append(message)
+            return messages
+
+        lines = [json.loads(line) for line in asyncio.run(run())]
+        # The queued events are delivered before the drop notice
+        self.assertEqual([line["sequence"] for line in lines[:-1]], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(lines[-1], {"reason": "slow_consumer", "since": 5, "control": "dropped"})
+        self.assertEqual(self.stream.dropped, 1)
+        self.assertEqual(self.stream.subscriber_count(), 0)
+
+    def test_events_logged_from_other_threads(self):
+        """Test that events logged by worker threads reach subscribers."""
+        async def run():
+            feed = self.stream.stream(stream_format="ndjson")
+            first = asyncio.ensure_future(feed.__anext__())
+            await asyncio.sleep(0)
+            thread = threading.Thread(target=self.log.append, args=(monitoring_event(0),))
+            thread.start()
+            thread.join()
+            message = await asyncio.wait_for(first, 1)
+            await feed.aclose()
+            return message
+
+        self.assertEqual(json.loads(asyncio.run(run()))["eventId"], "evt-0")
+
+    def test_gap_reported_for_evicted_cursor(self):
+        """Test that resuming before the retained window reports the gap."""
+        log = MonitoringLog(capacity=2)
+        stream = MonitoringStream(log, heartbeat_seconds=0.05)
+        for i in range(4):
+            log.append(monitoring_event(i))
+
+        async def run():
+            feed = stream.stream(since=0, stream_format="ndjson")
+            messages = await take(feed, 3)
+            await feed.aclose()
+            return messages
+
+        lines = [json.loads(line) for line in asyncio.run(run())]
+        self.assertEqual(lines[0], {"since": 0, "firstSequence": 2, "control": "gap"})
+        self.assertEqual([line["sequence"] for line in lines[1:]], [2, 3])
+
+class TestMonitoringStreamEndpoint(unittest.TestCase):
+    def test_alerts_are_logged_for_the_feed(self):
+        """Test that cross-case alerts of processed events are logged as cross_case_alert events."""
+        for case_id in ["stream-case-a", "stream-case-b"]:
+            process_queued_event({"coreEventId": f"{case_id}-event", "caseId": case_id, "riskScore": 10,
+                                  "metadata": {"walletAddress": "0xstreamed"}})
+
+        alerts = [
+            event["alert"] for event in monitoring_log.query(event_type="cross_case_alert")
+            if event["alert"].get("walletAddress") == "0xstreamed"
+        ]
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]["caseIds"], ["stream-case-a", "stream-case-b"])
+
+    def test_core_events_streams_its_alerts(self):
+        """Test that the Core Events service, which logs cross-case alerts, pushes them to its own feed."""
+        async def run():
+            feed = core_events.monitoring_stream.stream(event_type="cross_case_alert", stream_format="ndjson")
+            first = asyncio.ensure_future(feed.__anext__())
+            await asyncio.sleep(0)
+            for case_id in ["own-stream-case-a", "own-stream-case-b"]:
+                process_queued_event({"coreEventId": f"{case_id}-event", "caseId": case_id, "riskScore": 10,
+                                      "metadata": {"walletAddress": "0xownstream"}})
+            message = await asyncio.wait_for(first, 1)
+            await feed.aclose()
+            return message
+
+        alert = json.loads(asyncio.run(run()))["alert"]
+        self.assertEqual(alert["walletAddress"], "0xownstream")
+        self.assertEqual(alert["caseIds"], ["own-stream-case-a", "own-stream-case-b"])
+
+    def test_invalid_format_and_cursor_rejected(self):
+        """Test that unknown formats and malformed Last-Event-ID headers return 400 on both services."""
+        for service in (app, core_events.app):
+            client = TestClient(service)
+            self.assertEqual(client.get("/monitoring/stream?format=xml").status_code, 400)
+            response = client.get("/monitoring/stream", headers={"Last-Event-ID": "abc"})
+            self.assertEqual(response.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Test suite for batched blockchain reconciliation
+"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from core.events.reconciliation import ChainClient, FileChainClient, ReconciliationService, normalize_tx_hash
+
+class CountingChainClient(ChainClient):
+    """Chain stub recording every batch it is asked for."""
+
+    def __init__(self, statuses, latency=0.0, fail=False):
+        self.statuses = statuses
+        self.latency = latency
+        self.fail = fail
+        self.calls = []
+
+    async def get_transactions(self, tx_hashes):
+        self.calls.append(list(tx_hashes))
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("node unavailable")
+        return {h: {"status": self.statuses[h], "blockNumber": 1} for h in tx_hashes if h in self.statuses}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestReconciliationService(unittest.TestCase):
+    def test_lookups_are_batched_and_deduplicated(self):
+        """Test that n distinct hashes cost ceil(n / batch_size) round-trips."""
+        hashes = [f"{i:064x}" for i in range(250)]
+        client = CountingChainClient({h: "confirmed" for h in hashes})
+        service = ReconciliationService(client, batch_size=100)
+
+        results = asyncio.run(service.reconcile(hashes + ["0x" + h.upper() for h in hashes[:10]]))
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(sum(len(c) for c in client.calls), 250)
+        self.assertEqual(results["0x" + hashes[0].upper()]["status"], "confirmed")
+
+    def test_confirmed_cached_and_pending_expires(self):
+        """Test that confirmed results are kept while pending ones expire after the TTL."""
+        client = CountingChainClient({"a": "confirmed", "b": "pending"})
+        clock = FakeClock()
+        service = ReconciliationService(client, pending_ttl=30, clock=clock)
+
+        results = asyncio.run(service.reconcile(["a", "b", "c"]))
+        self.assertEqual([results[h]["status"] for h in "abc"], ["confirmed", "pending", "not_found"])
+        asyncio.run(service.reconcile(["a", "b", "c"]))
+        self.assertEqual(len(client.calls), 1)
+
+        clock.now = 31
+        asyncio.run(service.reconcile(["a", "b", "c"]))
+        self.assertEqual(client.calls[-1], ["b", "c"])
+        self.assertEqual(service.stats()["batches"], 2)
+
+    def test_concurrent_requests_share_lookups(self):
+        """Test that overlapping in-flight requests do not query the chain twice."""
+        client = CountingChainClient({"a": "confirmed", "b": "confirmed"}, latency=0.01)
+        service = ReconciliationService(client)
+
+        async def run():
+            return await asyncio.gather(service.reconcile(["a", "b"]), service.reconcile(["b", "a"]))
+
+        first, second = asyncio.run(run())
+        self.assertEqual(client.calls, [["a", "b"]])
+        self.assertEqual(first["a"], second["a"])
+
+    def test_failed_lookup_not_cached(self):
+        """Test that chain errors are reported and retried on the next request."""
+        client = CountingChainClient({"a": "confirmed"}, fail=True)
+        service = ReconciliationService(client)
+
+        self.assertEqual(asyncio.run(service.reconcile(["a"]))["a"]["status"], "error")
+        client.fail = False
+        self.assertEqual(asyncio.run(service.reconcile(["a"]))["a"]["status"], "confirmed")
+        self.assertEqual(len(client.calls), 2)
+
+class TestFileChainClient(unittest.TestCase):
+    def test_recent_blocks_pending_until_confirmed(self):
+        """Test that blocks within the confirmation depth are reported as pending."""
+        records = [{"tx_hash": "0xAA", "block_number": 1}, {"tx_hash": "bb", "block_number": 10}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chain.json")
+            with open(path, "w") as f:
+                json.dump(records, f)
+            client = FileChainClient(path, confirmations=3)
+
+        found = asyncio.run(client.get_transactions([normalize_tx_hash("0xaa"), "bb", "cc"]))
+        self.assertEqual(found, {"aa": {"status": "confirmed", "blockNumber": 1},
+                                 "bb": {"status": "pending", "blockNumber": 10}})
+        self.assertEqual(client.round_trips, 1)
+
+if __name__ == "__main__":
+    unittest.main()
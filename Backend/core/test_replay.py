@@ -0,0 +1,126 @@
+"""
+Test suite for webhook replay in the BHIV Core Webhooks API
+"""
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from core.events import webhooks
+from core.events.replay import ReplayWorkerPool
+
+class TestReplayWorkerPool(unittest.TestCase):
+    def test_concurrency_is_bounded(self):
+        """Test that no more than `concurrency` deliveries run at once."""
+        active = 0
+        peak = 0
+        results = []
+
+        async def deliver(event):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+            if event["messageId"] == "bad":
+                raise RuntimeError("destination unavailable")
+
+        async def run():
+            pool = ReplayWorkerPool(deliver, concurrency=3, on_result=results.append)
+            for i in range(20):
+                pool.submit({"messageId": f"m{i}"})
+            pool.submit({"messageId": "bad"})
+            await pool.stop()
+            return pool
+
+        pool = asyncio.run(run())
+        self.assertEqual(peak, 3)
+        self.assertEqual(pool.delivered, 20)
+        self.assertEqual(pool.failed, 1)
+        self.assertEqual(sorted(r["status"] for r in results), ["completed"] * 20 + ["failed"])
+
+    def test_full_queue_rejects(self):
+        """Test that submissions beyond the queue size are refused."""
+        async def deliver(event):
+            pass
+
+        async def run():
+            pool = ReplayWorkerPool(deliver, concurrency=1, queue_size=2)
+            accepted = [pool.submit({"messageId": f"m{i}"}) for i in range(3)]
+            await pool.stop()
+            return accepted
+
+        self.assertEqual(asyncio.run(run()), [True, True, False])
+
+class TestReplayEndpoints(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with empty webhook and monitoring logs."""
+        webhooks.webhook_events.clear()
+        webhooks.monitoring_events.clear()
+        self.callback = {
+            "outcomeId": "outcome-1",
+            "caseId": "case-1",
+            "eventType": "escalation_completed",
+            "result": {"status": "approved"},
+            "timestamp": "2025-10-06T10:30:00Z"
+        }
+
+    def post_callbacks(self, client, count):
+        return [
+            client.post("/callbacks/escalation-result", json=self.callback).json()["messageId"]
+            for _ in range(count)
+        ]
+
+    def test_single_replay(self):
+        """Test replaying one event by message ID."""
+        with TestClient(webhooks.app) as client:
+            message_id = self.post_callbacks(client, 1)[0]
+            response = client.post(f"/monitoring/replay/{message_id}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["status"], "replay_initiated")
+            self.assertEqual(client.post("/monitoring/replay/missing").status_code, 404)
+
+        completed = webhooks.monitoring_events.query(event_type="replay")
+        self.assertIn("completed", [e["status"] for e in completed])
+
+    def test_bulk_replay_by_ids_and_window(self):
+        """Test replaying by ID list and by time window."""
+        with TestClient(webhooks.app) as client:
+            message_ids = self.post_callbacks(client, 5)
+
+            response = client.post("/monitoring/replay", json={"eventIds": message_ids[:2] + ["missing"]})
+            self.assertEqual(response.status_code, 202)
+            data = response.json()
+            self.assertEqual(data["queued"], message_ids[:2])
+            self.assertEqual(data["notFound"], ["missing"])
+
+            response = client.post("/monitoring/replay", json={"start": "2000-01-01T00:00:00"})
+            self.assertEqual(response.json()["queued"], message_ids)
+
+            response = client.post("/monitoring/replay", json={"end": "2000-01-01T00:00:00"})
+            self.assertEqual(response.json()["queued"], [])
+
+            self.assertEqual(client.post("/monitoring/replay", json={}).status_code, 400)
+            self.assertEqual(client.post("/monitoring/replay", json={"start": "yesterday"}).status_code, 400)
+
+        completed = [e for e in webhooks.monitoring_events.query(event_type="replay") if e["status"] == "completed"]
+        self.assertEqual(len(completed), 7)
+
+    def test_window_bounds_with_offsets(self):
+        """Test that window bounds given in UTC or with an offset are compared as times, not as strings."""
+        with TestClient(webhooks.app) as client:
+            message_ids = self.post_callbacks(client, 3)
+            received = datetime.fromisoformat(webhooks.webhook_events[message_ids[0]]["receivedAt"]).astimezone()
+            before = (received - timedelta(seconds=1)).astimezone(timezone(timedelta(hours=5)))
+            after = (received + timedelta(minutes=1)).astimezone(timezone.utc)
+
+            response = client.post("/monitoring/replay", json={"start": before.isoformat(),
+                                                               "end": after.isoformat().replace("+00:00", "Z")})
+            self.assertEqual(response.json()["queued"], message_ids)
+
+            response = client.post("/monitoring/replay", json={"end": before.isoformat()})
+            self.assertEqual(response.json()["queued"], [])
+
+if __name__ == "__main__":
+    unittest.main()
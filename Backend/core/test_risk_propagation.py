@@ -0,0 +1,164 @@
+"""
+Test suite for wallet risk propagation over the transaction graph
+"""
+import random
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.orchestration import risk_propagation
+from core.orchestration.risk_propagation import WalletRiskScores
+from core.orchestration.rules import OrchestrationRules, DEFAULT_RULES_FILE
+from core.orchestration.transaction_graph import TransactionGraph
+
+def flagged(wallet, risk_score=90, action="review"):
+    return {"riskScore": risk_score, "actionSuggested": action, "metadata": {"walletAddress": wallet}}
+
+def chain_graph():
+    graph = TransactionGraph()
+    for i, (sender, receiver) in enumerate([("bad", "a"), ("a", "b"), ("b", "c")]):
+        graph.add_transfer(sender, receiver, 100, i)
+    graph.add_transfer("x", "y", 100, 0)
+    return graph
+
+class TestWalletRiskScores(unittest.TestCase):
+    def test_risk_decays_with_distance(self):
+        """Test that risk spreads from a flagged wallet and decays per hop."""
+        scores = WalletRiskScores(chain_graph(), damping=0.5)
+        self.assertTrue(scores.add_event(flagged("bad", 100)))
+        self.assertFalse(scores.add_event(flagged("bad", 90)))
+        self.assertFalse(scores.add_event(flagged("a", 20)))
+        self.assertEqual(scores.score("a"), 0)
+
+        scores.refresh()
+        self.assertEqual(scores.score("bad"), 100)
+        self.assertGreater(scores.score("a"), scores.score("b"))
+        self.assertGreater(scores.score("b"), scores.score("c"))
+        self.assertGreater(scores.score("c"), 0)
+        self.assertEqual(scores.score("x"), 0)
+        self.assertEqual(scores.score("unknown"), 0)
+        self.assertFalse(scores.dirty)
+
+    def test_freeze_flags_wallet(self):
+        """Test that a suggested freeze flags its wallet at the flag score."""
+        scores = WalletRiskScores(chain_graph())
+        self.assertTrue(scores.add_event(flagged("x", 10, "freeze")))
+        self.assertEqual(scores.score("x"), scores.flag_score)
+
+    def test_fixed_point_matches_dense_iteration(self):
+        """Test the sparse propagation against a dense reference on a random graph."""
+        rng = random.Random(3)
+        graph = TransactionGraph()
+        for i in range(300):
+            graph.add_transfer(f"w{rng.randrange(60)}", f"w{rng.randrange(60)}", rng.choice([0, 1, 10, 100]), i)
+        scores = WalletRiskScores(graph, damping=0.6, tolerance=1e-9, max_iterations=500)
+        for wallet in ("w1", "w7", "w30"):
+            scores.add_event(flagged(wallet, rng.randrange(80, 101)))
+        scores.refresh()
+
+        nodes, senders, receivers, amounts = graph.transfer_arrays()
+        dense = np.zeros((nodes, nodes))
+        for s, r, a in zip(senders, receivers, amounts):
+            if s != r:
+                dense[s, r] += a
+                dense[r, s] += a
+        totals = dense.sum(axis=1, keepdims=True)
+        dense = np.divide(dense, totals, out=np.zeros_like(dense), where=totals > 0)
+        seed = np.zeros(nodes)
+        for wallet, value in scores.seeds.items():
+            seed[graph.addresses[wallet]] = value
+        expected = seed
+        for _ in range(500):
+            expected = np.maximum(seed, 0.6 * dense @ expected)
+        np.testing.assert_allclose(scores.scores, expected, atol=1e-5)
+
+    def test_numpy_fallback_matches_scipy(self):
+        """Test that the NumPy propagation gives the SciPy result."""
+        rng = random.Random(5)
+        graph = TransactionGraph()
+        for i in range(200):
+            graph.add_transfer(f"w{rng.randrange(40)}", f"w{rng.randrange(40)}", rng.randrange(1, 50), i)
+        results = []
+        original = risk_propagation.sparse
+        try:
+            for module in (original, None):
+                risk_propagation.sparse = module
+                scores = WalletRiskScores(graph)
+                scores.add_event(flagged("w3"))
+                scores.refresh()
+                results.append(scores.scores)
+        finally:
+            risk_propagation.sparse = original
+        np.testing.assert_allclose(results[0], results[1], atol=1e-6)
+
+    def test_incremental_refresh(self):
+        """Test that new flags and transfers are picked up by a warm-started refresh."""
+        graph = chain_graph()
+        scores = WalletRiskScores(graph)
+        scores.add_event(flagged("bad"))
+        scores.refresh()
+        self.assertEqual(scores.score("y"), 0)
+
+        graph.add_transfer("c", "x", 100, 10)
+        scores.add_event(flagged("y", 95))
+        self.assertEqual(scores.score("y"), 95)
+        scores.refresh()
+        self.assertGreater(scores.score("x"), 0)
+
+        fresh = WalletRiskScores(graph)
+        fresh.seeds = dict(scores.seeds)
+        fresh.refresh()
+        np.testing.assert_allclose(scores.scores, fresh.scores, atol=1e-3)
+
+class TestWalletRiskEscalation(unittest.TestCase):
+    def test_check_auto_escalation_reads_wallet_risk(self):
+        """Test that, with the shipped defaults, a counterparty of a flagged wallet escalates and wallets further away do not."""
+        rules = OrchestrationRules(DEFAULT_RULES_FILE)
+        event = {"riskScore": 10, "actionSuggested": "review", "metadata": {"walletAddress": "a"}}
+        self.assertFalse(rules.check_auto_escalation(event))
+
+        graph = TransactionGraph()
+        graph.add_transfer("bad", "a", 100, 0)
+        graph.add_transfer("a", "b", 10, 1)
+        graph.add_transfer("x", "y", 100, 2)
+        scores = WalletRiskScores(graph)
+        scores.add_event(flagged("bad", 100, "freeze"))
+        scores.refresh()
+        rules.wallet_risk = scores
+        self.assertGreater(scores.propagated_score("a"), scores.propagated_score("b"))
+        self.assertTrue(rules.check_auto_escalation(event))
+        self.assertTrue(rules.check_auto_escalation(dict(event, metadata={"walletAddress": "bad"})))
+        self.assertFalse(rules.check_auto_escalation(dict(event, metadata={"walletAddress": "b"})))
+        self.assertFalse(rules.check_auto_escalation(dict(event, metadata={"walletAddress": "x"})))
+
+    def test_sole_counterparty_escalates(self):
+        """Test that the sole counterparty of a wallet flagged at the flag score reaches the propagated threshold."""
+        graph = TransactionGraph()
+        graph.add_transfer("bad", "a", 100, 0)
+        scores = WalletRiskScores(graph)
+        scores.add_event(flagged("bad", scores.flag_score))
+        scores.refresh()
+        rules = OrchestrationRules(DEFAULT_RULES_FILE)
+        rules.wallet_risk = scores
+        self.assertAlmostEqual(scores.propagated_score("a"), rules.propagated_risk_threshold, places=3)
+        self.assertTrue(rules.wallet_risk_exceeded({"metadata": {"walletAddress": "a"}}))
+
+    def test_wallet_risk_endpoint(self):
+        """Test the wallet risk endpoint."""
+        core_events.transaction_graph.add_transfer("0xrisk-bad", "0xrisk-peer", 10, 1700000000)
+        core_events.wallet_risk.add_event(flagged("0xrisk-bad", 100))
+        core_events.wallet_risk.refresh()
+        client = TestClient(core_events.app)
+
+        response = client.get("/core/wallet/0xrisk-bad/risk")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["flagScore"], 100)
+        peer = client.get("/core/wallet/0xrisk-peer/risk").json()
+        self.assertGreater(peer["riskScore"], 0)
+        self.assertEqual(peer["flagScore"], 0)
+        self.assertEqual(client.get("/core/wallet/0xrisk-missing/risk").status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
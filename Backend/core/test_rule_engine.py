@@ -0,0 +1,140 @@
+"""
+Test suite for the declarative rule engine
+"""
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from core.orchestration.rule_engine import RuleEngine, RulePlan, load_rule_definitions
+from core.orchestration.rules import DEFAULT_RULES_FILE
+from core.storage.event_store import get_field
+
+RULES = {"rules": [
+    {"id": "risk", "condition": {"field": "riskScore", "operator": ">=", "value": 80}, "action": "escalate"},
+    {"id": "value", "condition": {"field": "metadata.amount", "operator": ">=", "value": 10000,
+                                  "per": "metadata.currency", "limits": {"EUR": 9000, "JPY": 1500000}},
+     "action": "escalate"},
+    {"id": "freeze", "condition": {"field": "actionSuggested", "operator": "==", "value": "freeze"},
+     "additional_condition": {"field": "riskScore", "operator": ">=", "value": 70}, "action": "multisig_freeze"},
+    {"id": "low", "conditions": [{"field": "riskScore", "operator": "<", "value": 20},
+                                 {"field": "source", "operator": "not_in", "value": ["ml", "manual"]}],
+     "action": "review"},
+    {"id": "mid", "conditions": [{"field": "riskScore", "operator": ">", "value": 40},
+                                 {"field": "riskScore", "operator": "<=", "value": 60},
+                                 {"field": "actionSuggested", "operator": "in", "value": ["review", "escalate"]}],
+     "action": "review"},
+    {"id": "no-wallet", "condition": {"field": "metadata.walletAddress", "operator": "exists", "value": False},
+     "additional_condition": {"field": "actionSuggested", "operator": "!=", "value": "approve"},
+     "action": "flag"},
+    {"id": "disabled", "condition": {"field": "riskScore", "operator": ">=", "value": 0},
+     "action": "never", "enabled": False},
+    {"id": "risk-copy", "condition": {"field": "riskScore", "operator": ">=", "value": 80}, "action": "notify"}
+]}
+
+def naive_match(rules, event):
+    """Reference interpretation of the rule definitions, one condition at a time."""
+    def holds(condition):
+        value = get_field(event, condition["field"])
+        operator = condition["operator"]
+        target = condition.get("value", True)
+        if operator == "exists":
+            return (value is not None) == target
+        if operator in ("==", "!="):
+            return (value == target) == (operator == "==")
+        if operator in ("in", "not_in"):
+            return (value in target) == (operator == "in")
+        if condition.get("per"):
+            target = condition.get("limits", {}).get(get_field(event, condition["per"]), target)
+        if type(value) not in (int, float):
+            return False
+        return {">": value > target, ">=": value >= target, "<": value < target, "<=": value <= target}[operator]
+
+    matched = []
+    for rule in rules["rules"]:
+        conditions = [rule[k] for k in ("condition", "additional_condition") if k in rule] + rule.get("conditions", [])
+        if rule.get("enabled", True) and all(holds(c) for c in conditions):
+            matched.append(rule["id"])
+    return matched
+
+def random_events(count, seed=5):
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        metadata = rng.choice([None, {}, {"walletAddress": "0xabc", "amount": rng.choice([0, 9000, 9500, 10000, 2e6]),
+                                          "currency": rng.choice(["USD", "EUR", "JPY", None])}])
+        event = {
+            "riskScore": rng.choice([0, 19.5, 20, 40, 41, 60, 70, 79.9, 80, 100, None, "high"]),
+            "actionSuggested": rng.choice(["approve", "reject", "escalate", "review", "freeze"]),
+            "source": rng.choice(["ml", "manual", "import", None]),
+            "metadata": metadata
+        }
+        events.append({k: v for k, v in event.items() if v is not None or rng.random() < 0.5})
+    return events
+
+class TestRuleEngine(unittest.TestCase):
+    def test_compiled_plan_matches_reference(self):
+        """Test that the compiled plan matches a condition-by-condition interpretation."""
+        plan = RulePlan(RULES)
+        for event in random_events(2000):
+            self.assertEqual([rule.id for rule in plan.match(event)], naive_match(RULES, event), event)
+
+    def test_batch_matches_scalar(self):
+        """Test that vectorized evaluation agrees with per-event evaluation."""
+        plan = RulePlan(RULES)
+        events = random_events(500)
+        batch = plan.evaluate_batch(events)
+        for i, event in enumerate(events):
+            actions = {rule.action for rule in plan.match(event)}
+            self.assertEqual({action for action, matched in batch.items() if matched[i]}, actions)
+
+    def test_shared_conditions_are_compiled_once(self):
+        """Test that identical conditions in different rules become one predicate."""
+        plan = RulePlan(RULES)
+        keys = [(field, operator, value) for field, operator, value, _, _ in plan.predicates]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(keys.count(("riskScore", ">=", 80.0)), 1)
+        self.assertNotIn("never", plan.actions)
+
+    def test_sample_rules_keep_default_behaviour(self):
+        """Test that the shipped rule file reproduces the original thresholds."""
+        plan = RulePlan(load_rule_definitions(DEFAULT_RULES_FILE))
+        for event in random_events(1000):
+            actions = {rule.action for rule in plan.match(event)}
+            risk = event.get("riskScore")
+            risk = risk if type(risk) in (int, float) else None
+            amount = (event.get("metadata") or {}).get("amount")
+            self.assertEqual("escalate" in actions,
+                             (risk is not None and risk >= 80) or (amount is not None and amount >= 10000))
+            self.assertEqual("multisig_freeze" in actions,
+                             event["actionSuggested"] == "freeze" and risk is not None and risk >= 70)
+
+    def test_rules_reload_when_file_changes(self):
+        """Test hot reload, and that a broken file keeps the current rules."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.json")
+            with open(path, "w") as f:
+                json.dump({"rules": RULES["rules"][:1]}, f)
+            engine = RuleEngine(path, check_interval=0)
+            self.assertEqual(engine.actions({"riskScore": 90}), {"escalate"})
+
+            with open(path, "w") as f:
+                json.dump({"rules": [dict(RULES["rules"][0], action="notify")]}, f)
+            os.utime(path, ns=(1, 1))
+            self.assertEqual(engine.actions({"riskScore": 90}), {"notify"})
+
+            with open(path, "w") as f:
+                f.write("{not json")
+            os.utime(path, ns=(2, 2))
+            self.assertEqual(engine.actions({"riskScore": 90}), {"notify"})
+
+    def test_invalid_definitions_are_rejected(self):
+        """Test that malformed rules fail to compile."""
+        with self.assertRaises(ValueError):
+            RulePlan({"rules": [{"id": "x", "action": "a", "condition": {"field": "f", "operator": "~"}}]})
+        with self.assertRaises(ValueError):
+            RulePlan({"rules": [{"id": "x", "condition": {"field": "f", "operator": "=="}}]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Test suite for the sharded orchestrator, checked against the single-process orchestrator
+"""
+import collections
+import random
+import threading
+import unittest
+
+from core.orchestration.core_orchestrator import CoreOrchestrator
+from core.orchestration.risk_propagation import WalletRiskScores
+from core.orchestration.rules import orchestration_rules
+from core.orchestration.sharded_orchestrator import ConsistentHashRing, ShardedOrchestrator
+from core.orchestration.transaction_graph import TransactionGraph
+
+def normalize(result):
+    """Drop timestamps and order alerts so results from both orchestrators compare equal."""
+    actions = [{k: v for k, v in action.items() if k != "timestamp"} for action in result["actionsTriggered"]]
+    return {
+        "coreEventId": result["coreEventId"],
+        "status": result["status"],
+        "actionsTriggered": actions,
+        "crossCaseAlerts": result["crossCaseAlerts"]
+    }
+
+class TestConsistentHashRing(unittest.TestCase):
+    def test_keys_spread_and_move_little(self):
+        """Test that keys are spread over shards and adding a shard moves only a fraction."""
+        keys = [f"case-{i}" for i in range(2000)]
+        ring = ConsistentHashRing(4)
+        owners = [ring.shard_for(key) for key in keys]
+        self.assertEqual(set(owners), {0, 1, 2, 3})
+
+        grown = ConsistentHashRing(5)
+        moved = sum(1 for key, owner in zip(keys, owners) if grown.shard_for(key) != owner)
+        self.assertLess(moved, len(keys) * 0.35)
+
+class TestShardedOrchestrator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sharded = ShardedOrchestrator(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded.shutdown()
+
+    def make_events(self, count):
+        rng = random.Random(9)
+        return [{
+            "coreEventId": f"event-{i}",
+            "caseId": f"case-{rng.randrange(40)}",
+            "evidenceId": f"evidence-{i}",
+            "riskScore": rng.randrange(101),
+            "actionSuggested": rng.choice(["approve", "escalate", "freeze"]),
+            "metadata": {"walletAddress": f"0x{rng.randrange(25)}", "amount": rng.randrange(20000)}
+        } for i in range(count)]
+
+    def test_matches_single_process_orchestrator(self):
+        """Test that sharded results equal sequential single-process results."""
+        events = self.make_events(300)
+        single = CoreOrchestrator()
+        expected = [normalize(single.process_event(dict(event))) for event in events]
+
+        half = len(events) // 2
+        results = [self.sharded.process_event(dict(event)) for event in events[:half]]
+        results += self.sharded.process_events([dict(event) for event in events[half:]])
+
+        self.assertEqual([normalize(result) for result in results], expected)
+        self.assertEqual(
+            sorted(a["walletAddress"] for a in self.sharded.get_cross_case_alerts()),
+            sorted(a["walletAddress"] for a in single.wallet_index.get_alerts())
+        )
+
+    def test_concurrent_batches(self):
+        """Test that batches from several consumer threads leave the parent's cluster index consistent."""
+        events = self.make_events(200)
+        single = CoreOrchestrator()
+        for event in events:
+            single.process_event(dict(event))
+
+        sharded = ShardedOrchestrator(2)
+        self.addCleanup(sharded.shutdown)
+        errors = []
+        def consume(part):
+            try:
+                for start in range(0, len(part), 10):
+                    sharded.process_events([dict(event) for event in part[start:start + 10]])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=consume, args=(events[i::4],)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        for event in events:
+            case_id = event["caseId"]
+            self.assertEqual(sorted(sharded.get_cluster(case_id=case_id)["caseIds"]),
+                             sorted(single.get_cluster(case_id=case_id)["caseIds"]))
+
+    def test_wallet_risk_escalates_sharded_events(self):
+        """Test that wallet risk, held only by the parent, escalates events processed on shards."""
+        graph = TransactionGraph()
+        graph.add_transfer("0xflagged", "0xpeer", 100, 0)
+        scores = WalletRiskScores(graph)
+        scores.add_event({"riskScore": 100, "actionSuggested": "freeze", "metadata": {"walletAddress": "0xflagged"}})
+        scores.refresh()
+        event = {"coreEventId": "risk-event", "caseId": "risk-case", "evidenceId": "risk-evidence",
+                 "riskScore": 10, "actionSuggested": "approve", "metadata": {"walletAddress": "0xpeer", "amount": 5}}
+
+        original = orchestration_rules.wallet_risk
+        orchestration_rules.wallet_risk = scores
+        try:
+            expected = normalize(CoreOrchestrator().process_event(dict(event)))
+            result = normalize(self.sharded.process_event(dict(event)))
+        finally:
+            orchestration_rules.wallet_risk = original
+        self.assertEqual(result["actionsTriggered"][0]["action"], "auto_escalation")
+        self.assertEqual(result, expected)
+
+    def test_wallet_windows_use_event_time(self):
+        """Test that shards window historical events by their timestamps, with the event's metadata."""
+        daily = [{"coreEventId": f"daily-{day}", "caseId": f"daily-case-{day}", "evidenceId": f"daily-{day}",
+                  "riskScore": 10, "actionSuggested": "approve", "timestamp": f"2024-01-{day + 1:02d}T12:00:00",
+                  "metadata": {"walletAddress": "0xdaily", "amount": 100}} for day in range(12)]
+        near = [{"coreEventId": f"near-{i}", "caseId": f"near-case-{i}", "evidenceId": f"near-{i}",
+                 "riskScore": 10, "actionSuggested": "approve", "timestamp": f"2024-02-01T12:0{i}:00",
+                 "metadata": {"walletAddress": "0xnear", "amount": 9500, "currency": "USD"}} for i in range(3)]
+        events = daily + near
+
+        def alert_types(results):
+            return collections.Counter((a["type"], a.get("walletAddress")) for r in results for a in r["crossCaseAlerts"])
+
+        single = CoreOrchestrator()
+        expected = alert_types(single.process_event(dict(event)) for event in events)
+        self.assertEqual(expected[("velocity", "0xdaily")], 0)
+        self.assertEqual(expected[("structuring", "0xnear")], 1)
+        self.assertEqual(alert_types(self.sharded.process_events([dict(event) for event in events])), expected)
+
+    def test_event_status_is_found_on_its_shard(self):
+        """Test that stored events can be looked up with and without the case ID."""
+        event = self.make_events(1)[0]
+        event["coreEventId"] = "status-event"
+        event["metadata"]["walletAddress"] = "0xstatus"
+        event["caseId"] = "status-case"
+        self.sharded.process_event(dict(event))
+        self.assertEqual(self.sharded.get_event_status("status-event", event["caseId"])["status"], "processed")
+        self.assertEqual(self.sharded.get_event_status("status-event")["status"], "processed")
+        self.assertEqual(self.sharded.get_event_status("missing")["status"], "not_found")
+
+if __name__ == "__main__":
+    unittest.main()
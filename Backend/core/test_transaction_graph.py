@@ -0,0 +1,141 @@
+"""
+Test suite for CSR transaction graph fund-flow traces
+"""
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.orchestration.risk_propagation import WalletRiskScores
+from core.orchestration.transaction_graph import TransactionGraph
+
+def graph_of(transfers, compact=True):
+    graph = TransactionGraph()
+    for sender, receiver, amount, timestamp in transfers:
+        graph.add_transfer(sender, receiver, amount, timestamp)
+    if compact:
+        graph.compact()
+    return graph
+
+def transfer_keys(trace):
+    return sorted((t["from"], t["to"], t["timestamp"]) for t in trace["transfers"])
+
+class TestTransactionGraph(unittest.TestCase):
+    def test_trace_respects_time_order(self):
+        """Test that a transfer is followed only after funds reached its sender."""
+        graph = graph_of([
+            ("a", "b", 10, 100),
+            ("b", "c", 5, 200),
+            ("b", "d", 5, 50),   # before funds reached b
+            ("c", "e", 1, 300)
+        ])
+        trace = graph.trace("a", max_hops=3)
+        self.assertEqual(transfer_keys(trace), [("a", "b", 100), ("b", "c", 200), ("c", "e", 300)])
+        hops = {wallet["address"]: wallet["hop"] for wallet in trace["wallets"]}
+        self.assertEqual(hops, {"b": 1, "c": 2, "e": 3})
+        self.assertFalse(trace["truncated"])
+
+        self.assertEqual(len(graph.trace("a", max_hops=1)["transfers"]), 1)
+        self.assertIsNone(graph.trace("unknown"))
+
+    def test_amount_and_window_filters(self):
+        """Test the minimum amount and time window of a trace."""
+        graph = graph_of([
+            ("a", "b", 10, 1000),
+            ("a", "c", 1, 1100),
+            ("b", "d", 10, 1000 + 7200)
+        ])
+        self.assertEqual(transfer_keys(graph.trace("a", min_amount=5)), [("a", "b", 1000), ("b", "d", 8200)])
+
+        # The window starts at a's first transfer when no start time is given
+        trace = graph.trace("a", window_seconds=3600)
+        self.assertEqual(trace["startTime"], 1000)
+        self.assertEqual(transfer_keys(trace), [("a", "b", 1000), ("a", "c", 1100)])
+        self.assertEqual(transfer_keys(graph.trace("a", start_time=1050)), [("a", "c", 1100)])
+
+    def test_limit_truncates(self):
+        """Test that the transfer limit cuts a trace short and says so."""
+        graph = graph_of([("hub", f"w{i}", 1, i) for i in range(50)])
+        trace = graph.trace("hub", limit=10)
+        self.assertEqual(len(trace["transfers"]), 10)
+        self.assertTrue(trace["truncated"])
+
+    def test_pending_transfers_match_compacted(self):
+        """Test that buffered and compacted transfers give the same traces."""
+        rng = random.Random(7)
+        transfers = [(f"w{rng.randrange(40)}", f"w{rng.randrange(40)}", rng.randrange(1, 100), rng.randrange(10000))
+                     for _ in range(400)]
+        # Half compacted, half still buffered
+        mixed = graph_of(transfers[:200])
+        for transfer in transfers[200:]:
+            mixed.add_transfer(*transfer)
+        self.assertEqual(mixed.pending_count, 200)
+        compacted = graph_of(transfers)
+        self.assertEqual(compacted.pending_count, 0)
+        self.assertEqual(compacted.edge_count(), 400)
+
+        for wallet in ("w0", "w5", "w17"):
+            for min_amount in (0, 50):
+                self.assertEqual(transfer_keys(mixed.trace(wallet, max_hops=4, min_amount=min_amount)),
+                                 transfer_keys(compacted.trace(wallet, max_hops=4, min_amount=min_amount)))
+
+    def test_add_transactions_and_events(self):
+        """Test loading export records and case events."""
+        graph = TransactionGraph()
+        tx_hash = "ab" * 32
+        added = graph.add_transactions([
+            {"from_address": "x", "to_address": "y", "amount": 3, "timestamp": 10, "tx_hash": tx_hash},
+            {"from_address": "x", "amount": 3, "timestamp": 10}
+        ])
+        self.assertEqual(added, 1)
+        self.assertTrue(graph.add_event({"timestamp": "2025-01-01T00:00:00Z", "txHash": "0x" + "cd" * 32,
+                                         "metadata": {"walletAddress": "y", "toAddress": "z", "amount": 2}}))
+        self.assertFalse(graph.add_event({"metadata": {"walletAddress": "y"}}))
+
+        trace = graph.trace("x")
+        self.assertEqual([t["txHash"] for t in trace["transfers"]], [tx_hash, "cd" * 32])
+
+class TestTraceEndpoint(unittest.TestCase):
+    def test_stored_transfers_replayed_at_startup(self):
+        """Test that processed events, bulk imports included, rebuild their transfers after a restart."""
+        exported = "ab" * 32
+        graph = TransactionGraph()
+        graph.add_transactions([{"from_address": "a", "to_address": "b", "amount": 5, "timestamp": 10,
+                                 "tx_hash": exported}])
+        stored = [
+            {"status": "processed", "txHash": "0x" + "cd" * 32, "timestamp": "2025-01-01T00:00:00",
+             "riskScore": 90, "actionSuggested": "review", "metadata": {"walletAddress": "b", "toAddress": "c"}},
+            {"status": "processed", "txHash": exported.upper(), "timestamp": 10, "source": "bulk_import",
+             "metadata": {"walletAddress": "a", "toAddress": "b", "amount": 5}},
+            {"status": "queued", "timestamp": 20, "metadata": {"walletAddress": "c", "toAddress": "d"}}
+        ]
+        risk = WalletRiskScores(graph)
+        added = core_events.replay_stored_events(graph, risk, stored, {exported})
+        self.assertEqual(added, 1)
+        self.assertEqual(graph.edge_count(), 2)
+        self.assertEqual([w["address"] for w in graph.trace("a")["wallets"]], ["b", "c"])
+        self.assertEqual(risk.flag("b"), 90)
+
+
+    def test_trace_endpoint(self):
+        """Test the wallet trace endpoint and its parameter checks."""
+        core_events.transaction_graph.add_transfer("0xtrace-a", "0xtrace-b", 40, 1700000000)
+        core_events.transaction_graph.add_transfer("0xtrace-b", "0xtrace-c", 20, 1700000600)
+        client = TestClient(core_events.app)
+
+        response = client.get("/core/wallet/0xtrace-a/trace", params={"hops": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([w["address"] for w in response.json()["wallets"]], ["0xtrace-b", "0xtrace-c"])
+        response = client.get("/core/wallet/0xtrace-a/trace", params={"min_amount": 30})
+        self.assertEqual(len(response.json()["transfers"]), 1)
+        response = client.get("/core/wallet/0xtrace-a/trace", params={"since": "2023-11-14T22:20:00Z"})
+        self.assertEqual(response.json()["startTime"], 1700000400)
+        self.assertEqual(len(response.json()["transfers"]), 0)
+
+        self.assertEqual(client.get("/core/wallet/0xtrace-a/trace", params={"since": "soon"}).status_code, 400)
+        self.assertEqual(client.get("/core/wallet/0xtrace-a/trace", params={"hops": 0}).status_code, 422)
+        self.assertEqual(client.get("/core/wallet/0xmissing/trace").status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
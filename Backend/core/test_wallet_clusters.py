@@ -0,0 +1,140 @@
+"""
+Test suite for union-find wallet and case clusters
+"""
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.orchestration.core_orchestrator import CoreOrchestrator
+from core.orchestration.wallet_clusters import WalletClusterIndex
+
+def event(case_id, wallet, to_address=None):
+    return {"caseId": case_id, "metadata": {"walletAddress": wallet, "toAddress": to_address}}
+
+class TestWalletClusterIndex(unittest.TestCase):
+    def test_transfer_chain_links_cases(self):
+        """Test that cases are linked through a chain of transfers and the merge is alerted."""
+        index = WalletClusterIndex()
+        self.assertEqual(index.add_event(event("case-a", "w1", "w2")), [])
+        self.assertEqual(index.add_event(event("case-b", "w3")), [])
+        self.assertFalse(index.same_cluster("case-a", "case-b"))
+
+        alerts = index.add_transaction("w2", "w3")
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]["type"], "wallet_cluster")
+        self.assertEqual(sorted(alerts[0]["caseIds"]), ["case-a", "case-b"])
+        self.assertEqual(alerts[0]["walletCount"], 3)
+        self.assertTrue(index.same_cluster("case-a", "case-b"))
+        self.assertEqual(index.get_cluster(wallet_address="w3")["caseCount"], 2)
+        self.assertIsNone(index.get_cluster(case_id="case-z"))
+
+        # Linking wallets already in the cluster does not alert again
+        self.assertEqual(index.add_transaction("w1", "w3"), [])
+
+    def test_shared_wallet_left_to_duplicate_wallet_alert(self):
+        """Test that a wallet used directly by two cases merges them without a cluster alert."""
+        index = WalletClusterIndex()
+        index.add_event(event("case-a", "w1"))
+        self.assertEqual(index.add_event(event("case-b", "w1")), [])
+        self.assertTrue(index.same_cluster("case-a", "case-b"))
+        self.assertEqual(index.merges, 1)
+
+    def test_clusters_match_connected_components(self):
+        """Test that clusters equal the connected components of the link graph."""
+        rng = random.Random(7)
+        index = WalletClusterIndex()
+        edges = {}
+        for i in range(3000):
+            case_id, wallet, to_address = f"c{rng.randrange(800)}", f"w{rng.randrange(1500)}", None
+            if rng.random() < 0.5:
+                to_address = f"w{rng.randrange(1500)}"
+            index.add_event(event(case_id, wallet, to_address))
+            for a, b in ((case_id, wallet), (wallet, to_address)):
+                if b is not None:
+                    edges.setdefault(a, set()).add(b)
+                    edges.setdefault(b, set()).add(a)
+
+        seen = set()
+        for start in edges:
+            if start in seen:
+                continue
+            component, stack = set(), [start]
+            while stack:
+                node = stack.pop()
+                if node not in component:
+                    component.add(node)
+                    stack.extend(edges[node] - component)
+            seen |= component
+            cases = sorted(n for n in component if n.startswith("c"))
+            wallets = [n for n in component if n.startswith("w")]
+            cluster = index.get_cluster(wallet_address=wallets[0], limit=len(cases))
+            self.assertEqual(sorted(cluster["caseIds"]), cases)
+            self.assertEqual(cluster["walletCount"], len(wallets))
+
+    def test_chain_transactions_link_without_alerts(self):
+        """Test that raw transaction records link wallets, silently, and skip incomplete records."""
+        index = WalletClusterIndex()
+        index.add_event(event("case-a", "w1"))
+        index.add_event(event("case-b", "w9"))
+        linked = index.add_transactions([
+            {"from_address": "w1", "to_address": "w5"},
+            {"from_address": "w5", "to_address": "w9"},
+            {"from_address": "w7", "to_address": "w7"},
+            {"from_address": "w8"}
+        ])
+        self.assertEqual(linked, 2)
+        self.assertTrue(index.same_cluster("case-a", "case-b"))
+        self.assertEqual(index.get_cluster(wallet_address="w5")["walletCount"], 3)
+
+    def test_case_ids_are_paged(self):
+        """Test that cluster lookups return the full count with one page of case IDs."""
+        index = WalletClusterIndex()
+        for i in range(250):
+            index.add_event(event(f"case-{i}", "shared"))
+        cluster = index.get_cluster(wallet_address="shared")
+        self.assertEqual((cluster["caseCount"], len(cluster["caseIds"]), cluster["offset"]), (250, 100, 0))
+        pages = [index.get_cluster(case_id="case-0", offset=offset, limit=100)["caseIds"] for offset in (0, 100, 200)]
+        self.assertEqual(sorted(case_id for page in pages for case_id in page), sorted(f"case-{i}" for i in range(250)))
+        self.assertEqual(index.get_cluster(case_id="case-0", offset=300)["caseIds"], [])
+
+class TestOrchestratorClusters(unittest.TestCase):
+    def test_process_event_returns_cluster_alert(self):
+        """Test that orchestrated events link clusters and return their alerts."""
+        orchestrator = CoreOrchestrator()
+        orchestrator.process_event({"caseId": "case-a", "riskScore": 10,
+                                    "metadata": {"walletAddress": "0xa", "toAddress": "0xmid"}})
+        result = orchestrator.process_event({"caseId": "case-b", "riskScore": 10,
+                                             "metadata": {"walletAddress": "0xb", "toAddress": "0xmid"}})
+        cluster_alerts = [a for a in result["crossCaseAlerts"] if a["type"] == "wallet_cluster"]
+        self.assertEqual(len(cluster_alerts), 1)
+        self.assertEqual(sorted(orchestrator.get_cluster(case_id="case-a")["caseIds"]), ["case-a", "case-b"])
+
+    def test_cluster_endpoints(self):
+        """Test the case and wallet cluster endpoints."""
+        core_events.orchestrator.process_event({"caseId": "case-cluster-1", "riskScore": 10,
+                                                "metadata": {"walletAddress": "0xcluster", "toAddress": "0xpeer"}})
+        client = TestClient(core_events.app)
+        response = client.get("/core/wallet/0xpeer/cluster")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("case-cluster-1", response.json()["caseIds"])
+        self.assertEqual(client.get("/core/case/case-cluster-1/cluster").json()["walletCount"], 2)
+        self.assertEqual(client.get("/core/case/missing-case/cluster").status_code, 404)
+
+        core_events.orchestrator.process_event({"caseId": "case-cluster-2", "riskScore": 10,
+                                                "metadata": {"walletAddress": "0xpeer"}})
+        page = client.get("/core/wallet/0xpeer/cluster?offset=1&limit=1").json()
+        self.assertEqual((page["caseCount"], len(page["caseIds"]), page["offset"]), (2, 1, 1))
+        self.assertEqual(client.get("/core/wallet/0xpeer/cluster?limit=0").status_code, 422)
+
+    def test_chain_export_linked_at_startup(self):
+        """Test that the chain export loaded by the core events service links its wallets."""
+        for record in core_events.chain_transactions:
+            if record.get("from_address") and record.get("to_address"):
+                cluster = core_events.orchestrator.get_cluster(wallet_address=record["from_address"])
+                self.assertEqual(cluster["clusterId"],
+                                 core_events.orchestrator.get_cluster(wallet_address=record["to_address"])["clusterId"])
+
+if __name__ == "__main__":
+    unittest.main()
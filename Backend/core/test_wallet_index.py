@@ -0,0 +1,79 @@
+"""
+Differential tests for the incremental wallet index against the full-scan rules
+"""
+import random
+import unittest
+
+from core.orchestration.core_orchestrator import CoreOrchestrator
+from core.orchestration.alert_suppression import AlertSuppressor
+from core.orchestration.rules import detect_duplicate_wallets
+
+class TestWalletCaseIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh orchestrator and a deterministic event stream."""
+        # Suppression off so every event returns its wallet's current alert
+        self.orchestrator = CoreOrchestrator(alert_suppressor=AlertSuppressor(window_seconds=0))
+        rng = random.Random(42)
+        wallets = [f"0xwallet{i}" for i in range(25)]
+        self.events = []
+        for i in range(400):
+            metadata = {"amount": rng.randint(1, 20000), "currency": "USD"}
+            if rng.random() < 0.8:
+                metadata["walletAddress"] = rng.choice(wallets)
+            self.events.append({
+                "caseId": f"case-{rng.randint(0, 60)}",
+                "evidenceId": f"evidence-{i}",
+                "riskScore": rng.uniform(0, 100),
+                "actionSuggested": rng.choice(["approve", "escalate", "freeze"]),
+                "metadata": metadata if rng.random() < 0.95 else None
+            })
+
+    def test_incremental_alerts_match_full_scan(self):
+        """Each event's alerts match the full-scan alert for its wallet."""
+        for event in self.events:
+            result = self.orchestrator.process_event(dict(event))
+            self.assertEqual(result["status"], "processed")
+
+            full_scan = {
+                alert["walletAddress"]: alert
+                for alert in detect_duplicate_wallets(list(self.orchestrator.events_storage.values()))
+            }
+            wallet = (event["metadata"] or {}).get("walletAddress")
+            expected = [full_scan[wallet]] if wallet in full_scan else []
+            duplicate_alerts = [a for a in result["crossCaseAlerts"] if a["type"] == "duplicate_wallet"]
+            self.assertEqual(duplicate_alerts, expected)
+
+    def test_index_alerts_match_full_scan(self):
+        """The index as a whole reproduces the full-scan alert list."""
+        for event in self.events:
+            self.orchestrator.process_event(dict(event))
+
+        self.assertEqual(
+            self.orchestrator.wallet_index.get_alerts(),
+            detect_duplicate_wallets(list(self.orchestrator.events_storage.values()))
+        )
+
+    def test_reprocessed_event_moves_wallet(self):
+        """Reprocessing an event with a new wallet drops it from the old one."""
+        first = self.orchestrator.process_event({
+            "coreEventId": "evt-1", "caseId": "case-a", "riskScore": 10,
+            "metadata": {"walletAddress": "0xold"}
+        })
+        self.orchestrator.process_event({
+            "coreEventId": "evt-2", "caseId": "case-b", "riskScore": 10,
+            "metadata": {"walletAddress": "0xold"}
+        })
+        self.orchestrator.process_event({
+            "coreEventId": first["coreEventId"], "caseId": "case-a", "riskScore": 10,
+            "metadata": {"walletAddress": "0xnew"}
+        })
+
+        self.assertEqual(self.orchestrator.wallet_index.get_case_ids("0xold"), ["case-b"])
+        self.assertEqual(self.orchestrator.wallet_index.get_case_ids("0xnew"), ["case-a"])
+        self.assertEqual(
+            self.orchestrator.wallet_index.get_alerts(),
+            detect_duplicate_wallets(list(self.orchestrator.events_storage.values()))
+        )
+
+if __name__ == "__main__":
+    unittest.main()
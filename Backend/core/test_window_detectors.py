@@ -0,0 +1,120 @@
+"""
+Test suite for the sliding-window velocity, volume and structuring detectors
+"""
+import random
+import unittest
+
+from core.orchestration.rule_engine import load_rule_definitions
+from core.orchestration.rules import OrchestrationRules, DEFAULT_RULES_FILE
+from core.orchestration.window_detectors import WindowDetectors
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def event(case_id, wallet=None, amount=None):
+    metadata = {"walletAddress": wallet} if wallet else {}
+    if amount is not None:
+        metadata["amount"] = amount
+    return {"caseId": case_id, "metadata": metadata}
+
+class TestWindowDetectors(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.detectors = WindowDetectors(window_seconds=60, buckets=6, velocity_limit=3, volume_limit=1000,
+                                         structuring_threshold=100, structuring_margin=0.1, structuring_limit=2,
+                                         clock=self.clock)
+
+    def test_velocity_alert_expires_with_window(self):
+        """Test that a burst raises velocity alerts that stop once the window has passed."""
+        alerts = [self.detectors.add_event(event(f"case-{i}", "0xfast")) for i in range(3)]
+        self.assertEqual(alerts[:2], [[], []])
+        self.assertEqual([a["type"] for a in alerts[2]], ["velocity"])
+        self.assertEqual(alerts[2][0]["walletAddress"], "0xfast")
+        self.assertEqual(alerts[2][0]["caseIds"], ["case-0", "case-1", "case-2"])
+        self.assertEqual(alerts[2][0]["count"], 3)
+
+        self.clock.now += 61
+        self.assertEqual(self.detectors.add_event(event("case-3", "0xfast")), [])
+
+    def test_structuring_counts_amounts_just_under_threshold(self):
+        """Test that only amounts within the margin below the threshold count as structuring."""
+        self.assertEqual(self.detectors.add_event(event("case-s", amount=95)), [])
+        self.assertEqual(self.detectors.add_event(event("case-s", amount=100)), [])
+        self.assertEqual(self.detectors.add_event(event("case-t", amount=80)), [])
+        alerts = self.detectors.add_event(event("case-s", amount=90))
+        self.assertEqual([(a["type"], a["scope"], a["count"]) for a in alerts],
+                         [("velocity", "case", 3), ("structuring", "case", 2)])
+        self.assertIsNone(alerts[0]["walletAddress"])
+
+    def test_window_aggregates_match_brute_force(self):
+        """Test the bucketed running totals against a recount of the events in the window."""
+        rng = random.Random(3)
+        history = {}
+        for _ in range(3000):
+            self.clock.now += rng.expovariate(1 / 4)
+            wallet = f"0x{rng.randrange(5)}"
+            amount = rng.choice([10, 91, 99, 150, 400])
+            self.detectors.add_event(event("case", wallet, amount), include_wallet=True)
+
+            bucket = int(self.clock.now // self.detectors.bucket_width)
+            history.setdefault(wallet, []).append((bucket, amount))
+            in_window = [a for b, a in history[wallet] if b > bucket - self.detectors.buckets]
+            window = self.detectors.windows["wallet"][wallet]
+            self.assertEqual(window.count, len(in_window))
+            self.assertAlmostEqual(window.total, sum(in_window))
+            self.assertEqual(window.near, sum(1 for a in in_window if 90 <= a < 100))
+
+    def test_structuring_threshold_follows_rules(self):
+        """Test that the default structuring threshold is the high_value_transfer rule's, per currency."""
+        definitions = load_rule_definitions(DEFAULT_RULES_FILE)
+        for rule in definitions["rules"]:
+            if rule["id"] == "high_value_transfer":
+                rule["condition"].update(value=500, per="metadata.currency", limits={"EUR": 400})
+        rules = OrchestrationRules(definitions=definitions)
+
+        def structuring(amount, currency=None, rules=rules):
+            data = event("case-r", amount=amount)
+            if currency:
+                data["metadata"]["currency"] = currency
+            detectors = WindowDetectors(structuring_limit=1, clock=self.clock, rules=rules)
+            return [a["type"] for a in detectors.add_event(data)] == ["structuring"]
+
+        self.assertTrue(structuring(9500, rules=OrchestrationRules()))
+        self.assertFalse(structuring(9500))
+        self.assertTrue(structuring(480))
+        self.assertFalse(structuring(380))
+        self.assertTrue(structuring(380, "EUR"))
+
+    def test_backfill_windows_on_event_time(self):
+        """Test that historical events are windowed by their own timestamps, not arrival time."""
+        spread = [dict(event(f"case-{i}", "0xold"), timestamp=1_600_000_000 + 30 * i) for i in range(30)]
+        self.assertEqual([a for e in spread for a in self.detectors.add_event(e)], [])
+
+        iso = [dict(event("case-iso", "0xiso"), timestamp=f"2020-09-13T12:{5 * i:02d}:00Z") for i in range(3)]
+        self.assertEqual([a for e in iso for a in self.detectors.add_event(e)], [])
+        burst = [dict(event("case-iso", "0xiso"), timestamp="2020-09-13T13:00:00Z") for _ in range(3)]
+        self.assertEqual([a["type"] for a in self.detectors.add_event(burst[0]) + self.detectors.add_event(burst[1])
+                          + self.detectors.add_event(burst[2])], ["velocity", "velocity"])
+
+    def test_idle_and_excess_keys_are_evicted(self):
+        """Test TTL eviction of idle keys and the max_keys bound."""
+        for i in range(5):
+            self.detectors.add_event(event(f"case-{i}", f"0x{i}"))
+        self.assertEqual(len(self.detectors), 10)
+
+        self.clock.now += 120
+        self.detectors.add_event(event("case-new", "0xnew"))
+        self.assertEqual(list(self.detectors.windows["wallet"]), ["0xnew"])
+        self.assertEqual(list(self.detectors.windows["case"]), ["case-new"])
+
+        bounded = WindowDetectors(max_keys=3, clock=self.clock)
+        for i in range(10):
+            bounded.add_event(event(f"case-{i}"))
+        self.assertEqual(list(bounded.windows["case"]), ["case-7", "case-8", "case-9"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Test suite for queued orchestration of accepted core events
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.events import core_events
+from core.events.work_queue import EventWorkQueue
+from core.storage.event_record import EventRecord
+from core.storage.event_store import SQLiteEventStore
+
+class TestEventWorkQueue(unittest.TestCase):
+    def setUp(self):
+        """Set up a test client with empty event storage."""
+        core_events.events_storage.clear()
+        core_events.idempotency_index.clear()
+        self.event = {
+            "caseId": "queue-case",
+            "evidenceId": "queue-evidence",
+            "riskScore": 90,
+            "actionSuggested": "freeze",
+            "metadata": {"walletAddress": "0xqueue", "amount": 50}
+        }
+
+    def distinct_events(self, count, prefix="queue-evidence"):
+        # Repeated payloads would be answered as retries
+        return [dict(self.event, evidenceId=f"{prefix}-{i}") for i in range(count)]
+
+    def test_events_are_processed_in_background(self):
+        """Test that accepted events move from queued to processed."""
+        with TestClient(core_events.app) as client:
+            response = client.post("/core/events", json=self.event)
+            self.assertEqual(response.status_code, 202)
+            core_event_id = response.json()["coreEventId"]
+
+            batch = client.post("/core/events:batch", json={"events": self.distinct_events(3)}).json()
+            batch_ids = [r["coreEventId"] for r in batch["results"]]
+
+        # Leaving the client drains the queue on shutdown
+        for event_id in [core_event_id] + batch_ids:
+            data = core_events.events_storage[event_id]
+            self.assertEqual(data["status"], "processed")
+            self.assertIsNotNone(data["processedAt"])
+            self.assertEqual(
+                [a["action"] for a in data["actionsTriggered"]][:2],
+                ["auto_escalation", "multisig_trigger"]
+            )
+
+        with TestClient(core_events.app) as client:
+            data = client.get(f"/core/events/{core_event_id}").json()
+            self.assertEqual(data["status"], "processed")
+            self.assertIsNotNone(data["processedAt"])
+
+    def test_unfinished_events_requeued_after_restart(self):
+        """Test that queued and processing events in a reopened store are orchestrated at startup."""
+        path = os.path.join(tempfile.mkdtemp(), "events.db")
+        store = SQLiteEventStore(path)
+        events = store.collection("events", "coreEventId", ["caseId"], EventRecord)
+        statuses = {"restart-queued": "queued", "restart-processing": "processing", "restart-done": "processed"}
+        for core_event_id, event_status in statuses.items():
+            events.put(dict(self.event, coreEventId=core_event_id, evidenceId=core_event_id, status=event_status,
+                            timestamp="2024-01-01T00:00:00"))
+        store.close()
+
+        reopened = SQLiteEventStore(path)
+        self.addCleanup(reopened.close)
+        original = core_events.events_storage
+        core_events.events_storage = reopened.collection("events", "coreEventId", ["caseId"], EventRecord)
+        try:
+            with TestClient(core_events.app) as client:
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline and any(
+                        client.get(f"/core/events/{core_event_id}").json()["status"] != "processed"
+                        for core_event_id in statuses):
+                    time.sleep(0.05)
+            for core_event_id in statuses:
+                data = core_events.events_storage[core_event_id]
+                self.assertEqual(data["status"], "processed")
+            self.assertIsNone(core_events.events_storage["restart-done"].get("processedAt"))
+            self.assertIsNotNone(core_events.events_storage["restart-queued"]["processedAt"])
+        finally:
+            core_events.events_storage = original
+
+    def test_full_queue_returns_429(self):
+        """Test backpressure when consumers fall behind."""
+        release = threading.Event()
+        original = core_events.work_queue
+        core_events.work_queue = EventWorkQueue(lambda event: release.wait(5), consumers=1, maxsize=2)
+        try:
+            with TestClient(core_events.app) as client:
+                codes = [client.post("/core/events", json=event).status_code for event in self.distinct_events(5)]
+                self.assertIn(429, codes)
+                rejected = client.post("/core/events", json=dict(self.event, evidenceId="queue-evidence-rejected"))
+                self.assertEqual(rejected.status_code, 429)
+                self.assertEqual(rejected.headers["Retry-After"], str(core_events.RETRY_AFTER_SECONDS))
+
+                batch = client.post("/core/events:batch", json={"events": self.distinct_events(3, "queue-batch")})
+                self.assertEqual(batch.status_code, 429)
+
+                queued = [e for e in core_events.events_storage.values() if e["status"] == "queued"]
+                self.assertTrue(queued)
+                release.set()
+        finally:
+            core_events.work_queue = original
+
+    def test_consumers_drain_batches(self):
+        """Test that a batch handler receives every waiting event, up to the batch size, per call."""
+        batches = []
+        queue = EventWorkQueue(lambda event: self.fail("per-event handler used"), consumers=1, maxsize=20,
+                               process_batch=lambda events: batches.append([e["n"] for e in events]), batch_size=4)
+
+        async def run():
+            for n in range(10):
+                queue.submit({"n": n})
+            await queue.stop()
+
+        asyncio.run(run())
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(queue.processed, 10)
+
+if __name__ == "__main__":
+    unittest.main()